@@ -1,7 +1,20 @@
 # AI Services module
-from .llm import chat_with_model, summarize_comparison
-
-__all__ = ['chat_with_model', 'summarize_comparison']
-
-
+from .cache import cache_stats as answer_cache_stats
+from .llm import (
+    achat_with_model,
+    asummarize_comparison,
+    astream_chat_with_model,
+    astream_comparison,
+    chat_with_model,
+    stream_chat_with_model,
+    stream_comparison,
+    summarize_comparison,
+)
 
+__all__ = [
+    'chat_with_model', 'summarize_comparison',
+    'achat_with_model', 'asummarize_comparison',
+    'stream_chat_with_model', 'stream_comparison',
+    'astream_chat_with_model', 'astream_comparison',
+    'answer_cache_stats',
+]
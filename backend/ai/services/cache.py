@@ -0,0 +1,107 @@
+"""
+Cache of chat answers.
+
+Many chat questions are repeats ("университеты в Алматы", "где есть
+общежитие"), and each one costs a full model round trip. Answers are
+cached under a hash of the model, the version of the system prompt and
+the messages sent after it (the trimmed history and the new message),
+each normalized: Unicode forms, case, runs of whitespace and trailing
+punctuation do not matter, so "Университеты в Алматы?" and
+"университеты  в алматы" share an answer. Keys start with the catalog
+version, so editing the catalog invalidates every answer along with the
+catalog responses (see universities.caching).
+
+The backend is the `AI_CACHE_ALIAS` entry of CACHES: per-process locmem
+by default, which culls the least recently read answers past
+AI_CACHE_MAX_ENTRIES, or a shared backend configured with AI_CACHE_URL.
+Answers expire after AI_CACHE_TTL seconds; 0 disables the cache. The
+hit/miss counters are kept in a cache of their own (AI_STATS_CACHE_ALIAS),
+which culling the answers never touches.
+"""
+
+import hashlib
+import json
+import re
+import unicodedata
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from universities.caching import get_catalog_version
+
+
+HITS_KEY = 'ai:stats:hits'
+MISSES_KEY = 'ai:stats:misses'
+
+
+def get_cache():
+    return caches[settings.AI_CACHE_ALIAS]
+
+
+def get_stats_cache():
+    return caches[settings.AI_STATS_CACHE_ALIAS]
+
+
+def normalize(text):
+    """`text` with Unicode forms, case, whitespace and trailing punctuation folded."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return re.sub(r'\s+', ' ', text).strip().rstrip('?!.…').rstrip()
+
+
+def chat_key(model, prompt_version, messages):
+    """The cache key of the answer to `messages` (the system prompt left out)."""
+    normalized = [[message.get('role'), normalize(message.get('content') or '')] for message in messages]
+    payload = json.dumps([model, prompt_version, normalized], ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f'ai:chat:{get_catalog_version()}:{digest}'
+
+
+def _count(key):
+    cache = get_stats_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def lookup(model, prompt_version, messages):
+    """
+    Look up the cached answer to a chat.
+
+    Returns:
+        (key, answer): The key to store the answer under and the cached
+            answer, None on a miss; (None, None) if the cache is off
+    """
+    if not settings.AI_CACHE_TTL:
+        return None, None
+    key = chat_key(model, prompt_version, messages)
+    answer = get_cache().get(key)
+    _count(MISSES_KEY if answer is None else HITS_KEY)
+    return key, answer
+
+
+def store(key, answer):
+    """Cache `answer` under a key returned by lookup (no-op for None or an empty answer)."""
+    if key is not None and answer:
+        get_cache().set(key, answer, settings.AI_CACHE_TTL)
+
+
+# For the async views: off the event loop, as the backend may be remote,
+# but not on the thread shared by sync code, which may be busy
+alookup = sync_to_async(lookup, thread_sensitive=False)
+astore = sync_to_async(store, thread_sensitive=False)
+
+
+def cache_stats():
+    """Hit/miss counters of the chat answer cache."""
+    cache = get_stats_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+        'ttl': settings.AI_CACHE_TTL,
+    }
@@ -7,19 +7,123 @@ for the DataHub platform's AI features.
 Functions:
     - chat_with_model: Process chat messages about universities
     - summarize_comparison: Generate comparison summaries for universities
+
+achat_with_model and asummarize_comparison are the same calls made with
+the async client, for the async views served under ASGI. The stream_*
+and astream_* variants return the reply as it is generated, one text
+delta at a time.
+
+The clients are shared by the whole process (see ClientManager), so calls
+reuse connections and are bounded by timeouts and retries. Chat answers
+are cached (see ai.services.cache).
 """
 
+import asyncio
+import hashlib
 import os
 import json
-from typing import List, Dict, Any
-from openai import OpenAI
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from openai import AsyncOpenAI, OpenAI, Timeout
+
+from . import cache as answer_cache
+
+
+# Defaults of the settings read from the environment
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0
+MAX_RETRIES = 2
+
+
+class ClientManager:
+    """
+    Process-wide OpenAI clients, so requests share keep-alive connections.
+    
+    Creating a client per request opens a new connection (and TLS session)
+    for every call. The clients kept here are built from the environment:
+    
+        OPENAI_API_KEY          required
+        OPENAI_BASE_URL         optional, e.g. a local fake for load tests
+        OPENAI_CONNECT_TIMEOUT  seconds to connect (default 5)
+        OPENAI_READ_TIMEOUT     seconds to wait for the next bytes of a reply (default 60)
+        OPENAI_MAX_RETRIES      retries on connection errors, 408, 409, 429 and
+                                5xx (default 2), with jittered exponential backoff
+                                from 0.5s or the delay in Retry-After
+    
+    and rebuilt when those change or the process forks. Replaced clients are
+    not closed, since requests in flight may still use them; their connections
+    close once they are no longer referenced. The async client is kept per
+    event loop, as its connections belong to the loop that opened them.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client = None
+        self._client_config = None
+        self._async_clients = {}  # Event loop -> (config, client)
+    
+    def config(self) -> Dict[str, Any]:
+        """
+        The client settings in the environment.
+        
+        Raises:
+            ValueError: If OPENAI_API_KEY is not set or a setting is not a number
+        """
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+        return {
+            'api_key': api_key,
+            'base_url': os.environ.get('OPENAI_BASE_URL') or None,
+            'connect_timeout': float(os.environ.get('OPENAI_CONNECT_TIMEOUT', CONNECT_TIMEOUT)),
+            'read_timeout': float(os.environ.get('OPENAI_READ_TIMEOUT', READ_TIMEOUT)),
+            'max_retries': int(os.environ.get('OPENAI_MAX_RETRIES', MAX_RETRIES)),
+            'pid': os.getpid(),
+        }
+    
+    def get(self) -> OpenAI:
+        """The shared OpenAI client, rebuilt if the environment changed."""
+        config = self.config()
+        with self._lock:
+            if self._client is None or self._client_config != config:
+                self._client = self._build(OpenAI, config)
+                self._client_config = config
+            return self._client
+    
+    def get_async(self) -> AsyncOpenAI:
+        """The shared AsyncOpenAI client of the running event loop, rebuilt if the environment changed."""
+        config = self.config()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None or entry[0] != config:
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                entry = self._async_clients[loop] = (config, self._build(AsyncOpenAI, config))
+            return entry[1]
+    
+    def reset(self) -> None:
+        """Forget the clients, so the next calls build new ones."""
+        with self._lock:
+            self._client = self._client_config = None
+            self._async_clients.clear()
+    
+    @staticmethod
+    def _build(client_class, config):
+        return client_class(
+            api_key=config['api_key'],
+            base_url=config['base_url'],
+            timeout=Timeout(config['read_timeout'], connect=config['connect_timeout']),
+            max_retries=config['max_retries'],
+        )
+
+
+clients = ClientManager()
 
 
-# Initialize OpenAI client
-# The API key is loaded from environment variable OPENAI_API_KEY
 def get_openai_client() -> OpenAI:
     """
-    Get an OpenAI client instance.
+    Get the shared OpenAI client instance.
     
     Returns:
         OpenAI: Configured OpenAI client
@@ -27,10 +131,20 @@ def get_openai_client() -> OpenAI:
     Raises:
         ValueError: If OPENAI_API_KEY is not set
     """
-    api_key = os.environ.get('OPENAI_API_KEY')
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable is not set")
-    return OpenAI(api_key=api_key)
+    return clients.get()
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Get the shared async OpenAI client instance of the running event loop.
+    
+    Returns:
+        AsyncOpenAI: Configured async OpenAI client
+        
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set
+    """
+    return clients.get_async()
 
 
 # System prompt for the chatbot
@@ -56,6 +170,9 @@ Guidelines:
 
 If asked about something unrelated to education or universities, politely redirect the conversation back to educational topics."""
 
+# Part of the answer cache keys, so editing the prompt invalidates the cached answers
+CHATBOT_PROMPT_VERSION = hashlib.sha256(CHATBOT_SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:12]
+
 
 COMPARISON_SYSTEM_PROMPT = """You are an expert education consultant helping students compare universities in Kazakhstan.
 
@@ -93,10 +210,26 @@ Guidelines:
 - Highlight value propositions for different student needs"""
 
 
+def build_chat_messages(message: str, conversation_history: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
+    """The messages sent to the model for a chat message."""
+    messages = [{"role": "system", "content": CHATBOT_SYSTEM_PROMPT}]
+    
+    # Add conversation history if provided
+    if conversation_history:
+        for msg in conversation_history[-10:]:  # Keep last 10 messages for context
+            messages.append(msg)
+    
+    # Add the current user message
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
 def chat_with_model(message: str, conversation_history: List[Dict[str, str]] = None) -> str:
     """
     Process a chat message and return an AI-generated response.
     
+    Repeated questions are answered from the answer cache.
+    
     Args:
         message: The user's message/question
         conversation_history: Optional list of previous messages for context
@@ -108,55 +241,51 @@ def chat_with_model(message: str, conversation_history: List[Dict[str, str]] = N
         Exception: If the API call fails
     """
     client = get_openai_client()
-    
-    # Build messages array
-    messages = [{"role": "system", "content": CHATBOT_SYSTEM_PROMPT}]
-    
-    # Add conversation history if provided
-    if conversation_history:
-        for msg in conversation_history[-10:]:  # Keep last 10 messages for context
-            messages.append(msg)
-    
-    # Add the current user message
-    messages.append({"role": "user", "content": message})
+    messages = build_chat_messages(message, conversation_history)
+    model = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+    key, answer = answer_cache.lookup(model, CHATBOT_PROMPT_VERSION, messages[1:])
+    if answer is not None:
+        return answer
     
     try:
         response = client.chat.completions.create(
-            model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+            model=model,
             messages=messages,
             max_tokens=1000,
             temperature=0.7,
         )
-        return response.choices[0].message.content
+        answer = response.choices[0].message.content
     except Exception as e:
         raise Exception(f"Failed to get response from OpenAI: {str(e)}")
+    answer_cache.store(key, answer)
+    return answer
 
 
-def summarize_comparison(universities_data: List[Dict[str, Any]]) -> str:
-    """
-    Generate a comparison summary for the provided universities.
-    
-    Args:
-        universities_data: List of university data dictionaries containing:
-            - name: University name
-            - city: Location
-            - tuition: Annual tuition fee
-            - rating: University rating
-            - programs: List of available programs
-            - has_dormitory: Dormitory availability
-            - study_form: Study format (full-time, part-time, both)
-            - description: University description
-            - founded_year: Year of founding
-            - students_count: Number of students
-            
-    Returns:
-        str: Markdown-formatted comparison summary
-        
-    Raises:
-        Exception: If the API call fails
-    """
-    client = get_openai_client()
+async def achat_with_model(message: str, conversation_history: List[Dict[str, str]] = None) -> str:
+    """Async version of chat_with_model."""
+    messages = build_chat_messages(message, conversation_history)
     
+    client = get_async_openai_client()
+    model = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+    key, answer = await answer_cache.alookup(model, CHATBOT_PROMPT_VERSION, messages[1:])
+    if answer is not None:
+        return answer
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=1000,
+            temperature=0.7,
+        )
+        answer = response.choices[0].message.content
+    except Exception as e:
+        raise Exception(f"Failed to get response from OpenAI: {str(e)}")
+    await answer_cache.astore(key, answer)
+    return answer
+
+
+def build_comparison_messages(universities_data: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """The messages sent to the model for a comparison of universities."""
     # Format universities data for the prompt
     universities_text = []
     for i, uni in enumerate(universities_data, 1):
@@ -200,14 +329,42 @@ University {i}: {uni.get('name', 'Unknown')}
 {''.join(universities_text)}
 
 Provide a comprehensive comparison summary with pros/cons and a final recommendation."""
+    return [
+        {"role": "system", "content": COMPARISON_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
 
+def summarize_comparison(universities_data: List[Dict[str, Any]]) -> str:
+    """
+    Generate a comparison summary for the provided universities.
+    
+    Args:
+        universities_data: List of university data dictionaries containing:
+            - name: University name
+            - city: Location
+            - tuition: Annual tuition fee
+            - rating: University rating
+            - programs: List of available programs
+            - has_dormitory: Dormitory availability
+            - study_form: Study format (full-time, part-time, both)
+            - description: University description
+            - founded_year: Year of founding
+            - students_count: Number of students
+            
+    Returns:
+        str: Markdown-formatted comparison summary
+        
+    Raises:
+        Exception: If the API call fails
+    """
+    client = get_openai_client()
+    messages = build_comparison_messages(universities_data)
+    
     try:
         response = client.chat.completions.create(
             model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
-            messages=[
-                {"role": "system", "content": COMPARISON_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             max_tokens=1500,
             temperature=0.7,
         )
@@ -216,4 +373,122 @@ Provide a comprehensive comparison summary with pros/cons and a final recommenda
         raise Exception(f"Failed to generate comparison summary: {str(e)}")
 
 
+async def asummarize_comparison(universities_data: List[Dict[str, Any]]) -> str:
+    """Async version of summarize_comparison."""
+    messages = build_comparison_messages(universities_data)
+    
+    client = get_async_openai_client()
+    try:
+        response = await client.chat.completions.create(
+            model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+            messages=messages,
+            max_tokens=1500,
+            temperature=0.7,
+        )
+        return response.choices[0].message.content
+    except Exception as e:
+        raise Exception(f"Failed to generate comparison summary: {str(e)}")
+
+
+def _stream(client: OpenAI, messages: List[Dict[str, str]], max_tokens: int) -> Iterator[str]:
+    # Closing the generator (the client went away) closes the HTTP response,
+    # which cancels the completion upstream
+    with client.chat.completions.create(
+        model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        stream=True,
+    ) as stream:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+async def _astream(client: AsyncOpenAI, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+    stream = await client.chat.completions.create(
+        model=os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'),
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        stream=True,
+    )
+    async with stream:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def _cached_stream(client: OpenAI, messages: List[Dict[str, str]], max_tokens: int) -> Iterator[str]:
+    # A cached answer comes as a single delta; a streamed one is cached
+    # only once complete, not when the client went away or the model failed
+    key, answer = answer_cache.lookup(os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'), CHATBOT_PROMPT_VERSION, messages[1:])
+    if answer is not None:
+        yield answer
+        return
+    tokens = _stream(client, messages, max_tokens)
+    parts = []
+    try:
+        for content in tokens:
+            parts.append(content)
+            yield content
+    finally:
+        tokens.close()
+    answer_cache.store(key, ''.join(parts))
+
+
+async def _acached_stream(client: AsyncOpenAI, messages: List[Dict[str, str]], max_tokens: int) -> AsyncIterator[str]:
+    key, answer = await answer_cache.alookup(
+        os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'), CHATBOT_PROMPT_VERSION, messages[1:],
+    )
+    if answer is not None:
+        yield answer
+        return
+    tokens = _astream(client, messages, max_tokens)
+    parts = []
+    try:
+        async for content in tokens:
+            parts.append(content)
+            yield content
+    finally:
+        await tokens.aclose()
+    await answer_cache.astore(key, ''.join(parts))
+
+
+def stream_chat_with_model(message: str, conversation_history: List[Dict[str, str]] = None) -> Iterator[str]:
+    """
+    Stream the response to a chat message as it is generated.
+    
+    A cached answer is returned whole, as a single delta.
+    
+    Returns:
+        Iterator[str]: Text deltas; the request is sent when iteration starts
+        
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set (raised by this call, not the iterator)
+    """
+    return _cached_stream(get_openai_client(), build_chat_messages(message, conversation_history), 1000)
+
+
+def astream_chat_with_model(message: str, conversation_history: List[Dict[str, str]] = None) -> AsyncIterator[str]:
+    """Async version of stream_chat_with_model."""
+    return _acached_stream(get_async_openai_client(), build_chat_messages(message, conversation_history), 1000)
+
+
+def stream_comparison(universities_data: List[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Stream a comparison summary as it is generated.
+    
+    Returns:
+        Iterator[str]: Text deltas; the request is sent when iteration starts
+        
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set (raised by this call, not the iterator)
+    """
+    return _stream(get_openai_client(), build_comparison_messages(universities_data), 1500)
+
+
+def astream_comparison(universities_data: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Async version of stream_comparison."""
+    return _astream(get_async_openai_client(), build_comparison_messages(universities_data), 1500)
 
@@ -0,0 +1,86 @@
+"""
+Server-Sent Events responses for the streaming AI endpoints.
+
+A stream is a sequence of events, each a JSON object:
+
+    event: start     sent at once, before the model is called
+    event: token     {"content": "..."}, one per text delta from the model
+    event: done      {"success": true, ...}, after the last token
+    event: error     {"success": false, "error": "..."}, ends a failed stream
+
+Requests that fail before streaming (invalid body, unknown universities,
+missing API key) get the regular JSON error responses instead.
+
+When the client disconnects the token iterator is closed, which closes the
+HTTP response from the model and so cancels the completion: under WSGI when
+the server fails to write to the socket, under ASGI as soon as the
+disconnect arrives (config.handlers.until_disconnect, for the async
+events of the async views).
+"""
+
+import json
+import logging
+
+from django.http import StreamingHttpResponse
+
+from config.handlers import until_disconnect
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/event-stream'
+
+
+def sse(event, data):
+    """One event in the text/event-stream format."""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def event_stream(tokens, start=None, done=None, error_message="Failed to get AI response. Please try again."):
+    """
+    Events forwarding `tokens` as they arrive.
+
+    Args:
+        tokens: Iterator of text deltas
+        start: Data of the start event
+        done: Extra data of the done event
+        error_message: Sent to the client when `tokens` fails
+    """
+    yield sse('start', start or {})
+    try:
+        for content in tokens:
+            yield sse('token', {'content': content})
+    except Exception as e:
+        logger.error(f"Streaming error: {str(e)}")
+        yield sse('error', {'success': False, 'error': error_message})
+        return
+    finally:
+        tokens.close()
+    yield sse('done', {'success': True, **(done or {})})
+
+
+async def aevent_stream(tokens, start=None, done=None, error_message="Failed to get AI response. Please try again."):
+    """Async version of event_stream, for an async iterator of text deltas."""
+    yield sse('start', start or {})
+    try:
+        async for content in tokens:
+            yield sse('token', {'content': content})
+    except Exception as e:
+        logger.error(f"Streaming error: {str(e)}")
+        yield sse('error', {'success': False, 'error': error_message})
+        return
+    finally:
+        # Async generators are not closed when dereferenced
+        await tokens.aclose()
+    yield sse('done', {'success': True, **(done or {})})
+
+
+def sse_response(events):
+    """A StreamingHttpResponse sending `events` as they are produced."""
+    if hasattr(events, '__aiter__'):
+        events = until_disconnect(events)
+    response = StreamingHttpResponse(events, content_type=CONTENT_TYPE)
+    response['Cache-Control'] = 'no-cache'
+    # Passed on by nginx as produced rather than buffered
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -5,14 +5,31 @@ Unit tests for the AI endpoints including chatbot and comparison summary.
 These tests mock the OpenAI API to avoid actual API calls during testing.
 """
 
+import asyncio
+import json
 import os
+import time
 from unittest.mock import patch, MagicMock
-from django.test import TestCase
-from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import include, path, reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
-from universities.models import University, Program
+from config import handlers
+from ai.services import cache as answer_cache
+from loadtest.fake_llm import REPLY, FakeLLMServer
+from universities.models import University, Program, UniversityImage
+from .urls import async_urlpatterns
+
+
+# Served with the async AI views, as under config.asgi
+urlpatterns = [
+    path('api/', include('universities.urls')),
+    path('api/ai/', include((async_urlpatterns, 'ai'))),
+]
 
 
 class ChatViewTests(APITestCase):
@@ -180,6 +197,21 @@ class CompareSummaryViewTests(APITestCase):
         self.assertTrue(response.data['success'])
         self.assertEqual(response.data['universities_compared'], 3)
     
+    @patch('ai.views.summarize_comparison', return_value="## Comparison")
+    def test_compare_summary_queries(self, mock_summarize):
+        """Test that galleries and programs are prefetched, not loaded per university."""
+        for university in [self.university1, self.university2, self.university3]:
+            for order in range(2):
+                UniversityImage.objects.create(university=university, image=f'gallery/{order}.jpg', order=order)
+        
+        data = {"university_ids": [self.university1.id, self.university2.id, self.university3.id]}
+        with self.assertNumQueries(3):
+            response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        universities_data = mock_summarize.call_args.args[0]
+        self.assertEqual([len(uni['images']) for uni in universities_data], [2, 2, 2])
+    
     def test_compare_summary_single_university(self):
         """Test comparison with only one university returns error."""
         data = {"university_ids": [self.university1.id]}
@@ -235,6 +267,13 @@ class CompareSummaryViewTests(APITestCase):
 class LLMServiceTests(TestCase):
     """Tests for the LLM service functions."""
     
+    def setUp(self):
+        # The clients are shared, so a mocked OpenAI class must build a new one
+        from ai.services.llm import clients
+        clients.reset()
+        self.addCleanup(clients.reset)
+        answer_cache.get_cache().clear()
+    
     @patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'})
     @patch('ai.services.llm.OpenAI')
     def test_chat_with_model_success(self, mock_openai_class):
@@ -309,4 +348,465 @@ class LLMServiceTests(TestCase):
         self.assertIn("OPENAI_API_KEY", str(context.exception))
 
 
+@override_settings(AI_CACHE_TTL=0)  # Every call reaches the fake LLM
+class ClientManagerTests(SimpleTestCase):
+    """Tests for the shared OpenAI clients, talking to the fake LLM."""
+
+    def setUp(self):
+        from ai.services.llm import clients
+        self.clients = clients
+        self.llm = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(self.llm.stop)
+        self.env = {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'}
+        env = patch.dict(os.environ, self.env)
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_connections_reused(self):
+        """Test that consecutive calls share one client and one connection."""
+        from ai.services.llm import chat_with_model, summarize_comparison
+
+        self.assertIs(self.clients.get(), self.clients.get())
+        self.assertEqual(chat_with_model("Привет"), REPLY)
+        self.assertEqual(summarize_comparison([{"name": "University A"}]), REPLY)
+        self.assertEqual(chat_with_model("Привет"), REPLY)
+
+        self.assertEqual(self.llm.requests, 3)
+        self.assertEqual(self.llm.connections, 1)
+
+    def test_async_connections_reused(self):
+        """Test that async calls on one event loop share a client and a connection."""
+        from ai.services.llm import achat_with_model, asummarize_comparison
+
+        async def calls():
+            self.assertIs(self.clients.get_async(), self.clients.get_async())
+            replies = [await achat_with_model("Привет"), await asummarize_comparison([{"name": "University A"}])]
+            return replies, self.clients.get_async()
+
+        replies, client = asyncio.run(calls())
+        self.assertEqual(replies, [REPLY] * 2)
+        self.assertEqual(self.llm.connections, 1)
+        # Another event loop gets its own client
+        self.assertIsNot(asyncio.run(calls())[1], client)
+
+    def test_rebuilt_when_environment_changes(self):
+        """Test that a changed setting builds a new client using it."""
+        from ai.services.llm import chat_with_model
+
+        client = self.clients.get()
+        with patch.dict(os.environ, {'OPENAI_READ_TIMEOUT': '5'}):
+            self.assertIsNot(self.clients.get(), client)
+            self.assertEqual(self.clients.get().timeout.read, 5)
+
+        other = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(other.stop)
+        with patch.dict(os.environ, {'OPENAI_BASE_URL': other.base_url}):
+            self.assertEqual(chat_with_model("Привет"), REPLY)
+        self.assertEqual((self.llm.requests, other.requests), (0, 1))
+
+        with patch.dict(os.environ, {'OPENAI_MAX_RETRIES': 'many'}):
+            with self.assertRaises(ValueError):
+                self.clients.get()
+
+    def test_retries_with_backoff(self):
+        """Test that 429 and 5xx replies are retried after a delay, up to OPENAI_MAX_RETRIES times."""
+        from ai.services.llm import chat_with_model
+
+        self.llm.failures = [429, 503]
+        started = time.monotonic()
+        self.assertEqual(chat_with_model("Привет"), REPLY)
+        # Backoff of 0.5s then 1s, each shortened by up to a quarter
+        self.assertGreaterEqual(time.monotonic() - started, 0.375 + 0.75)
+        self.assertEqual(self.llm.requests, 3)
+
+        self.llm.failures = [500]
+        with patch.dict(os.environ, {'OPENAI_MAX_RETRIES': '0'}):
+            with self.assertRaises(Exception):
+                chat_with_model("Привет")
+        self.assertEqual(self.llm.requests, 4)
+
+    def test_read_timeout(self):
+        """Test that a model not answering within OPENAI_READ_TIMEOUT fails the call."""
+        from ai.services.llm import chat_with_model
+
+        self.llm.latency = 2
+        started = time.monotonic()
+        with patch.dict(os.environ, {'OPENAI_READ_TIMEOUT': '0.2', 'OPENAI_MAX_RETRIES': '0'}):
+            with self.assertRaises(Exception) as context:
+                chat_with_model("Привет")
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIn("timed out", str(context.exception))
+
+
+class AnswerCacheTests(APITestCase):
+    """Tests for the chat answer cache, in front of the fake LLM."""
+
+    def setUp(self):
+        answer_cache.get_cache().clear()
+        answer_cache.get_stats_cache().clear()
+        self.llm = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(self.llm.stop)
+        env = patch.dict(os.environ, {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_repeats_answered_from_cache(self):
+        """Test that normalized repeats are hits and other history or models are misses."""
+        from ai.services.llm import chat_with_model
+
+        self.assertEqual(chat_with_model("Университеты в Алматы?"), REPLY)
+        self.assertEqual(chat_with_model("  университеты   в АЛМАТЫ "), REPLY)
+        self.assertEqual(self.llm.requests, 1)
+
+        history = [{"role": "user", "content": "Привет"}, {"role": "assistant", "content": "Здравствуйте!"}] * 5
+        chat_with_model("Университеты в Алматы?", history)
+        with patch.dict(os.environ, {'OPENAI_MODEL': 'gpt-4o'}):
+            chat_with_model("Университеты в Алматы?")
+        self.assertEqual(self.llm.requests, 3)
+
+        # Only the last 10 messages are sent, so older ones do not matter
+        chat_with_model("Университеты в Алматы?", [{"role": "user", "content": "Старое"}] + history)
+        self.assertEqual(self.llm.requests, 3)
+
+    def test_hits_fast(self):
+        """Test that a hit returns in under a millisecond."""
+        from ai.services.llm import chat_with_model
+
+        chat_with_model("Где есть общежитие?")
+        started = time.perf_counter()
+        for _ in range(100):
+            self.assertEqual(chat_with_model("Где есть общежитие?"), REPLY)
+        self.assertLess((time.perf_counter() - started) / 100, 0.001)
+        self.assertEqual(self.llm.requests, 1)
+
+    def test_catalog_change_invalidates(self):
+        """Test that answers are not reused once the catalog changed."""
+        from ai.services.llm import chat_with_model
+
+        chat_with_model("Университеты в Алматы")
+        University.objects.create(name="New University", city="Almaty", description="", tuition=0, rating=4)
+        chat_with_model("Университеты в Алматы")
+        self.assertEqual(self.llm.requests, 2)
+
+    def test_streams(self):
+        """Test that complete streams are cached, and hits stream as one delta."""
+        from ai.services.llm import stream_chat_with_model
+
+        tokens = stream_chat_with_model("Привет")
+        next(tokens)
+        tokens.close()
+        self.assertEqual(''.join(stream_chat_with_model("Привет")), REPLY)
+        self.assertEqual(list(stream_chat_with_model("Привет")), [REPLY])
+        self.assertEqual(self.llm.requests, 2)
+
+    async def test_async(self):
+        """Test that the async calls share the cache."""
+        from ai.services.llm import achat_with_model, astream_chat_with_model
+
+        self.assertEqual(await achat_with_model("Привет"), REPLY)
+        self.assertEqual([token async for token in astream_chat_with_model("Привет")], [REPLY])
+        self.assertEqual(self.llm.requests, 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently read answer is evicted first."""
+        from ai.services.llm import chat_with_model
+
+        ai_cache = {**settings.CACHES['ai'], 'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}}
+        with override_settings(CACHES={**settings.CACHES, 'ai': ai_cache}):
+            answer_cache.get_cache().clear()
+            for message in ("Первый", "Второй", "Первый", "Третий", "Четвёртый"):
+                chat_with_model(message)
+            self.assertEqual(self.llm.requests, 4)
+            # "Второй" was read least recently
+            chat_with_model("Первый")
+            self.assertEqual(self.llm.requests, 4)
+            chat_with_model("Второй")
+            self.assertEqual(self.llm.requests, 5)
+
+    @override_settings(AI_CACHE_TTL=0)
+    def test_disabled(self):
+        """Test that AI_CACHE_TTL=0 turns the cache off."""
+        from ai.services.llm import chat_with_model
+
+        chat_with_model("Привет")
+        chat_with_model("Привет")
+        self.assertEqual(self.llm.requests, 2)
+        self.assertEqual(answer_cache.cache_stats()['misses'], 0)
+
+    def test_stats(self):
+        """Test the hit/miss counters and that they are staff only."""
+        for _ in range(3):
+            self.client.post(reverse('ai:chat'), {"message": "Привет"}, format='json')
+
+        url = reverse('ai:cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        stats = self.client.get(url).data
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['hit_ratio'], 0.6667)
+
+    def test_stats_survive_culling(self):
+        """Test that filling the answer cache past its cap keeps the counters."""
+        from ai.services.llm import chat_with_model
+
+        chat_with_model("Привет")
+        chat_with_model("Привет")
+        cache = answer_cache.get_cache()
+        for i in range(settings.AI_CACHE_MAX_ENTRIES + 1):
+            cache.set(f'ai:chat:filler:{i}', 'answer')
+        stats = answer_cache.cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+@override_settings(ROOT_URLCONF='ai.tests')
+class AsyncViewTests(TestCase):
+    """Tests for the async chat and comparison views, talking to the fake LLM."""
+
+    def setUp(self):
+        answer_cache.get_cache().clear()
+        self.llm = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(self.llm.stop)
+        env = patch.dict(os.environ, {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'})
+        env.start()
+        self.addCleanup(env.stop)
+
+        program = Program.objects.create(title="Computer Science", code="CS101")
+        self.universities = [
+            University.objects.create(name=f"University {i}", city="Almaty", description="", tuition=1000000, rating=4.5)
+            for i in range(3)
+        ]
+        for university in self.universities:
+            university.programs.add(program)
+            UniversityImage.objects.create(university=university, image='gallery/1.jpg')
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, content_type='application/json')
+
+    def test_chat(self):
+        """Test that the chat reply comes from the async client."""
+        response = self.post('ai:chat', {"message": "Привет", "conversation_history": []})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"response": REPLY, "success": True})
+        self.assertEqual(self.llm.requests, 1)
+
+    def test_compare_summary(self):
+        """Test a comparison within the view's query budget (enforced by the test runner)."""
+        ids = [university.id for university in self.universities]
+        response = self.post('ai:compare-summary', {"university_ids": ids})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"summary": REPLY, "success": True, "universities_compared": 3})
+
+    def test_invalid_requests(self):
+        """Test that invalid bodies are rejected before calling the model."""
+        self.assertEqual(self.post('ai:chat', {"message": "  "}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post('ai:compare-summary', {"university_ids": [9999, 9998]}).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('ai:chat'), '{', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(self.client.get(reverse('ai:chat')).status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.llm.requests, 0)
+
+    def test_errors(self):
+        """Test that a missing key and a failing model map to 503 and 500."""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            response = self.post('ai:chat', {"message": "Привет"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        with patch('ai.views.achat_with_model', side_effect=Exception("Connection error")):
+            response = self.post('ai:chat', {"message": "Привет"})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(response.json()['success'])
+
+
+@override_settings(ROOT_URLCONF='ai.tests')
+class ASGITests(TestCase):
+    """Tests for serving the AI endpoints asynchronously."""
+
+    @override_settings(DEBUG=True)
+    def test_middleware_runs_async(self):
+        """Test that no middleware makes Django switch a request to the sync thread."""
+        # Django logs each adaptation it needs in DEBUG
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    async def test_catalog_not_blocked_by_chats(self):
+        """Test that catalog requests are answered while chats wait for the model."""
+        latency = 1.0
+        llm = FakeLLMServer(latency=latency, token_delay=0).start()
+        self.addCleanup(llm.stop)
+        env = {'OPENAI_BASE_URL': llm.base_url, 'OPENAI_API_KEY': 'fake'}
+
+        with patch.dict(os.environ, env):
+            started = time.monotonic()
+            chats = [
+                asyncio.create_task(self.async_client.post(
+                    '/api/ai/chat/', {"message": f"Вопрос {i}"}, content_type='application/json',
+                ))
+                for i in range(20)
+            ]
+            while llm.requests < len(chats) and time.monotonic() - started < latency:
+                await asyncio.sleep(0.01)
+            catalog_started = time.monotonic()
+            catalog = await self.async_client.get('/api/universities/')
+            catalog_elapsed = time.monotonic() - catalog_started
+            responses = await asyncio.gather(*chats)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(catalog.status_code, status.HTTP_200_OK)
+        self.assertLess(catalog_elapsed, latency / 2)
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(llm.requests, 20)
+        # Waited for concurrently, not one after the other
+        self.assertLess(elapsed, len(chats) * latency / 2)
+
+
+def parse_events(content):
+    """(event, data) pairs of a text/event-stream body."""
+    events = []
+    for block in content.decode('utf-8').split('\n\n'):
+        if block:
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class StreamingViewTests(TestCase):
+    """Tests for the Server-Sent Events versions of the AI endpoints."""
+
+    def setUp(self):
+        answer_cache.get_cache().clear()
+        self.llm = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(self.llm.stop)
+        env = patch.dict(os.environ, {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def post(self, name, data):
+        return self.client.post(reverse(name), data, content_type='application/json')
+
+    def test_chat_stream(self):
+        """Test that the reply arrives as token events between start and done."""
+        response = self.post('ai:chat-stream', {"message": "Привет"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        events = parse_events(b''.join(response.streaming_content))
+        self.assertEqual(events[0], ('start', {}))
+        self.assertEqual(events[-1], ('done', {"success": True}))
+        self.assertGreater(len(events), 3)
+        self.assertEqual(''.join(data['content'] for event, data in events[1:-1]), REPLY)
+
+    def test_compare_summary_stream(self):
+        """Test the comparison stream, within the view's query budget."""
+        ids = [
+            University.objects.create(name=f"University {i}", city="Almaty", description="", tuition=0, rating=4).id
+            for i in range(2)
+        ]
+        response = self.post('ai:compare-summary-stream', {"university_ids": ids})
+
+        events = parse_events(b''.join(response.streaming_content))
+        self.assertEqual(events[0], ('start', {"universities_compared": 2}))
+        self.assertEqual(events[-1], ('done', {"success": True, "universities_compared": 2}))
+        self.assertEqual(self.post('ai:compare-summary-stream', {"university_ids": [9999, 9998]}).status_code, 404)
+
+    def test_errors(self):
+        """Test JSON errors before streaming and an error event after."""
+        self.assertEqual(self.post('ai:chat-stream', {"message": ""}).status_code, status.HTTP_400_BAD_REQUEST)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            response = self.post('ai:chat-stream', {"message": "Привет"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        def failing():
+            yield "Начало"
+            raise Exception("Connection reset")
+
+        with patch('ai.views.stream_chat_with_model', return_value=failing()):
+            response = self.post('ai:chat-stream', {"message": "Привет"})
+        events = parse_events(b''.join(response.streaming_content))
+        self.assertEqual([event for event, data in events], ['start', 'token', 'error'])
+        self.assertFalse(events[-1][1]['success'])
+
+    def test_time_to_first_token(self):
+        """Test that the first token is sent long before the reply is complete."""
+        self.llm.latency, self.llm.token_delay = 0.1, 0.05
+        started = time.monotonic()
+        response = self.post('ai:chat-stream', {"message": "Привет"})
+        first_token = None
+        for part in response.streaming_content:
+            if first_token is None and part.startswith(b'event: token'):
+                first_token = time.monotonic() - started
+        total = time.monotonic() - started
+
+        self.assertLess(first_token, total / 2)
+
+    def test_disconnect_cancels_completion(self):
+        """Test that closing the response mid-stream cancels the completion upstream."""
+        self.llm.token_delay = 0.05
+        response = self.post('ai:chat-stream', {"message": "Привет"})
+        for part in response.streaming_content:
+            if part.startswith(b'event: token'):
+                break
+        response.close()  # As the WSGI server does when the client went away
+
+        self.assertTrue(wait_for(lambda: self.llm.cancelled == 1))
+
+
+@override_settings(ROOT_URLCONF='ai.tests')
+class AsyncStreamingTests(SimpleTestCase):
+    """Tests for the async streaming views and disconnects under ASGI."""
+
+    def setUp(self):
+        answer_cache.get_cache().clear()
+        self.llm = FakeLLMServer(latency=0, token_delay=0.05).start()
+        self.addCleanup(self.llm.stop)
+        env = patch.dict(os.environ, {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    async def test_chat_stream(self):
+        """Test that the async view streams the reply."""
+        self.llm.token_delay = 0
+        response = await self.async_client.post('/api/ai/chat/stream/', {"message": "Привет"}, content_type='application/json')
+
+        self.assertTrue(response.is_async)
+        events = parse_events(b''.join([part async for part in response.streaming_content]))
+        self.assertEqual(events[-1], ('done', {"success": True}))
+        self.assertEqual(''.join(data['content'] for event, data in events[1:-1]), REPLY)
+
+    async def test_disconnect_cancels_completion(self):
+        """Test that a client disconnecting mid-stream cancels the completion upstream."""
+        received = asyncio.Queue()
+        await received.put({'type': 'http.request', 'body': json.dumps({"message": "Привет"}).encode()})
+        sent = []
+        first_token = asyncio.Event()
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body', b'').startswith(b'event: token'):
+                first_token.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+            'method': 'POST', 'path': '/api/ai/chat/stream/', 'raw_path': b'/api/ai/chat/stream/',
+            'root_path': '', 'query_string': b'', 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'content-type', b'application/json')],
+        }
+        request = asyncio.create_task(handlers.ASGIHandler()(scope, received.get, send))
+        await asyncio.wait_for(first_token.wait(), 5)
+        await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(request, 5)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(any(b'event: done' in message.get('body', b'') for message in sent))
+        self.assertTrue(await asyncio.to_thread(wait_for, lambda: self.llm.cancelled == 1))
 
@@ -4,18 +4,45 @@ AI App URL Configuration
 Defines the URL patterns for AI-related endpoints:
 - /api/ai/chat/ - Chatbot endpoint
 - /api/ai/compare-summary/ - Comparison summary endpoint
+- /api/ai/chat/stream/, /api/ai/compare-summary/stream/ - The same,
+  streamed as Server-Sent Events
+- /api/ai/cache-stats/ - Chat answer cache counters (staff only)
+
+With AI_ASYNC_VIEWS (the default under config.asgi) they are served by
+the async views.
 """
 
+from django.conf import settings
 from django.urls import path
-from .views import ChatView, CompareSummaryView
+from .views import (
+    AsyncChatStreamView,
+    AsyncChatView,
+    AsyncCompareSummaryStreamView,
+    AsyncCompareSummaryView,
+    ChatStreamView,
+    ChatView,
+    CompareSummaryStreamView,
+    CompareSummaryView,
+    get_cache_stats,
+)
 
 
 app_name = 'ai'
 
-urlpatterns = [
+sync_urlpatterns = [
     path('chat/', ChatView.as_view(), name='chat'),
     path('compare-summary/', CompareSummaryView.as_view(), name='compare-summary'),
+    path('chat/stream/', ChatStreamView.as_view(), name='chat-stream'),
+    path('compare-summary/stream/', CompareSummaryStreamView.as_view(), name='compare-summary-stream'),
+    path('cache-stats/', get_cache_stats, name='cache-stats'),
 ]
 
+async_urlpatterns = [
+    path('chat/', AsyncChatView.as_view(), name='chat'),
+    path('compare-summary/', AsyncCompareSummaryView.as_view(), name='compare-summary'),
+    path('chat/stream/', AsyncChatStreamView.as_view(), name='chat-stream'),
+    path('compare-summary/stream/', AsyncCompareSummaryStreamView.as_view(), name='compare-summary-stream'),
+    path('cache-stats/', get_cache_stats, name='cache-stats'),
+]
 
-
+urlpatterns = async_urlpatterns if settings.AI_ASYNC_VIEWS else sync_urlpatterns
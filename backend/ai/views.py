@@ -2,16 +2,30 @@
 AI App Views
 
 API views for AI-powered features including chatbot and comparison summaries.
+
+AsyncChatView and AsyncCompareSummaryView serve the same endpoints under
+ASGI (AI_ASYNC_VIEWS): they await the async OpenAI client and the async
+ORM, so a request waiting seconds for the model holds no worker thread.
+
+The stream views answer with Server-Sent Events forwarding the reply as
+the model generates it (see ai.streaming), again in a sync and an async
+version.
 """
 
+import json
 import logging
 from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.http import JsonResponse
+from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.db.models import Prefetch
 
-from universities.models import University
+from universities.models import Program, University
 from universities.serializers import UniversityDetailSerializer
 from .serializers import (
     ChatMessageSerializer,
@@ -19,12 +33,86 @@ from .serializers import (
     CompareSummaryRequestSerializer,
     CompareSummaryResponseSerializer,
 )
-from .services import chat_with_model, summarize_comparison
+from .services import (
+    achat_with_model,
+    answer_cache_stats,
+    asummarize_comparison,
+    astream_chat_with_model,
+    astream_comparison,
+    chat_with_model,
+    stream_chat_with_model,
+    stream_comparison,
+    summarize_comparison,
+)
+from .streaming import aevent_stream, event_stream, sse_response
 
 
 logger = logging.getLogger(__name__)
 
 
+def compared_universities(university_ids):
+    """The universities to compare, with everything the detail serializer reads."""
+    return (
+        University.objects.filter(id__in=university_ids)
+        .defer('search_vector')
+        .prefetch_related(
+            Prefetch('programs', queryset=Program.objects.defer('search_vector')),
+            'images',
+        )
+    )
+
+
+def json_response(data, status=200):
+    # Non-ASCII kept as is, like DRF's JSONRenderer
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def parse_request(request, serializer_class):
+    """
+    Validate a JSON request body.
+
+    Returns:
+        tuple: (validated data, None), or (None, a 400 response)
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None, json_response(
+            {"success": False, "error": "Request body must be valid JSON"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = serializer_class(data=data)
+    if not serializer.is_valid():
+        return None, json_response(
+            {"success": False, "error": serializer.errors},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return serializer.validated_data, None
+
+
+def not_configured_response(error):
+    # API key not configured
+    logger.error(f"OpenAI API key error: {str(error)}")
+    return json_response(
+        {
+            "success": False,
+            "error": "AI service is not configured. Please contact support."
+        },
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+def not_found_response():
+    return json_response(
+        {
+            "success": False,
+            "error": "No universities found with the provided IDs"
+        },
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatView(APIView):
     """
@@ -46,6 +134,7 @@ class ChatView(APIView):
     """
     # Disable authentication to avoid CSRF issues for public API
     authentication_classes = []
+    query_budget = 0
     
     def post(self, request):
         """Process a chat message and return AI response."""
@@ -117,6 +206,8 @@ class CompareSummaryView(APIView):
     """
     # Disable authentication to avoid CSRF issues for public API
     authentication_classes = []
+    query_budget = {'post': 3}  # Universities, programs, images
+    replica_reads = True  # Reads only (config.dbrouter)
     
     def post(self, request):
         """Generate a comparison summary for the specified universities."""
@@ -135,9 +226,9 @@ class CompareSummaryView(APIView):
             university_ids = serializer.validated_data['university_ids']
             
             # Fetch universities from database
-            universities = University.objects.filter(id__in=university_ids).prefetch_related('programs')
+            universities = list(compared_universities(university_ids))
             
-            if not universities.exists():
+            if not universities:
                 return Response(
                     {
                         "success": False,
@@ -185,4 +276,193 @@ class CompareSummaryView(APIView):
             )
 
 
+class AsyncAIView(View):
+    """
+    Base of the async AI views: a JSON body in, a JSON response out.
+
+    Subclasses set `request_serializer` and implement `handle`, awaiting
+    anything slow. Errors are reported as the DRF views report them.
+    """
+    http_method_names = ['post', 'options']
+    request_serializer = None
+    error_message = "Failed to get AI response. Please try again."
+
+    async def post(self, request):
+        validated_data, error_response = parse_request(request, self.request_serializer)
+        if error_response is not None:
+            return error_response
+
+        try:
+            return await self.handle(validated_data)
+        except ValueError as e:
+            return not_configured_response(e)
+        except Exception as e:
+            logger.error(f"{self.__class__.__name__} error: {str(e)}")
+            return json_response(
+                {"success": False, "error": self.error_message},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    async def handle(self, validated_data):
+        raise NotImplementedError
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatView(AsyncAIView):
+    """Async version of ChatView."""
+    request_serializer = ChatMessageSerializer
+    query_budget = 0
+
+    async def handle(self, validated_data):
+        response_text = await achat_with_model(
+            validated_data['message'],
+            validated_data.get('conversation_history', []),
+        )
+        response_serializer = ChatResponseSerializer(data={
+            "response": response_text,
+            "success": True
+        })
+        response_serializer.is_valid()
+        return json_response(response_serializer.data)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCompareSummaryView(AsyncAIView):
+    """Async version of CompareSummaryView."""
+    request_serializer = CompareSummaryRequestSerializer
+    error_message = "Failed to generate comparison summary. Please try again."
+    query_budget = {'post': 3}  # Universities, programs, images
+    replica_reads = True  # Reads only (config.dbrouter)
+
+    async def handle(self, validated_data):
+        # Iterating fetches the rows and runs the prefetches in one hop to
+        # the ORM's thread; serializing afterwards needs no database access
+        universities = [
+            university async for university in compared_universities(validated_data['university_ids'])
+        ]
+        if not universities:
+            return not_found_response()
+
+        universities_data = UniversityDetailSerializer(universities, many=True).data
+        summary_text = await asummarize_comparison(universities_data)
+
+        response_serializer = CompareSummaryResponseSerializer(data={
+            "summary": summary_text,
+            "success": True,
+            "universities_compared": len(universities_data)
+        })
+        response_serializer.is_valid()
+        return json_response(response_serializer.data)
 
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatStreamView(View):
+    """
+    Streaming version of ChatView.
+
+    POST /api/ai/chat/stream/ with the ChatView request body; the reply is
+    sent as Server-Sent Events (see ai.streaming).
+    """
+    http_method_names = ['post', 'options']
+    query_budget = 0
+
+    def post(self, request):
+        validated_data, error_response = parse_request(request, ChatMessageSerializer)
+        if error_response is not None:
+            return error_response
+        try:
+            tokens = stream_chat_with_model(
+                validated_data['message'],
+                validated_data.get('conversation_history', []),
+            )
+        except ValueError as e:
+            return not_configured_response(e)
+        return sse_response(event_stream(tokens))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatStreamView(View):
+    """Async version of ChatStreamView."""
+    http_method_names = ['post', 'options']
+    query_budget = 0
+
+    async def post(self, request):
+        validated_data, error_response = parse_request(request, ChatMessageSerializer)
+        if error_response is not None:
+            return error_response
+        try:
+            tokens = astream_chat_with_model(
+                validated_data['message'],
+                validated_data.get('conversation_history', []),
+            )
+        except ValueError as e:
+            return not_configured_response(e)
+        return sse_response(aevent_stream(tokens))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CompareSummaryStreamView(View):
+    """
+    Streaming version of CompareSummaryView.
+
+    POST /api/ai/compare-summary/stream/ with the CompareSummaryView
+    request body; the summary is sent as Server-Sent Events (see
+    ai.streaming), the start and done events carrying
+    `universities_compared`.
+    """
+    http_method_names = ['post', 'options']
+    error_message = "Failed to generate comparison summary. Please try again."
+    query_budget = {'post': 3}  # Universities, programs, images
+    replica_reads = True  # Reads only (config.dbrouter)
+
+    def post(self, request):
+        validated_data, error_response = parse_request(request, CompareSummaryRequestSerializer)
+        if error_response is not None:
+            return error_response
+        universities = list(compared_universities(validated_data['university_ids']))
+        if not universities:
+            return not_found_response()
+
+        universities_data = UniversityDetailSerializer(universities, many=True).data
+        try:
+            tokens = stream_comparison(universities_data)
+        except ValueError as e:
+            return not_configured_response(e)
+        meta = {"universities_compared": len(universities_data)}
+        return sse_response(event_stream(tokens, start=meta, done=meta, error_message=self.error_message))
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCompareSummaryStreamView(View):
+    """Async version of CompareSummaryStreamView."""
+    http_method_names = ['post', 'options']
+    error_message = CompareSummaryStreamView.error_message
+    query_budget = {'post': 3}  # Universities, programs, images
+    replica_reads = True  # Reads only (config.dbrouter)
+
+    async def post(self, request):
+        validated_data, error_response = parse_request(request, CompareSummaryRequestSerializer)
+        if error_response is not None:
+            return error_response
+        universities = [
+            university async for university in compared_universities(validated_data['university_ids'])
+        ]
+        if not universities:
+            return not_found_response()
+
+        universities_data = UniversityDetailSerializer(universities, many=True).data
+        try:
+            tokens = astream_comparison(universities_data)
+        except ValueError as e:
+            return not_configured_response(e)
+        meta = {"universities_compared": len(universities_data)}
+        return sse_response(aevent_stream(tokens, start=meta, done=meta, error_message=self.error_message))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_cache_stats(request):
+    """
+    Returns hit/miss counters of the chat answer cache (staff only).
+    """
+    return Response(answer_cache_stats())
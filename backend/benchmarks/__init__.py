@@ -0,0 +1,13 @@
+"""
+Micro-benchmarks for catalog queries, serializers and views.
+
+Runs against a throwaway test database (SQLite or a local PostgreSQL, as
+configured by DATABASE_URL / POSTGRES_*), seeded with the synthetic catalog
+at each requested size. No network access is needed.
+
+    python -m benchmarks --sizes 100,1000,10000
+    python -m benchmarks --baseline benchmarks/results/baseline.json --fail-on-regression
+
+Every case records its query count, p50/p95 latency and peak traced
+allocations; results are written as JSON so runs can be compared.
+"""
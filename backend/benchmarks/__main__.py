@@ -0,0 +1,108 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Catalog micro-benchmarks')
+    parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated catalog sizes')
+    parser.add_argument('--cases', help='Comma-separated case names (default: all)')
+    parser.add_argument('--repeat', type=int, default=30, help='Timed iterations per case')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed iterations per case')
+    parser.add_argument('--programs', type=int, default=200, help='Programs in the synthetic catalog')
+    parser.add_argument('--images-per-uni', type=int, default=3, help='Gallery images per university')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p50 slowdown, as a fraction')
+    parser.add_argument(
+        '--fail-on-regression',
+        action='store_true',
+        help='Exit with status 1 when a case regressed against the baseline',
+    )
+    parser.add_argument('--list', action='store_true', help='List the cases and exit')
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error('--repeat must be positive')
+    try:
+        args.sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error('--sizes must be a comma-separated list of integers')
+    if not args.sizes or min(args.sizes) < 1:
+        parser.error('--sizes must be positive')
+    args.cases = [name.strip() for name in args.cases.split(',')] if args.cases else None
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    import json
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from . import runner
+    from .cases import CASES
+
+    if args.list:
+        print('\n'.join(CASES))
+        return 0
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    # Seed into a throwaway database, never the development one
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        meta = runner.metadata(args.repeat, args.warmup)
+        print(f"Benchmarking on {meta['database']} (revision {meta['revision'] or 'unknown'})")
+        results = runner.run(
+            args.sizes,
+            cases=args.cases,
+            repeat=args.repeat,
+            warmup=args.warmup,
+            programs=args.programs,
+            images_per_university=args.images_per_uni,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    runner.save(output, meta, results)
+    print(f'Results written to {output}')
+
+    if baseline is None:
+        return 0
+
+    rows, regressions = runner.compare(results, baseline, args.threshold)
+    print(f"\nCompared with {args.baseline} ({baseline['meta'].get('revision') or 'unknown revision'})")
+    for row in rows:
+        print(
+            f"  {row['case']:<22} {row['size']:>8}  p50 {row['p50_before']:>8.2f} -> {row['p50_after']:>8.2f} ms "
+            f"({row['change']:+.0%})  queries {row['queries_before']} -> {row['queries_after']}"
+            f"{'  REGRESSION' if row['regressed'] else ''}"
+        )
+    if regressions:
+        print(f'{len(regressions)} regressions')
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Benchmark cases.
+
+A case receives the catalog size, prepares its inputs outside the timed
+region and returns the callable to time. View cases go through DRF's
+request handling and rendering; unless their name starts with `cached.`
+they run with the catalog response cache disabled, so they measure the
+ORM and serializer work.
+"""
+
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from universities.models import University
+from universities.serializers import UniversityDetailSerializer, UniversityListSerializer
+from universities.views import UniversityViewSet, get_facet_counts, get_filter_options
+
+
+CASES = {}
+
+UNCACHED = {'CATALOG_CACHE_TTL': 0}
+CACHED = {'CATALOG_CACHE_TTL': 300}
+
+factory = APIRequestFactory()
+
+
+def case(name, settings=UNCACHED):
+    """Register a case under `name`, run with the given settings overrides."""
+    def register(func):
+        CASES[name] = (func, settings)
+        return func
+    return register
+
+
+def _middle_university(size):
+    return University.objects.order_by('pk').values_list('pk', flat=True)[size // 2]
+
+
+def _get(view, path, params=None, **kwargs):
+    def run():
+        response = view(factory.get(path, params, HTTP_ACCEPT='application/json'), **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        assert response.status_code == 200, f'{path} returned {response.status_code}'
+        return response
+    return run
+
+
+@case('serializer.list')
+def list_serializer(size):
+    # One page of the default catalog listing
+    universities = list(University.objects.defer('search_vector')[:50])
+    return lambda: UniversityListSerializer(universities, many=True).data
+
+
+@case('serializer.detail')
+def detail_serializer(size):
+    university = University.objects.prefetch_related('programs', 'images').get(pk=_middle_university(size))
+    return lambda: UniversityDetailSerializer(university).data
+
+
+@case('view.list')
+def list_view(size):
+    return _get(UniversityViewSet.as_view({'get': 'list'}), reverse('university-list'))
+
+
+@case('view.list.filtered')
+def filtered_list_view(size):
+    params = {'city': 'Алматы', 'tuition_range': 'medium', 'has_dormitory': 'true', 'ordering': 'tuition'}
+    return _get(UniversityViewSet.as_view({'get': 'list'}), reverse('university-list'), params)
+
+
+@case('view.list.last_page')
+def last_page_view(size):
+    page = max(1, (size + 49) // 50)
+    return _get(UniversityViewSet.as_view({'get': 'list'}), reverse('university-list'), {'page': page})
+
+
+@case('view.detail')
+def detail_view(size):
+    pk = _middle_university(size)
+    return _get(UniversityViewSet.as_view({'get': 'retrieve'}), reverse('university-detail', args=[pk]), pk=pk)
+
+
+@case('view.filter_options')
+def filter_options_view(size):
+    return _get(get_filter_options, reverse('filter-options'))
+
+
+@case('view.facets')
+def facets_view(size):
+    return _get(get_facet_counts, reverse('facets'), {'city': 'Алматы'})
+
+
+@case('cached.list', settings=CACHED)
+def cached_list_view(size):
+    view = _get(UniversityViewSet.as_view({'get': 'list'}), reverse('university-list'))
+    view()  # Build the snapshot
+    return view
+
+
+@case('cached.detail', settings=CACHED)
+def cached_detail_view(size):
+    pk = _middle_university(size)
+    view = _get(UniversityViewSet.as_view({'get': 'retrieve'}), reverse('university-detail', args=[pk]), pk=pk)
+    view()
+    return view
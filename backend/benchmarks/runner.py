@@ -0,0 +1,171 @@
+"""
+Seeding, measurement and baseline comparison for the benchmark cases.
+"""
+
+import gc
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import islice
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from universities.bulk import CatalogWriter
+from universities.caching import get_cache
+from universities.synthetic import program_rows, university_rows
+
+from .cases import CASES
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def seed(size, seeded, programs, images_per_university):
+    """
+    Grow the synthetic catalog from `seeded` to `size` universities.
+
+    The generator is deterministic and prefix-stable, so the first `seeded`
+    rows are skipped rather than written again.
+    """
+    writer = CatalogWriter()
+    codes = [row['code'] for row in program_rows(programs)]
+    if not seeded:
+        writer.write_programs(program_rows(programs))
+    writer.write_universities(islice(university_rows(size, codes, images_per_university), seeded, None))
+    writer.finish()
+
+
+def measure(func, repeat, warmup):
+    """Time `func` and record its query count and peak allocations."""
+    for _ in range(warmup):
+        func()
+
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'queries': len(queries.captured_queries),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(sizes, cases=None, repeat=30, warmup=3, programs=200, images_per_university=3, log=print):
+    """
+    Run the selected cases at every catalog size.
+
+    Must be called with a disposable database: the catalog is seeded into it.
+
+    Returns:
+        list: One result dict per (case, size)
+    """
+    names = cases or list(CASES)
+    unknown = sorted(set(names) - set(CASES))
+    if unknown:
+        raise ValueError(f"Unknown cases: {', '.join(unknown)}")
+
+    results = []
+    seeded = 0
+    for size in sorted(sizes):
+        started = time.monotonic()
+        seed(size, seeded, programs, images_per_university)
+        seeded = size
+        log(f'Seeded {size} universities in {time.monotonic() - started:.1f}s')
+
+        for name in names:
+            prepare, settings = CASES[name]
+            get_cache().clear()
+            with override_settings(**settings):
+                result = {'case': name, 'size': size, **measure(prepare(size), repeat, warmup)}
+            results.append(result)
+            log(
+                f"  {name:<22} {result['queries']:>3} queries  p50 {result['p50_ms']:>8.2f} ms  "
+                f"p95 {result['p95_ms']:>8.2f} ms  peak {result['peak_kib']:>9.1f} KiB"
+            )
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def metadata(repeat, warmup):
+    """Describe the environment a run was taken in."""
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'warmup': warmup,
+    }
+
+
+def save(path, meta, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, ensure_ascii=False)
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compare results with a baseline run.
+
+    A case regresses when its p50 grows by more than `threshold` (a
+    fraction) or it issues more queries than in the baseline.
+
+    Returns:
+        tuple: (rows for display, list of regressed (case, size) pairs)
+    """
+    previous = {(row['case'], row['size']): row for row in baseline['results']}
+    rows, regressions = [], []
+    for result in results:
+        before = previous.get((result['case'], result['size']))
+        if before is None:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0.0
+        regressed = change > threshold or result['queries'] > before['queries']
+        if regressed:
+            regressions.append((result['case'], result['size']))
+        rows.append({
+            'case': result['case'],
+            'size': result['size'],
+            'p50_before': before['p50_ms'],
+            'p50_after': result['p50_ms'],
+            'change': change,
+            'queries_before': before['queries'],
+            'queries_after': result['queries'],
+            'regressed': regressed,
+        })
+    return rows, regressions
@@ -0,0 +1,47 @@
+"""
+Benchmark Suite Tests
+
+Smoke tests keeping the benchmark cases runnable as the views evolve.
+"""
+
+from django.test import TestCase
+
+from . import runner
+from .cases import CASES
+
+
+class BenchmarkRunnerTests(TestCase):
+    """Tests for the benchmark runner."""
+
+    def test_every_case_runs(self):
+        """Test that every case runs against a tiny synthetic catalog."""
+        results = runner.run([5], repeat=1, warmup=0, programs=5, images_per_university=1, log=lambda line: None)
+        self.assertEqual([result['case'] for result in results], list(CASES))
+        for result in results:
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertGreater(result['peak_kib'], 0)
+        self.assertEqual(next(r for r in results if r['case'] == 'cached.list')['queries'], 0)
+
+    def test_compare_flags_regressions(self):
+        """Test that slower or chattier cases are reported as regressions."""
+        baseline = {'meta': {}, 'results': [
+            {'case': 'view.list', 'size': 100, 'p50_ms': 10.0, 'queries': 3},
+            {'case': 'view.detail', 'size': 100, 'p50_ms': 10.0, 'queries': 3},
+            {'case': 'view.facets', 'size': 100, 'p50_ms': 10.0, 'queries': 3},
+        ]}
+        results = [
+            {'case': 'view.list', 'size': 100, 'p50_ms': 13.0, 'queries': 3},
+            {'case': 'view.detail', 'size': 100, 'p50_ms': 10.5, 'queries': 4},
+            {'case': 'view.facets', 'size': 100, 'p50_ms': 11.0, 'queries': 3},
+            {'case': 'view.list', 'size': 1000, 'p50_ms': 50.0, 'queries': 3},
+        ]
+        rows, regressions = runner.compare(results, baseline, threshold=0.2)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(regressions, [('view.list', 100), ('view.detail', 100)])
+
+    def test_percentile(self):
+        """Test the nearest-rank percentile."""
+        values = list(range(1, 101))
+        self.assertEqual(runner.percentile(values, 50), 50)
+        self.assertEqual(runner.percentile(values, 95), 95)
+        self.assertEqual(runner.percentile([7], 95), 7)
@@ -0,0 +1,25 @@
+"""
+ASGI config for UniHub project.
+
+Served with `gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker`.
+The AI endpoints use the async views (AI_ASYNC_VIEWS), so the requests
+waiting for the model share a worker's event loop while the catalog views
+run on threads. Event streams are cancelled when their client
+disconnects (config.handlers). Database connections are pooled rather
+than kept per thread, as each request's sync code gets a thread of its own.
+"""
+
+import os
+
+import django
+
+from config.handlers import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('AI_ASYNC_VIEWS', 'True')
+# No persistent per-thread connections (see DB_CONN_MAX_AGE in settings)
+os.environ['DJANGO_ASGI'] = 'True'
+
+# As get_asgi_application(), with the project's handler
+django.setup(set_prefix=False)
+application = ASGIHandler()
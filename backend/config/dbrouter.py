@@ -0,0 +1,163 @@
+"""
+Read replica routing.
+
+With DATABASE_REPLICA_URL set, ReplicaRouter sends the reads of safe
+requests (GET, HEAD, OPTIONS) to the `replica` database and everything
+else to `default`. Views can override the choice with a `replica_reads`
+class attribute: True for read-only POST endpoints, False for GET
+endpoints that must see the latest writes.
+
+Reads stay on the primary:
+
+- outside requests (management commands, background threads),
+- inside transactions on the primary, which must see their own writes,
+- for the rest of a request once it has written,
+- for DATABASE_REPLICA_STICKY_SECONDS after a client's request wrote
+  (a cookie), so that an admin sees their change on the next page even if
+  the replica lags behind,
+- inside primary_reads() blocks, for reads whose results are shared, such
+  as cache fills right after the catalog changed (universities.caching).
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestState:
+    """Where the reads of the current request go."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.alias = None
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replica_alias():
+    return 'replica' if 'replica' in settings.DATABASES else None
+
+
+def pinned_by_cookie(request):
+    """Whether the client wrote recently enough to read from the primary."""
+    try:
+        until = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    # Bounded, so a forged cookie cannot pin a client for longer
+    return 0 < until - time.time() <= settings.DATABASE_REPLICA_STICKY_SECONDS
+
+
+def view_replica_reads(view_func, method):
+    """Whether a view's reads may go to the replica for a request method."""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', view_func)
+    replica_reads = getattr(view_class, 'replica_reads', None)
+    if replica_reads is None:
+        return method in SAFE_METHODS
+    return replica_reads
+
+
+@contextmanager
+def primary_reads():
+    """Send the reads of the current request inside the block to the primary."""
+    state = _state.get()
+    if state is None or state.alias is None:
+        yield
+        return
+    alias, state.alias = state.alias, None
+    try:
+        yield
+    finally:
+        state.alias = alias
+
+
+class ReplicaRouter:
+    """Route the reads of replica-safe requests to the replica."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.alias is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication
+        return False if db == replica_alias() else None
+
+
+class ReplicaRoutingMiddleware:
+    """Choose the database of a request's reads, and pin writing clients."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if replica_alias() is None:
+            return self.get_response(request)
+
+        state = RequestState(pinned_by_cookie(request))
+        _state.set(state)
+        response = self.get_response(request)
+        self.pin(state, response)
+        return response
+
+    async def __acall__(self, request):
+        if replica_alias() is None:
+            return await self.get_response(request)
+
+        # The async ORM runs queries in a copy of this context, so the router sees the state
+        state = RequestState(pinned_by_cookie(request))
+        _state.set(state)
+        response = await self.get_response(request)
+        self.pin(state, response)
+        return response
+
+    def pin(self, state, response):
+        if state.wrote:
+            sticky = settings.DATABASE_REPLICA_STICKY_SECONDS
+            response.set_cookie(PIN_COOKIE, f'{time.time() + sticky:.3f}', max_age=sticky, httponly=True, samesite='Lax')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None and not state.pinned and view_replica_reads(view_func, request.method):
+            state.alias = replica_alias()
+
+
+@receiver(request_finished)
+def _request_finished(sender, **kwargs):
+    # After streaming responses are consumed, which read on the request's database
+    _state.set(None)
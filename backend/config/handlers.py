@@ -0,0 +1,75 @@
+"""
+ASGI handler letting event streams stop when their client disconnects.
+
+Django 4.2 stops reading from an ASGI connection once it has the request
+body, so it never learns that the client went away, and servers such as
+uvicorn silently drop what is sent afterwards: a Server-Sent Events
+response would keep the model generating tokens nobody reads. This
+handler makes the connection's `receive` available to the request, and
+until_disconnect() wraps a response's async iterator so that it ends as
+soon as the client's disconnect arrives, closing the iterator it wraps
+and with it the request to the model (Django 5.0 does the same for every
+response). Only the public ASGI interface of Django's handler is used.
+"""
+
+import asyncio
+from contextvars import ContextVar
+
+from django.core.handlers import asgi
+
+
+_receive = ContextVar('asgi_receive', default=None)
+
+
+async def wait_for_disconnect(receive):
+    # The request body has been read, so the next message is the disconnect
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def until_disconnect(iterator):
+    """
+    Yield from the async `iterator` until the client disconnects.
+
+    On a disconnect the pending step of `iterator` is cancelled, which runs
+    its cleanup, and nothing more is yielded. Outside requests served by
+    ASGIHandler it is passed through unchanged.
+    """
+    receive = _receive.get()
+    if receive is None:
+        async for item in iterator:
+            yield item
+        return
+
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    step = None
+    try:
+        while True:
+            step = asyncio.ensure_future(iterator.__anext__())
+            await asyncio.wait([step, disconnect], return_when=asyncio.FIRST_COMPLETED)
+            if not step.done():
+                return  # Disconnected; the step is cancelled below
+            try:
+                item = step.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        disconnect.cancel()
+        if step is not None and not step.done():
+            step.cancel()
+            try:
+                await step
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        if hasattr(iterator, 'aclose'):
+            await iterator.aclose()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    async def __call__(self, scope, receive, send):
+        token = _receive.set(receive)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _receive.reset(token)
@@ -0,0 +1,182 @@
+"""
+Media storage under content-hashed names, and the view serving it.
+
+HashedFileSystemStorage names every saved file after the SHA-256 of its
+content, inside the directory the field uploads to
+(`universities/logos/3f9ac2...e1.png`). Identical uploads share one file,
+and a name never changes content, so responses for hashed names are
+cacheable for a year as immutable. Files saved before (or by another
+storage) keep their names and are revalidated with ETag/Last-Modified.
+
+serve_media answers conditional and single-range requests itself. With
+MEDIA_ACCEL_REDIRECT set it only checks the path and hands the transfer
+to nginx (X-Accel-Redirect), which then serves the file with sendfile and
+its own Range support, without holding a gunicorn worker.
+"""
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+
+HASH_LENGTH = 32
+HASHED_NAME = re.compile(rf'(?:^|/)[0-9a-f]{{{HASH_LENGTH}}}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage naming files by content and deduplicating them."""
+
+    # Several rows may point to one file, so callers must not delete files
+    # they believe to be their own
+    deduplicates = True
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest.hexdigest()[:HASH_LENGTH] + extension)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME.search(name))
+
+
+def _etag(name, stat):
+    if is_hashed(name):
+        return quote_etag(posixpath.basename(name).split('.')[0])
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header, size):
+    """
+    The (start, end) byte positions of a single-range Range header.
+
+    Returns:
+        tuple or None: None to send the whole file (no header, or one that
+        is malformed or asks for several ranges)
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, separator, last = header[len('bytes='):].strip().partition('-')
+    if not separator or not (first or last) or not (first or '0').isdigit() or not (last or '0').isdigit():
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError('empty suffix range')
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('range starts past the end of the file')
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file under MEDIA_ROOT with caching headers and Range support."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Not found')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found')
+
+    etag = _etag(path, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+        'Cache-Control': IMMUTABLE if is_hashed(path) else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        'Accept-Ranges': 'bytes',
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header in ('ETag', 'Last-Modified', 'Cache-Control'):
+            response[header] = headers[header]
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx serves the file, ranges included, from its internal location
+        response = HttpResponse(content_type=content_type)
+        # nginx reads a URI: legacy names may hold spaces, `%`, `?` or non-ASCII letters
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT.rstrip('/') + '/' + quote(path.lstrip('/'))
+        response['Cache-Control'] = headers['Cache-Control']
+        return response
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range.strip() in (etag, headers['Last-Modified']):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,243 @@
+"""
+In-process PostgreSQL connection pool (Django database backend).
+
+Django 4.2 either opens a connection per request or keeps one per thread
+(CONN_MAX_AGE). With `ENGINE: 'config.pgpool'` connections are instead
+borrowed from a per-process pool when a thread first queries and given
+back when Django closes them (at the end of every request, as CONN_MAX_AGE
+is 0), so a few connections serve every thread of a worker. The options
+follow psycopg_pool and Django 5.1's OPTIONS['pool']:
+
+    'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10, 'max_idle': 300,
+                         'max_lifetime': 3600, 'timeout': 10}}
+
+min_size connections are opened with the pool and never expire while
+idle; extra ones are closed after max_idle seconds unused, and any
+connection max_lifetime seconds after it was opened. A thread finding
+every connection in use waits up to `timeout` seconds, then gets
+PoolTimeout. Connections idle for more than CHECK_IDLE_AFTER seconds
+are pinged before being handed out, and connections returned inside a
+transaction are rolled back.
+
+pool_stats() reports sizes and counters per database alias.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+CHECK_IDLE_AFTER = 30
+DEFAULTS = {'min_size': 0, 'max_size': 10, 'max_idle': 600, 'max_lifetime': 3600, 'timeout': 30}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of DB-API connections.
+
+    Args:
+        connect: Callable opening a new connection
+        check: Callable raising if an idle connection is no longer usable
+        reset: Callable preparing a returned connection for the next user;
+            raising discards the connection
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, max_idle=600, max_lifetime=3600, timeout=30,
+                 check=None, reset=None):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1')
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check = check
+        self.reset = reset
+        self.pid = os.getpid()
+
+        self._condition = threading.Condition()
+        self._idle = deque()  # (connection, opened at, returned at), most recently returned last
+        self._opened_at = {}  # id(connection) -> opened at, for connections in use
+        self._size = 0  # Idle, in use and being opened
+        self._waiting = 0
+        self.counters = dict.fromkeys(
+            ('opened', 'closed', 'lost', 'checkouts', 'waits', 'timeouts', 'wait_ms'), 0,
+        )
+
+    def fill(self):
+        """Open connections up to min_size."""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            connection, opened_at = self._open()
+            self._give_back(connection, opened_at)
+
+    def getconn(self):
+        """
+        Borrow a connection, opening one if none is idle and the pool is not full.
+
+        Raises:
+            PoolTimeout: If every connection stays in use for `timeout` seconds
+        """
+        deadline = time.monotonic() + self.timeout
+        waited_since = None
+        while True:
+            entry = None
+            with self._condition:
+                self._expire()
+                if self._idle:
+                    entry = self._idle.pop()  # Warmest first, so surplus ones can idle out
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self.counters['waits'] += 1
+                    if remaining <= 0:
+                        self.counters['timeouts'] += 1
+                        raise PoolTimeout(f'No connection available within {self.timeout}s ({self.max_size} in use)')
+                    self._waiting += 1
+                    self._condition.wait(remaining)
+                    self._waiting -= 1
+                    continue
+                self.counters['checkouts'] += 1
+                if waited_since is not None:
+                    self.counters['wait_ms'] += round((time.monotonic() - waited_since) * 1000)
+
+            if entry is None:
+                connection, opened_at = self._open()
+            else:
+                connection, opened_at, returned_at = entry
+                if self.check is not None and time.monotonic() - returned_at > CHECK_IDLE_AFTER:
+                    try:
+                        self.check(connection)
+                    except Exception:
+                        logger.info('Discarding a pooled connection that failed its check')
+                        self._discard(connection, lost=True)
+                        continue
+            with self._condition:
+                self._opened_at[id(connection)] = opened_at
+            return connection
+
+    def putconn(self, connection, broken=False):
+        """Give a borrowed connection back; broken ones are closed instead."""
+        with self._condition:
+            opened_at = self._opened_at.pop(id(connection))
+        if not broken and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                broken = True
+        if broken or time.monotonic() - opened_at > self.max_lifetime:
+            self._discard(connection, lost=broken)
+        else:
+            self._give_back(connection, opened_at)
+
+    def close(self):
+        """Close the idle connections; connections in use are closed when given back."""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+            self.min_size = self.max_lifetime = 0
+        for connection, _opened_at, _returned_at in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._opened_at),
+                'waiting': self._waiting,
+                **self.counters,
+            }
+
+    def _open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.counters['opened'] += 1
+        return connection, time.monotonic()
+
+    def _give_back(self, connection, opened_at):
+        with self._condition:
+            self._idle.append((connection, opened_at, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection, lost=False):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self.counters['lost' if lost else 'closed'] += 1
+            self._condition.notify()
+
+    def _expire(self):
+        # Called with the lock held; the oldest returned connections come first
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            connection, opened_at, returned_at = self._idle[0]
+            if now - returned_at <= self.max_idle and now - opened_at <= self.max_lifetime:
+                break
+            self._idle.popleft()
+            try:
+                connection.close()
+            except Exception:
+                pass
+            self._size -= 1
+            self.counters['closed'] += 1
+
+
+def get_pool(alias, connect, options, check=None, reset=None):
+    """The pool of a database alias in this process, created on first use."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            # A forked worker must not share its parent's sockets
+            pool = _pools[alias] = ConnectionPool(connect, check=check, reset=reset, **{**DEFAULTS, **options})
+            created = True
+        else:
+            created = False
+    if created:
+        pool.fill()
+    return pool
+
+
+def pool_stats(alias=None):
+    """Stats of the pools of this process, or of one alias (None if it has none)."""
+    if alias is not None:
+        pool = _pools.get(alias)
+        return pool.stats() if pool is not None and pool.pid == os.getpid() else None
+    return {alias: pool.stats() for alias, pool in _pools.items() if pool.pid == os.getpid()}
+
+
+def close_pools():
+    """Close the idle connections of every pool of this process."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,42 @@
+"""PostgreSQL backend borrowing its connections from config.pgpool."""
+
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from . import get_pool
+
+
+def check(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def reset(connection):
+    if connection.closed:
+        raise ValueError('connection is closed')
+    if connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS'].get('pool') or {}
+        connect = super().get_new_connection
+        self._pool = get_pool(self.alias, lambda: connect(conn_params), options, check=check, reset=reset)
+        return self._pool.getconn()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # Closed inside an atomic block, the connection stays referenced
+            # by this wrapper until the block exits, so it cannot be shared
+            broken = self.in_atomic_block or bool(self.connection.closed)
+            self._pool.putconn(self.connection, broken=broken)
@@ -0,0 +1,165 @@
+"""
+Per-request SQL query budgets and N+1 detection.
+
+Views declare how many queries a request may issue with a `query_budget`
+class attribute: an int for every action, or a dict keyed by viewset
+action / HTTP method name (`{'list': 3, 'retrieve': 3}`, `{'post': 1}`).
+QueryBudgetMiddleware counts the queries of every request, together with
+how often each query shape (the SQL with its parameters left out) repeats,
+and reports requests over their budget or repeating a shape more than
+QUERY_DUPLICATE_LIMIT times, the signature of an N+1 loop.
+
+QUERY_BUDGET_MODE selects what happens: 'off', 'log' (a warning, and an
+X-Query-Count header) or 'raise' (QueryBudgetExceeded). The test runner
+(config.testrunner) switches to 'raise', so the test suite enforces the budgets.
+Queries issued while a streaming response is consumed are not counted.
+
+Under ASGI each request's sync code runs on a thread of its own, with its
+own connections, so the queries are counted there: process_view installs
+the counter on the connections of that thread, where the view runs next.
+Async views are not checked, as their queries run on whichever thread
+sync_to_async picks.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """A request issued more queries than its view allows."""
+
+
+def query_shape(sql):
+    """The SQL with IN lists of any length folded together."""
+    return _SPACE.sub(' ', _IN_LIST.sub('(%s...)', sql)).strip()
+
+
+class QueryLog:
+    """Queries executed on every database connection while capturing."""
+
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def duplicates(self, limit):
+        """Shapes executed more than `limit` times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+@contextmanager
+def capture_queries():
+    """
+    Count the queries run inside the block on every database connection.
+
+    Yields:
+        QueryLog: Filled in as queries run
+    """
+    log = QueryLog()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(log))
+        yield log
+
+
+def view_budget(view_func, method):
+    """
+    The query budget a view declares for a request method, or None.
+
+    Understands DRF views (APIView.as_view and ViewSet.as_view functions,
+    which carry the view class and the method -> action mapping) and
+    Django class-based views.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if not isinstance(budget, dict):
+        return budget
+    method = method.lower()
+    action = (getattr(view_func, 'actions', None) or {}).get(method, method)
+    return budget.get(action)
+
+
+def budget_violations(log, budget, duplicate_limit):
+    """Human-readable descriptions of everything wrong with a query log."""
+    problems = []
+    if budget is not None and log.count > budget:
+        problems.append(f'{log.count} queries (budget {budget})')
+    for shape, count in log.duplicates(duplicate_limit):
+        problems.append(f'{count}x {shape[:300]}')
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """Enforce view query budgets and flag repeated query shapes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return self.get_response(request)
+
+        request.query_budget = None
+        with capture_queries() as log:
+            response = self.get_response(request)
+        return self.check(request, response, log)
+
+    async def __acall__(self, request):
+        if settings.QUERY_BUDGET_MODE == 'off':
+            return await self.get_response(request)
+
+        request.query_budget = None
+        request.query_capture = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if request.query_capture is not None:
+                stack, log = request.query_capture
+                await sync_to_async(stack.close, thread_sensitive=True)()
+        if request.query_capture is None:
+            return response  # An async view, or no view at all
+        return self.check(request, response, log)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = view_budget(view_func, request.method)
+        if iscoroutinefunction(self) and settings.QUERY_BUDGET_MODE != 'off' and not iscoroutinefunction(view_func):
+            # Called on the request's thread, where the sync view runs next
+            stack = ExitStack()
+            request.query_capture = stack, stack.enter_context(capture_queries())
+
+    def check(self, request, response, log):
+        """Report the queries of a request over its budget; returns the response."""
+        response['X-Query-Count'] = str(log.count)
+        problems = budget_violations(log, request.query_budget, settings.QUERY_DUPLICATE_LIMIT)
+        if problems:
+            message = f"{request.method} {request.path}: " + '; '.join(problems)
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning('Query budget exceeded: %s', message)
+        return response
+
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Full-text and trigram search lookups
     'rest_framework',
     'corsheaders',
     'universities',
@@ -30,9 +31,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.querybudget.QueryBudgetMiddleware',  # Outermost, to count every query
+    'config.dbrouter.ReplicaRoutingMiddleware',  # Before anything reads the database
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Serve static files with gunicorn
+    'config.static.WhiteNoiseMiddleware',  # Serve static files with gunicorn, also under ASGI
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -60,6 +63,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Serve the AI endpoints with the async views (ai.views), which hold no
+# thread while waiting for the model; config.asgi turns this on by default
+AI_ASYNC_VIEWS = os.environ.get('AI_ASYNC_VIEWS', 'False') == 'True'
 
 # Database configuration
 # Supports DATABASE_URL (Render, Heroku) or individual env vars (Docker Compose)
@@ -68,11 +76,7 @@ DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
     # Use DATABASE_URL if provided (Render, Heroku, etc.)
     DATABASES = {
-        'default': dj_database_url.config(
-            default=DATABASE_URL,
-            conn_max_age=600,
-            conn_health_checks=True,
-        )
+        'default': dj_database_url.config(default=DATABASE_URL)
     }
 else:
     # Fall back to individual environment variables (Docker Compose)
@@ -87,6 +91,51 @@ else:
         }
     }
 
+# Optional read replica: the reads of safe API requests go to it (see config.dbrouter)
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(DATABASE_REPLICA_URL)
+    # Tests read the test database through both aliases
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['config.dbrouter.ReplicaRouter']
+
+# Connection reuse for every database: persistent connections kept for
+# DB_CONN_MAX_AGE seconds and checked before reuse, or with DB_POOL a
+# per-process pool shared by all threads (see config.pgpool).
+# Set by config.asgi. Django runs each ASGI request's sync code on a thread
+# of its own, and connections belong to a thread, so a persistent connection
+# would serve one request and then idle until garbage collected: under ASGI
+# connections are closed after each request, and pooled unless DB_POOL=False.
+DJANGO_ASGI = os.environ.get('DJANGO_ASGI', 'False') == 'True'
+DB_CONN_MAX_AGE = 0 if DJANGO_ASGI else int(os.environ.get('DB_CONN_MAX_AGE', '600'))  # 0 closes them after each request
+DB_POOL = os.environ.get('DB_POOL', str(DJANGO_ASGI)) == 'True'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+    'max_idle': int(os.environ.get('DB_POOL_MAX_IDLE', '300')),  # Seconds before surplus idle ones close
+    'max_lifetime': int(os.environ.get('DB_POOL_MAX_LIFETIME', '3600')),
+    'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),  # Seconds to wait for a free connection
+}
+# Behind pgbouncer in transaction pooling mode, which cannot keep server-side
+# cursors open across transactions, so they are disabled. QuerySet.iterator()
+# then fetches the whole result at once; exports and columnar snapshots read
+# in keyset chunks instead (universities.export.chunks). Set the database's
+# TimeZone to UTC so that Django never needs a session-level SET.
+DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'False') == 'True'
+for _database in DATABASES.values():
+    _database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    _database['CONN_HEALTH_CHECKS'] = True
+    if _database['ENGINE'] != 'django.db.backends.postgresql':
+        continue
+    if DB_POOL:
+        _database['ENGINE'] = 'config.pgpool'
+        _database['CONN_MAX_AGE'] = 0  # Given back to the pool at the end of each request
+        _database.setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+    if DB_PGBOUNCER:
+        _database['DISABLE_SERVER_SIDE_CURSORS'] = True
+# Seconds a client reads from the primary after a write; above the replication lag
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', '10'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -105,9 +154,84 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads named by a hash of their content and deduplicated (see config.media)
+MEDIA_HASHED_NAMES = os.environ.get('MEDIA_HASHED_NAMES', 'True') == 'True'
+if MEDIA_HASHED_NAMES:
+    DEFAULT_FILE_STORAGE = 'config.media.HashedFileSystemStorage'
+# Cache lifetime of media without a hashed name (seconds); hashed ones are immutable
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', '3600'))
+# nginx internal location serving MEDIA_ROOT, e.g. '/protected-media/'; empty serves from Django
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+
+# Resized logo and gallery copies (see universities.images)
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '160,320,640,1280').split(',')]
+# Best first; 'avif' needs a Pillow build with AVIF support
+IMAGE_DERIVATIVE_FORMATS = os.environ.get('IMAGE_DERIVATIVE_FORMATS', 'webp,jpeg').split(',')
+IMAGE_DERIVATIVES_MODE = os.environ.get('IMAGE_DERIVATIVES_MODE', 'thread')  # 'thread', 'sync' or 'off'
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', '2'))  # Threads per web process
+
+# Parquet/Arrow catalog snapshots for analytics (see universities.columnar)
+CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', str(BASE_DIR / 'snapshots'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Query budgets (see config.querybudget): 'off', 'log' or 'raise'.
+# The test runner raises, so every test request is held to its view's budget.
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'log' if DEBUG else 'off')
+QUERY_DUPLICATE_LIMIT = int(os.environ.get('QUERY_DUPLICATE_LIMIT', '3'))  # Repeats of one query shape
+TEST_RUNNER = 'config.testrunner.QueryBudgetTestRunner'
+
+# Catalog response cache (see universities.caching)
+# Per-process locmem by default. With several workers set CATALOG_CACHE_URL to a
+# shared backend so an admin edit invalidates every worker at once:
+#   redis://redis:6379/1         Redis (production)
+#   file:///tmp/unihub-cache     file-based, shared by workers on one host
+CATALOG_CACHE_URL = os.environ.get('CATALOG_CACHE_URL', '')
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', '300'))  # Seconds, 0 disables
+
+# Chat answer cache (see ai.services.cache), configured like the catalog cache.
+# Locmem culls the least recently read answers past AI_CACHE_MAX_ENTRIES.
+AI_CACHE_URL = os.environ.get('AI_CACHE_URL', '')
+AI_CACHE_ALIAS = 'ai'
+AI_CACHE_TTL = int(os.environ.get('AI_CACHE_TTL', '3600'))  # Seconds, 0 disables
+AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', '1000'))
+# Its hit/miss counters, on the same backend but apart from the culled answers
+AI_STATS_CACHE_ALIAS = 'ai-stats'
+
+
+def _cache_backend(url, location, max_entries):
+    if url.startswith(('redis://', 'rediss://')):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+        }
+    if url.startswith('file://'):
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': url[len('file://'):],
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': location,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    CATALOG_CACHE_ALIAS: _cache_backend(CATALOG_CACHE_URL, 'unihub-catalog', 5000),
+    AI_CACHE_ALIAS: _cache_backend(AI_CACHE_URL, 'unihub-ai', AI_CACHE_MAX_ENTRIES),
+    AI_STATS_CACHE_ALIAS: _cache_backend(
+        # File-based caches cull their whole directory, so the counters get another one
+        AI_CACHE_URL.rstrip('/') + '-stats' if AI_CACHE_URL.startswith('file://') else AI_CACHE_URL,
+        'unihub-ai-stats',
+        100,
+    ),
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
@@ -0,0 +1,22 @@
+"""
+Test runner of the project.
+
+Switches QUERY_BUDGET_MODE to 'raise' for the whole run, so every test
+request is held to its view's query budget (see config.querybudget).
+"""
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """Test runner failing every request that breaks its query budget."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.query_budget_override = override_settings(QUERY_BUDGET_MODE='raise')
+        self.query_budget_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.query_budget_override.disable()
+        super().teardown_test_environment(**kwargs)
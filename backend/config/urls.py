@@ -5,17 +5,20 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
+from config.media import serve_media
+from config.views import get_database_stats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('universities.urls')),
     path('api/ai/', include('ai.urls')),  # AI endpoints for chatbot and comparison summaries
+    path('api/db-stats/', get_database_stats, name='db-stats'),  # Connection and pool metrics (staff only)
 ]
 
-# Serve media files (works with gunicorn unlike static() helper)
+# Serve media files (works with gunicorn unlike static() helper), with
+# caching headers and Range support, or through nginx (MEDIA_ACCEL_REDIRECT)
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 ]
 
 if settings.DEBUG:
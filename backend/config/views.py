@@ -0,0 +1,27 @@
+"""Project-level API views."""
+
+from django.db import connections
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from .pgpool import pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_database_stats(request):
+    """
+    Returns the connection settings of every database and, with DB_POOL,
+    the pool sizes and counters of the worker answering (staff only).
+    """
+    return Response({
+        alias: {
+            'engine': connections[alias].settings_dict['ENGINE'],
+            'conn_max_age': connections[alias].settings_dict['CONN_MAX_AGE'],
+            'health_checks': connections[alias].settings_dict['CONN_HEALTH_CHECKS'],
+            'server_side_cursors': not connections[alias].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False),
+            'pool': pool_stats(alias),
+        }
+        for alias in connections
+    })
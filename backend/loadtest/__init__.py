@@ -0,0 +1,22 @@
+"""
+Load tests replaying the frontend's traffic against a running server.
+
+Start the fake LLM, then the server pointed at it, then the load:
+
+    python -m loadtest.fake_llm --port 8089 --latency-ms 800
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake \\
+        gunicorn config.wsgi:application --workers 4
+    python -m loadtest --base-url http://127.0.0.1:8000 --concurrency 50 --duration 120
+
+To see whether chats waiting for the model slow the catalog down, compare
+a chat-heavy mix against the WSGI server above and the ASGI one, whose
+async AI views hold no worker while waiting:
+
+    gunicorn config.asgi:application --workers 4 -k uvicorn.workers.UvicornWorker
+    python -m loadtest --mix home=50,chat=50 --concurrency 100 --slo "GET *:p95=200"
+
+Throughput and latency percentiles are reported per endpoint, and the run
+exits with status 1 when an SLO (--slo) is missed, so worker and database
+settings can be compared with numbers. Only the standard library is used:
+the load generator does not need Django or the project's dependencies.
+"""
@@ -0,0 +1,99 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+from . import runner
+from .scenarios import DEFAULT_MIX, JOURNEYS, parse_mix
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description='Replay frontend traffic with SLO checks')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server under test')
+    parser.add_argument('--concurrency', type=int, default=10, help='Simulated users')
+    parser.add_argument('--duration', type=float, default=60, help='Recorded seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='Unrecorded seconds before the run')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between journeys in seconds; 0 for none')
+    parser.add_argument(
+        '--mix',
+        default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+        help=f"Journey weights, e.g. home=50,details=50 (journeys: {', '.join(JOURNEYS)})",
+    )
+    parser.add_argument(
+        '--slo',
+        action='append',
+        help='PATTERN:METRIC=VALUE, e.g. "GET /api/universities/{id}/:p95=200" or "total:rps=100"; repeatable. '
+             f"Default: {' '.join(runner.DEFAULT_SLOS)}",
+    )
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--max-ids', type=int, default=1000, help='Universities to discover for detail journeys')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible journey choices')
+    parser.add_argument('--output', help='Write the full report as JSON')
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error('--concurrency must be positive')
+    if args.duration <= 0 or args.warmup < 0 or args.think_time < 0:
+        parser.error('--duration must be positive and --warmup/--think-time not negative')
+    try:
+        args.mix = parse_mix(args.mix)
+        args.slos = [runner.parse_slo(spec) for spec in (args.slo or runner.DEFAULT_SLOS)]
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def print_report(report):
+    columns = ['requests', 'errors', 'rps', 'p50', 'p90', 'p95', 'p99', 'max']
+    width = max(len(label) for label in [*report['endpoints'], 'total'])
+    print(f"\n{'endpoint':<{width}}  " + '  '.join(f'{column:>8}' for column in columns))
+    for label, stats in [*report['endpoints'].items(), ('total', report['total'])]:
+        print(f'{label:<{width}}  ' + '  '.join(f'{stats[column]:>8}' for column in columns))
+    print('Latencies in ms. Journeys: ' + ', '.join(f'{name} {count}' for name, count in report['journeys'].items()))
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    try:
+        report = runner.run(
+            args.base_url,
+            args.mix,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            think_time=args.think_time,
+            timeout=args.timeout,
+            seed=args.seed,
+            max_ids=args.max_ids,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    print_report(report)
+    checks = runner.check_slos(report, args.slos)
+    failed = [check for check in checks if not check['passed']]
+    for check in failed:
+        print(f"SLO missed: {check['endpoint']} {check['metric']} {check['actual']} (limit {check['limit']:g})")
+    print(f'{len(checks) - len(failed)}/{len(checks)} SLO checks passed')
+
+    if args.output:
+        meta = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'think_time': args.think_time,
+            'mix': args.mix,
+            'python': platform.python_version(),
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, **report, 'slos': checks}, f, indent=2, ensure_ascii=False)
+        print(f'Report written to {args.output}')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers POST /v1/chat/completions after a configurable delay with a canned
+reply, in the regular or the streaming (server-sent events) format, so
+load tests exercise the AI endpoints without network access or cost.
+Point the backend at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake
+
+Run standalone with `python -m loadtest.fake_llm --port 8089 --latency-ms 800`.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+REPLY = (
+    '## Сравнение\n'
+    '- **Университет А**: сильные инженерные программы, общежитие.\n'
+    '- **Университет Б**: доступная стоимость и гранты.\n\n'
+    'Рекомендация: выбирайте по приоритетам — стоимость, программы, город.'
+)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Keep load test output readable
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = {}
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        if self.server.failures:
+            status = self.server.failures.pop(0)
+            self.send_json(status, {'error': {'message': f'Fake failure {status}', 'type': 'server_error'}})
+            return
+        if body.get('stream'):
+            self.send_stream(body)
+        else:
+            self.send_json(200, completion(body))
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # The caller timed out
+
+    def send_stream(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        words = REPLY.split(' ')
+        try:
+            for index, word in enumerate(words):
+                delta = {'content': word if index == 0 else ' ' + word}
+                self.send_chunk(chunk(completion_id, body, delta, None))
+                time.sleep(self.server.token_delay)
+            self.send_chunk(chunk(completion_id, body, {}, 'stop'))
+            self.write_chunk(b'data: [DONE]\n\n')
+            self.write_chunk(b'')
+        except (BrokenPipeError, ConnectionResetError):
+            # The caller closed the stream: a cancelled generation
+            self.server.cancelled += 1
+            self.close_connection = True
+
+    def send_chunk(self, payload):
+        self.write_chunk(f'data: {json.dumps(payload, ensure_ascii=False)}\n\n'.encode('utf-8'))
+
+    def write_chunk(self, data):
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+def completion(body):
+    """A chat completion response in the OpenAI format."""
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'fake-llm'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': REPLY},
+            'finish_reason': 'stop',
+        }],
+        'usage': {'prompt_tokens': 100, 'completion_tokens': len(REPLY.split()), 'total_tokens': 100 + len(REPLY.split())},
+    }
+
+
+def chunk(completion_id, body, delta, finish_reason):
+    """One streamed chat completion chunk in the OpenAI format."""
+    return {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': body.get('model', 'fake-llm'),
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+    }
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    Threaded fake LLM server; `latency` and `token_delay` are in seconds.
+
+    `requests` counts completions asked for, `connections` the TCP
+    connections they came over and `cancelled` the streamed ones whose
+    caller disconnected before the end. Requests are answered with the
+    error statuses in `failures`, first to last, before succeeding.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # Many chats connect at once under load
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.5, token_delay=0.01):
+        super().__init__((host, port), FakeLLMHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.requests = 0
+        self.connections = 0
+        self.cancelled = 0
+        self.failures = []
+
+    def handle_error(self, request, client_address):
+        # The OpenAI SDK closes a stream at [DONE], before its final chunk is
+        # read, so the connection is reset; only other errors are reported
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        """Serve in a background thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loadtest.fake_llm', description='Fake OpenAI chat API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=int, default=800, help='Delay before the first byte of a reply')
+    parser.add_argument('--token-delay-ms', type=int, default=10, help='Delay between streamed chunks')
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer(args.host, args.port, args.latency_ms / 1000, args.token_delay_ms / 1000)
+    print(f'Fake LLM listening on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Closed-loop load generation, per-endpoint statistics and SLO checks.
+
+Every simulated user is a thread with its own keep-alive connection: it
+picks a journey from the mix, runs it, waits for its think time and starts
+over until the run ends. Requests completed during the warm-up are not
+recorded.
+"""
+
+import fnmatch
+import gzip
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .scenarios import JOURNEYS, Catalog
+
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Applied when no --slo is given; GET latencies assume the catalog caches are on
+DEFAULT_SLOS = (
+    '*:errors=0.01',
+    'GET *:p95=500',
+    'POST /api/ai/*:p95=5000',
+    'POST /api/ai/* (first token):p95=1500',
+)
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint label, for one simulated user."""
+
+    def __init__(self):
+        self.samples = {}
+        self.recording = False
+
+    def add(self, label, elapsed_ms, status):
+        if self.recording and label:
+            self.samples.setdefault(label, []).append((elapsed_ms, status))
+
+
+class Client:
+    """Minimal keep-alive HTTP client speaking JSON to the target server."""
+
+    def __init__(self, base_url, recorder=None, timeout=30.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported base URL: {base_url}')
+        self.base_url = base_url.rstrip('/')
+        self.prefix = parts.path.rstrip('/')
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.recorder = recorder or Recorder()
+        self.timeout = timeout
+        self.connection = None
+
+    def relative(self, url):
+        """An absolute URL returned by the server as a path for get(), relative to the base URL."""
+        parts = urlsplit(url)
+        path = parts.path
+        if self.prefix and (path == self.prefix or path.startswith(self.prefix + '/')):
+            path = path[len(self.prefix):]  # Added back by request()
+        return f'{path}?{parts.query}' if parts.query else path
+
+    def get(self, path, label, parse=False):
+        return self.request('GET', path, None, label, parse)
+
+    def post(self, path, payload, label, parse=False):
+        return self.request('POST', path, json.dumps(payload, ensure_ascii=False).encode('utf-8'), label, parse)
+
+    def request(self, method, path, body, label, parse):
+        """
+        Issue one request and record it under `label`.
+
+        Returns:
+            The decoded JSON body when `parse` is set, True otherwise; None
+            when the request failed
+        """
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            self.connection.request(method, self.prefix + path, body, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            self.recorder.add(label, (time.perf_counter() - started) * 1000, 0)
+            return None
+        self.recorder.add(label, (time.perf_counter() - started) * 1000, status)
+
+        if response.getheader('Connection', '').lower() == 'close':
+            self.close()
+        if status >= 400:
+            return None
+        if not parse:
+            return True
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return json.loads(data)
+
+    def stream(self, path, payload, label):
+        """
+        POST and read a Server-Sent Events response (ai.streaming) to its end.
+
+        The time to the first token is recorded under "`label` (first token)",
+        the whole request under `label`; a stream ending in an error event
+        counts as a failed request.
+
+        Returns:
+            str: The streamed text, or None when the request failed
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        headers = {'Accept': 'text/event-stream', 'Content-Type': 'application/json'}
+        started = time.perf_counter()
+        tokens = []
+        outcome = None
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            self.connection.request('POST', self.prefix + path, body, headers)
+            response = self.connection.getresponse()
+            status = response.status
+            if status >= 400:
+                response.read()
+                outcome = status
+            event = None
+            while outcome is None:
+                line = response.readline()
+                if not line:
+                    outcome = 0  # Ended without a done event
+                elif line.startswith(b'event: '):
+                    event = line[len('event: '):].strip().decode()
+                elif line.startswith(b'data: ') and event == 'token':
+                    if not tokens and label:
+                        self.recorder.add(f'{label} (first token)', (time.perf_counter() - started) * 1000, status)
+                    tokens.append(json.loads(line[len('data: '):])['content'])
+                elif line.startswith(b'data: ') and event in ('done', 'error'):
+                    outcome = status if event == 'done' else 0
+            if outcome == status:
+                response.read()  # The end of the chunked body, to reuse the connection
+            else:
+                self.close()
+        except (OSError, http.client.HTTPException, ValueError):
+            self.close()
+            outcome = 0
+        self.recorder.add(label, (time.perf_counter() - started) * 1000, outcome)
+        return ''.join(tokens) if 200 <= outcome < 400 else None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def summarize(samples, elapsed):
+    """Throughput, error rate and latency percentiles of a list of samples."""
+    latencies = [ms for ms, _status in samples]
+    errors = sum(1 for _ms, status in samples if not 200 <= status < 400)
+    statuses = {}
+    for _ms, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4),
+        'rps': round(len(samples) / elapsed, 2),
+        **{f'p{p}': round(percentile(latencies, p), 1) for p in PERCENTILES},
+        'max': round(max(latencies), 1),
+        'mean': round(sum(latencies) / len(latencies), 1),
+        'statuses': statuses,
+    }
+
+
+def run(base_url, mix, concurrency=10, duration=60.0, warmup=5.0, think_time=1.0,
+        timeout=30.0, seed=None, max_ids=1000, log=print):
+    """
+    Replay the journey mix against `base_url`.
+
+    Args:
+        mix: Journey name -> weight
+        think_time: Mean pause between journeys in seconds (exponential)
+
+    Returns:
+        dict: {'endpoints': {label: stats}, 'total': stats, 'journeys': {name: count}}
+
+    Raises:
+        ValueError: If the target server cannot be listed
+    """
+    catalog = Catalog.discover(Client(base_url, timeout=timeout), limit=max_ids)
+    log(f'Discovered {len(catalog.ids)} universities on {base_url}')
+
+    names = [name for name in mix if mix[name] > 0]
+    weights = [mix[name] for name in names]
+    seeds = random.Random(seed)
+    recorders = []
+    journeys = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def user(recorder, rng):
+        client = Client(base_url, recorder, timeout)
+        try:
+            while not stop.is_set():
+                name = rng.choices(names, weights)[0]
+                JOURNEYS[name](client, catalog, rng)
+                if recorder.recording:
+                    with lock:
+                        journeys[name] = journeys.get(name, 0) + 1
+                if think_time:
+                    stop.wait(rng.expovariate(1 / think_time))
+        finally:
+            client.close()
+
+    threads = []
+    for _ in range(concurrency):
+        recorder = Recorder()
+        recorders.append(recorder)
+        thread = threading.Thread(target=user, args=(recorder, random.Random(seeds.random())), daemon=True)
+        threads.append(thread)
+        thread.start()
+
+    time.sleep(warmup)
+    for recorder in recorders:
+        recorder.recording = True
+    started = time.monotonic()
+    log(f'Recording for {duration:g}s with {concurrency} users')
+    time.sleep(duration)
+    for recorder in recorders:
+        recorder.recording = False
+    elapsed = time.monotonic() - started
+    stop.set()
+    for thread in threads:
+        thread.join(timeout + think_time)
+
+    samples = {}
+    for recorder in recorders:
+        for label, entries in recorder.samples.items():
+            samples.setdefault(label, []).extend(entries)
+    if not samples:
+        raise ValueError('No requests completed during the run')
+
+    return {
+        'endpoints': {label: summarize(entries, elapsed) for label, entries in sorted(samples.items())},
+        'total': summarize([entry for entries in samples.values() for entry in entries], elapsed),
+        'journeys': dict(sorted(journeys.items())),
+        'elapsed': round(elapsed, 2),
+    }
+
+
+def parse_slo(spec):
+    """
+    Parse an SLO such as "GET /api/universities/{id}/:p95=200".
+
+    The part before the last colon is a label pattern (fnmatch syntax, or
+    `total` for all requests together). Metrics are p50/p90/p95/p99/max and
+    mean in milliseconds and `errors` as a fraction, all upper bounds, and
+    `rps` as a lower bound.
+
+    Raises:
+        ValueError: On malformed specifications
+    """
+    pattern, _, threshold = spec.rpartition(':')
+    metric, _, value = threshold.partition('=')
+    metric = metric.strip()
+    allowed = {f'p{p}' for p in PERCENTILES} | {'max', 'mean', 'errors', 'rps'}
+    if not pattern or metric not in allowed:
+        raise ValueError(f"Invalid SLO '{spec}': expected PATTERN:METRIC=VALUE with METRIC in {', '.join(sorted(allowed))}")
+    try:
+        return pattern.strip(), metric, float(value)
+    except ValueError:
+        raise ValueError(f"Invalid SLO '{spec}': {value!r} is not a number")
+
+
+def check_slos(report, slos):
+    """
+    Evaluate SLOs against a report.
+
+    Returns:
+        list: One dict per (SLO, matching endpoint) with its outcome
+    """
+    checks = []
+    for pattern, metric, limit in slos:
+        if pattern == 'total':
+            targets = [('total', report['total'])]
+        else:
+            targets = [(label, stats) for label, stats in report['endpoints'].items() if fnmatch.fnmatchcase(label, pattern)]
+        for label, stats in targets:
+            actual = stats['error_rate'] if metric == 'errors' else stats[metric]
+            passed = actual >= limit if metric == 'rps' else actual <= limit
+            checks.append({'endpoint': label, 'metric': metric, 'limit': limit, 'actual': actual, 'passed': passed})
+    return checks
@@ -0,0 +1,140 @@
+"""
+User journeys replaying the frontend's API traffic.
+
+Each journey issues the requests one page of the frontend makes, in the
+same order (see frontend/src/pages and services/api.js). Requests the
+browser sends in parallel (the Universities page) are issued back to back
+by one simulated user. Journeys are picked at random with the weights of
+the active mix.
+"""
+
+JOURNEYS = {}
+
+# Share of each journey in the default mix; override with --mix
+DEFAULT_MIX = {
+    'home': 25,
+    'universities': 25,
+    'details': 30,
+    'compare': 10,
+    'favorites': 5,
+    'chat': 5,
+}
+
+CHAT_MESSAGES = [
+    'Какие университеты в Алматы предлагают общежитие?',
+    'Сколько стоит обучение на IT специальностях?',
+    'What scholarships are available for engineering students?',
+    'Посоветуйте университет с высоким рейтингом и доступной стоимостью.',
+]
+
+
+def journey(name):
+    """Register a journey under `name`."""
+    def register(func):
+        JOURNEYS[name] = func
+        return func
+    return register
+
+
+@journey('home')
+def home(client, catalog, rng):
+    client.get('/api/universities/', label='GET /api/universities/')
+
+
+@journey('universities')
+def universities(client, catalog, rng):
+    client.get('/api/universities/', label='GET /api/universities/')
+    client.get('/api/programs/', label='GET /api/programs/')
+
+
+@journey('details')
+def details(client, catalog, rng):
+    client.get(f'/api/universities/{catalog.pick(rng)}/', label='GET /api/universities/{id}/')
+
+
+@journey('compare')
+def compare(client, catalog, rng):
+    ids = catalog.sample(rng, rng.randint(2, 4))
+    client.get(
+        f"/api/universities/bulk/?ids={','.join(map(str, ids))}&view=detail",
+        label='GET /api/universities/bulk/?view=detail',
+    )
+    client.stream('/api/ai/compare-summary/stream/', {'university_ids': ids}, label='POST /api/ai/compare-summary/stream/')
+
+
+@journey('favorites')
+def favorites(client, catalog, rng):
+    ids = catalog.sample(rng, rng.randint(1, 8))
+    client.get(f"/api/universities/bulk/?ids={','.join(map(str, ids))}", label='GET /api/universities/bulk/')
+
+
+@journey('chat')
+def chat(client, catalog, rng):
+    history = []
+    for _ in range(rng.randint(1, 3)):
+        message = rng.choice(CHAT_MESSAGES)
+        response = client.stream(
+            '/api/ai/chat/stream/',
+            {'message': message, 'conversation_history': history},
+            label='POST /api/ai/chat/stream/',
+        )
+        if response is None:
+            break
+        history += [
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': response},
+        ]
+
+
+def parse_mix(value):
+    """
+    Parse a journey mix such as "home=50,details=50".
+
+    Raises:
+        ValueError: On unknown journeys or non-positive totals
+    """
+    mix = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in JOURNEYS:
+            raise ValueError(f"Unknown journey '{name}' (choose from {', '.join(JOURNEYS)})")
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight for '{name}': {weight}")
+        if mix[name] < 0:
+            raise ValueError(f"Weight for '{name}' must not be negative")
+    if sum(mix.values()) <= 0:
+        raise ValueError('The mix needs at least one journey with a positive weight')
+    return mix
+
+
+class Catalog:
+    """University ids discovered on the target server."""
+
+    def __init__(self, ids):
+        if len(ids) < 2:
+            raise ValueError('The target catalog needs at least two universities')
+        self.ids = ids
+
+    @classmethod
+    def discover(cls, client, limit=1000):
+        """Walk the keyset-paginated listing until `limit` ids are known."""
+        ids = []
+        path = '/api/universities/?pagination=cursor'
+        while path and len(ids) < limit:
+            page = client.get(path, label=None, parse=True)
+            if page is None:
+                raise ValueError(f'Could not list universities on {client.base_url}')
+            ids += [university['id'] for university in page['results']]
+            path = client.relative(page['next']) if page['next'] else None
+        return cls(ids[:limit])
+
+    def pick(self, rng):
+        return rng.choice(self.ids)
+
+    def sample(self, rng, count):
+        return rng.sample(self.ids, min(count, len(self.ids)))
@@ -0,0 +1,159 @@
+"""
+Load Test Harness Tests
+
+Runs the journeys for a moment against a live test server whose AI
+endpoints talk to the fake LLM, so the harness keeps up with the API.
+"""
+
+import os
+import random
+from unittest.mock import patch
+
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+from openai import OpenAI
+
+from universities.bulk import CatalogWriter
+from universities.synthetic import program_rows, university_rows
+
+from . import runner
+from .fake_llm import REPLY, FakeLLMServer
+from .scenarios import JOURNEYS, Catalog, parse_mix
+
+
+class FakeLLMTests(SimpleTestCase):
+    """Tests for the fake OpenAI chat API."""
+
+    def setUp(self):
+        self.server = FakeLLMServer(latency=0, token_delay=0).start()
+        self.addCleanup(self.server.stop)
+        self.client = OpenAI(base_url=self.server.base_url, api_key='fake', max_retries=0)
+
+    def test_chat_completion(self):
+        """Test that the OpenAI SDK parses the canned completion."""
+        completion = self.client.chat.completions.create(
+            model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'Привет'}],
+        )
+        self.assertEqual(completion.choices[0].message.content, REPLY)
+        self.assertEqual(completion.model, 'gpt-4o-mini')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_streamed_chat_completion(self):
+        """Test that streamed chunks add up to the canned reply."""
+        stream = self.client.chat.completions.create(
+            model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'Привет'}], stream=True,
+        )
+        self.assertEqual(''.join(chunk.choices[0].delta.content or '' for chunk in stream), REPLY)
+
+
+# The live server threads share the in-memory SQLite connection, so per-request
+# query counts would mix concurrent requests
+@override_settings(QUERY_BUDGET_MODE='off')
+class LoadRunTests(LiveServerTestCase):
+    """Tests for a short run of every journey."""
+
+    def setUp(self):
+        self.llm = FakeLLMServer(latency=0.01, token_delay=0).start()
+        self.addCleanup(self.llm.stop)
+        writer = CatalogWriter()
+        writer.write_programs(program_rows(5))
+        writer.write_universities(university_rows(10, [row['code'] for row in program_rows(5)], 1))
+        writer.finish()
+        self.env = {'OPENAI_BASE_URL': self.llm.base_url, 'OPENAI_API_KEY': 'fake'}
+
+    def test_every_journey_runs(self):
+        """Test that every journey reaches its endpoints without errors."""
+        recorder = runner.Recorder()
+        recorder.recording = True
+        client = runner.Client(self.live_server_url, recorder)
+        catalog = Catalog.discover(client)
+        rng = random.Random(1)
+        with patch.dict(os.environ, self.env):
+            for journey in JOURNEYS.values():
+                journey(client, catalog, rng)
+        client.close()
+
+        self.assertEqual(len(catalog.ids), 10)
+        self.assertEqual(set(recorder.samples), {
+            'GET /api/universities/',
+            'GET /api/programs/',
+            'GET /api/universities/{id}/',
+            'GET /api/universities/bulk/',
+            'GET /api/universities/bulk/?view=detail',
+            'POST /api/ai/compare-summary/stream/',
+            'POST /api/ai/compare-summary/stream/ (first token)',
+            'POST /api/ai/chat/stream/',
+            'POST /api/ai/chat/stream/ (first token)',
+        })
+        statuses = {status for samples in recorder.samples.values() for _ms, status in samples}
+        self.assertEqual(statuses, {200})
+        self.assertGreater(self.llm.requests, 0)
+
+    def test_run_reports_endpoints(self):
+        """Test that a short run reports per-endpoint stats and passes an error SLO."""
+        with patch.dict(os.environ, self.env):
+            report = runner.run(
+                self.live_server_url, {'details': 1, 'chat': 1},
+                concurrency=2, duration=1, warmup=0, think_time=0, seed=1, log=lambda line: None,
+            )
+
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertLessEqual(set(report['endpoints']), {
+            'GET /api/universities/{id}/', 'POST /api/ai/chat/stream/', 'POST /api/ai/chat/stream/ (first token)',
+        })
+        for stats in report['endpoints'].values():
+            self.assertLessEqual(stats['p50'], stats['p95'])
+        self.assertTrue(all(check['passed'] for check in runner.check_slos(report, [('*', 'errors', 0)])))
+
+    def test_unreachable_server(self):
+        """Test that a server that cannot be listed is reported as ValueError."""
+        with self.assertRaises(ValueError):
+            runner.run('http://127.0.0.1:9', {'home': 1}, duration=0.1, warmup=0, timeout=1, log=lambda line: None)
+
+
+class ClientTests(SimpleTestCase):
+    """Tests for the load test HTTP client."""
+
+    def test_relative_strips_base_path(self):
+        """Test that links returned behind a path prefix are not prefixed twice."""
+        client = runner.Client('https://example.com/unihub/')
+        self.assertEqual(client.relative('https://example.com/unihub/api/universities/?page=2'), '/api/universities/?page=2')
+        self.assertEqual(client.relative('https://example.com/other/'), '/other/')
+        self.assertEqual(runner.Client('http://example.com').relative('http://example.com/api/?page=2'), '/api/?page=2')
+
+
+class SLOTests(SimpleTestCase):
+    """Tests for SLO parsing and checks."""
+
+    report = {
+        'endpoints': {
+            'GET /api/universities/': {'p95': 80.0, 'error_rate': 0.0, 'rps': 50.0},
+            'GET /api/universities/{id}/': {'p95': 250.0, 'error_rate': 0.02, 'rps': 30.0},
+            'POST /api/ai/chat/': {'p95': 900.0, 'error_rate': 0.0, 'rps': 2.0},
+        },
+        'total': {'p95': 600.0, 'error_rate': 0.01, 'rps': 82.0},
+    }
+
+    def test_parse_slo(self):
+        """Test the PATTERN:METRIC=VALUE syntax."""
+        self.assertEqual(runner.parse_slo('GET /api/universities/{id}/:p95=200'), ('GET /api/universities/{id}/', 'p95', 200.0))
+        self.assertEqual(runner.parse_slo('total:rps=100'), ('total', 'rps', 100.0))
+        for spec in ['p95=200', 'GET *:p42=1', 'GET *:p95=fast']:
+            with self.assertRaises(ValueError):
+                runner.parse_slo(spec)
+
+    def test_check_slos(self):
+        """Test that patterns match endpoints and rps is a lower bound."""
+        slos = [runner.parse_slo(spec) for spec in ['GET *:p95=200', '*:errors=0.01', 'total:rps=100']]
+        missed = [(check['endpoint'], check['metric']) for check in runner.check_slos(self.report, slos) if not check['passed']]
+        self.assertEqual(missed, [
+            ('GET /api/universities/{id}/', 'p95'),
+            ('GET /api/universities/{id}/', 'errors'),
+            ('total', 'rps'),
+        ])
+
+    def test_parse_mix(self):
+        """Test journey mixes and their validation."""
+        self.assertEqual(parse_mix('home=3,chat'), {'home': 3.0, 'chat': 1.0})
+        for value in ['checkout=1', 'home=0', 'home=x']:
+            with self.assertRaises(ValueError):
+                parse_mix(value)
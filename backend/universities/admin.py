@@ -1,5 +1,80 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ERROR_FLAG, PAGE_VAR
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .export import csv_response
 from .models import University, Program, UniversityImage
+from .pagination import EstimatedCountPaginator
+from .search import search_universities, search_programs
+from .snapshot import schedule_snapshot_rebuild
+
+
+class CatalogAdminMixin:
+    """Rebuild the list snapshot once an admin save or delete has committed."""
+    
+    def save_related(self, request, form, formsets, change):
+        # Runs after the object, its M2M fields and inlines are saved
+        super().save_related(request, form, formsets, change)
+        schedule_snapshot_rebuild()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        schedule_snapshot_rebuild()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        schedule_snapshot_rebuild()
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    List filter with a text box instead of one link per value.
+    
+    For relations with too many rows to list (programs, universities).
+    """
+    template = 'admin/universities/input_filter.html'
+    
+    def lookups(self, request, model_admin):
+        return ()
+    
+    def has_output(self):
+        return True
+    
+    def choices(self, changelist):
+        # A single entry: the link clearing this filter and the other active
+        # parameters, which the form submits again as hidden fields
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+            'hidden_params': [
+                (key, value) for key, value in changelist.params.items()
+                if key not in (self.parameter_name, PAGE_VAR, ERROR_FLAG)
+            ],
+        }
+
+
+class ProgramCodeFilter(InputFilter):
+    title = 'program code'
+    parameter_name = 'program'
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(programs__code=self.value().strip())
+        return queryset
+
+
+class UniversityIdFilter(InputFilter):
+    title = 'university ID'
+    parameter_name = 'university'
+    
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value.isdigit():
+            return queryset.filter(university_id=value)
+        if value:
+            return queryset.none()
+        return queryset
 
 
 class UniversityImageInline(admin.TabularInline):
@@ -10,24 +85,49 @@ class UniversityImageInline(admin.TabularInline):
 
 
 @admin.register(Program)
-class ProgramAdmin(admin.ModelAdmin):
+class ProgramAdmin(CatalogAdminMixin, admin.ModelAdmin):
     """Admin configuration for Program model."""
-    list_display = ['code', 'title']
+    list_display = ['code', 'title', 'universities_count']
     search_fields = ['code', 'title']
     ordering = ['code']
+    
+    def get_queryset(self, request):
+        # A correlated subquery is evaluated for the displayed page only,
+        # unlike a GROUP BY over the whole membership table
+        memberships = (
+            University.programs.through.objects.filter(program_id=OuterRef('pk'))
+            .order_by().values('program_id').annotate(count=Count('*')).values('count')
+        )
+        return super().get_queryset(request).defer('search_vector').annotate(
+            universities_count=Coalesce(Subquery(memberships, output_field=IntegerField()), 0),
+        )
+    
+    @admin.display(description='Universities', ordering='universities_count')
+    def universities_count(self, obj):
+        return obj.universities_count
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_programs(queryset, search_term.strip()), False
 
 
 @admin.register(University)
-class UniversityAdmin(admin.ModelAdmin):
+class UniversityAdmin(CatalogAdminMixin, admin.ModelAdmin):
     """Admin configuration for University model."""
     list_display = [
         'name', 'city', 'tuition', 'rating', 
         'study_form', 'has_dormitory', 'programs_count'
     ]
-    list_filter = ['city', 'study_form', 'has_dormitory', 'programs']
+    list_filter = ['city', 'study_form', 'has_dormitory', ProgramCodeFilter]
     search_fields = ['name', 'city', 'description']
-    filter_horizontal = ['programs']
+    # Programs are searched on demand rather than rendered all at once
+    autocomplete_fields = ['programs']
     ordering = ['-rating', 'name']
+    # Large catalogs: no COUNT(*) of the whole table on every changelist
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['export_csv']
     
     fieldsets = (
         ('Basic Information', {
@@ -43,22 +143,37 @@ class UniversityAdmin(admin.ModelAdmin):
             'fields': ('address', 'phone', 'email', 'website')
         }),
         ('Additional Information', {
-            'fields': ('founded_year', 'students_count'),
+            'fields': ('founded_year', 'students_count', 'external_id'),
             'classes': ('collapse',)
         }),
     )
     
     inlines = [UniversityImageInline]
     
-    def programs_count(self, obj):
-        return obj.programs.count()
-    programs_count.short_description = 'Programs'
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('search_vector')
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed full-text/trigram search instead of ILIKE scans
+        if not search_term.strip():
+            return queryset, False
+        return search_universities(queryset, search_term.strip()), False
+    
+    @admin.action(description='Export selected universities as CSV')
+    def export_csv(self, request, queryset):
+        # Streamed, so "select all" on the full catalog stays in constant memory
+        return csv_response(queryset, 'universities.csv', request)
 
 
 @admin.register(UniversityImage)
-class UniversityImageAdmin(admin.ModelAdmin):
+class UniversityImageAdmin(CatalogAdminMixin, admin.ModelAdmin):
     """Admin configuration for UniversityImage model."""
     list_display = ['university', 'caption', 'order']
-    list_filter = ['university']
-    ordering = ['university', 'order']
+    list_select_related = ['university']
+    list_filter = [UniversityIdFilter]
+    autocomplete_fields = ['university']
+    # By key: ordering by `university` would sort on the University ordering
+    ordering = ['university_id', 'order']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
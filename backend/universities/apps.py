@@ -5,3 +5,6 @@ class UniversitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'universities'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
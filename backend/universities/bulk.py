@@ -0,0 +1,196 @@
+"""
+Batched writes of catalog data for imports and generators.
+
+Rows are upserted with bulk_create(update_conflicts=True): programs on
+`code`, universities on `external_id`. Memberships and gallery images go
+straight to their tables. Signals do not fire for bulk writes, so every batch
+refreshes programs_count and the search vectors of the rows it touched,
+and finish() bumps the catalog version once.
+
+Input is consumed lazily in batches, so memory stays bounded by the batch
+size whatever the size of the source.
+"""
+
+import io
+from itertools import islice
+
+from django.db import connections, transaction
+
+from .caching import bump_catalog_version
+from .counters import update_programs_count
+from .models import University, Program, UniversityImage
+from .search import update_university_search_vectors, update_program_search_vectors
+
+
+BATCH_SIZE = 2000
+
+# Columns an import may set; everything else is maintained by the app
+UNIVERSITY_FIELDS = (
+    'name', 'city', 'description', 'iframe_3d_tour_url', 'tuition', 'rating',
+    'study_form', 'has_dormitory', 'address', 'phone', 'email', 'website',
+    'founded_year', 'students_count',
+)
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def insert_rows(model, fields, rows, using='default'):
+    """
+    Insert plain tuples of `fields` values into the table of `model`.
+
+    Memberships and gallery images outnumber universities several times
+    over, and building a model instance per row is most of the cost of
+    bulk_create(), so such rows are sent as tuples: COPY on PostgreSQL,
+    executemany() elsewhere. Values must already be in database form.
+    """
+    if not rows:
+        return
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            data = io.StringIO(''.join('\t'.join(_copy_value(value) for value in row) + '\n' for row in rows))
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', data)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+
+def _copy_value(value):
+    # COPY text format: backslash escapes for the delimiter and line breaks
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class CatalogWriter:
+    """
+    Upserts programs and universities in batches.
+
+    University rows are dicts with `external_id`, any of UNIVERSITY_FIELDS
+    and optionally `programs`, a list of program codes that replaces the
+    university's memberships, and `images`, a list of dicts with `image`
+    (a storage path), `caption` and `order` that replaces its gallery.
+    Fields missing from a row are left untouched on its existing
+    university.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.program_ids = dict(Program.objects.values_list('code', 'pk'))
+        self.stats = {'programs': 0, 'universities': 0, 'memberships': 0, 'images': 0, 'unknown_programs': 0}
+
+    def _report(self, kind):
+        if self.progress:
+            self.progress(kind, self.stats[kind])
+
+    def write_programs(self, rows):
+        """Upsert programs from dicts with `code` and `title`."""
+        for batch in batched(rows, self.batch_size):
+            # The last row wins when a code repeats within a batch
+            batch = list({row['code']: row for row in batch}.values())
+            self._write_program_batch(batch)
+            self.stats['programs'] += len(batch)
+            self._report('programs')
+
+    def _write_program_batch(self, rows):
+        codes = [row['code'] for row in rows]
+        with transaction.atomic():
+            previous_titles = dict(Program.objects.filter(code__in=codes).values_list('code', 'title'))
+            Program.objects.bulk_create(
+                [Program(code=row['code'], title=row['title']) for row in rows],
+                update_conflicts=True,
+                unique_fields=['code'],
+                update_fields=['title', 'updated_at'],
+            )
+            programs = Program.objects.filter(code__in=codes)
+            self.program_ids.update(programs.values_list('code', 'pk'))
+            update_program_search_vectors(programs)
+
+            renamed = [
+                self.program_ids[row['code']] for row in rows
+                if row['code'] in previous_titles and previous_titles[row['code']] != row['title']
+            ]
+            if renamed:
+                # Program titles are part of the universities' search vectors
+                update_university_search_vectors(University.objects.filter(programs__in=renamed).distinct())
+
+    def write_universities(self, rows):
+        """Upsert universities and their memberships."""
+        for batch in batched(rows, self.batch_size):
+            batch = list({row['external_id']: row for row in batch}.values())
+            self._write_university_batch(batch)
+            self.stats['universities'] += len(batch)
+            self._report('universities')
+
+    def _write_university_batch(self, rows):
+        # One upsert per set of fields present, so that a row lacking a field
+        # another row has does not overwrite it with the model default
+        groups = {}
+        for row in rows:
+            fields = tuple(sorted(field for field in row if field in UNIVERSITY_FIELDS))
+            groups.setdefault(fields, []).append(row)
+        through = University.programs.through
+
+        with transaction.atomic():
+            for fields, group in groups.items():
+                objects = [
+                    University(external_id=row['external_id'], **{field: row[field] for field in fields})
+                    for row in group
+                ]
+                University.objects.bulk_create(
+                    objects,
+                    update_conflicts=True,
+                    unique_fields=['external_id'],
+                    update_fields=list(fields) + ['updated_at'],
+                )
+            # bulk_create() does not return the ids of updated rows
+            ids = dict(
+                University.objects
+                .filter(external_id__in=[row['external_id'] for row in rows])
+                .values_list('external_id', 'pk')
+            )
+
+            memberships = []  # (university_id, program_id) pairs
+            replaced = []
+            for row in rows:
+                if row.get('programs') is None:
+                    continue
+                university_id = ids[row['external_id']]
+                replaced.append(university_id)
+                for code in dict.fromkeys(row['programs']):
+                    program_id = self.program_ids.get(code)
+                    if program_id is None:
+                        self.stats['unknown_programs'] += 1
+                        continue
+                    memberships.append((university_id, program_id))
+            if replaced:
+                through.objects.filter(university_id__in=replaced).delete()
+                insert_rows(through, ('university', 'program'), memberships)
+                self.stats['memberships'] += len(memberships)
+
+            # Derivatives are left to rebuild_images (universities.images)
+            images = [
+                (ids[row['external_id']], image['image'], image.get('caption', ''), image.get('order', 0), '{}')
+                for row in rows if row.get('images') is not None
+                for image in row['images']
+            ]
+            regalleried = [ids[row['external_id']] for row in rows if row.get('images') is not None]
+            if regalleried:
+                UniversityImage.objects.filter(university_id__in=regalleried).delete()
+                insert_rows(UniversityImage, ('university', 'image', 'caption', 'order', 'variants'), images)
+                self.stats['images'] += len(images)
+
+            universities = University.objects.filter(pk__in=ids.values())
+            update_programs_count(universities)
+            update_university_search_vectors(universities)
+
+    def finish(self):
+        """Invalidate cached catalog responses after the last batch."""
+        bump_catalog_version()
+        return self.stats
@@ -0,0 +1,159 @@
+"""
+Versioned response cache for catalog reads.
+
+The catalog only changes through the admin, so every read endpoint can be
+cached under a single catalog version number. Any save, delete or
+membership change of University, Program or UniversityImage bumps the
+version (see universities.signals); entries of older versions are never
+read again and simply expire after CATALOG_CACHE_TTL.
+
+The backend is the `CATALOG_CACHE_ALIAS` entry of CACHES: per-process
+locmem by default, or a shared backend configured with CATALOG_CACHE_URL
+so that every worker sees the same version and entries.
+
+With a read replica, entries filled right after a bump could hold rows the
+replica has not received yet, and keep serving them under the new version.
+For DATABASE_REPLICA_STICKY_SECONDS after a bump, cache fills therefore
+read from the primary (see fresh_reads).
+"""
+
+import hashlib
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from config.dbrouter import primary_reads, replica_alias
+
+
+VERSION_KEY = 'catalog:version'
+HITS_KEY = 'catalog:stats:hits'
+MISSES_KEY = 'catalog:stats:misses'
+CHANGED_KEY = 'catalog:changed'  # Set for DATABASE_REPLICA_STICKY_SECONDS after a bump
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _new_version():
+    # Time-based, so a lost version key never resurrects entries of an old one
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """Return the current catalog version, initializing it if needed."""
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+    if replica_alias() is not None:
+        cache.set(CHANGED_KEY, True, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response.
+
+    Bumps right away so this process stops serving old entries, and again
+    after the surrounding transaction commits so that nothing cached from
+    a read in between survives.
+    """
+    _bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_bump)
+
+
+def fresh_reads():
+    """
+    Context for computing a cache entry: reads from the primary while the
+    replica may still lag behind the last bump, else where routed.
+    """
+    if replica_alias() is not None and get_cache().get(CHANGED_KEY):
+        return primary_reads()
+    return nullcontext()
+
+
+def versioned(name, compute):
+    """Return `compute()` cached under the current catalog version."""
+    cache = get_cache()
+    key = f'catalog:{get_catalog_version()}:{name}'
+    value = cache.get(key)
+    if value is None:
+        with fresh_reads():
+            value = compute()
+        cache.set(key, value, settings.CATALOG_CACHE_TTL)
+    return value
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def cache_stats():
+    """Hit/miss counters of the response cache."""
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_catalog_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+        'ttl': settings.CATALOG_CACHE_TTL,
+    }
+
+
+def cached_catalog_response(view_name):
+    """
+    Cache the serialized data of a DRF view under the catalog version.
+
+    Only successful responses are stored. The data (not the rendered bytes)
+    is cached, so content negotiation still happens per request; the key
+    includes scheme and host because paginated data holds absolute links.
+    Responses carry `X-Cache: HIT` or `X-Cache: MISS`.
+    """
+    def decorator(func):
+        @wraps(func)
+        def inner(request, *args, **kwargs):
+            if request.method != 'GET' or not settings.CATALOG_CACHE_TTL:
+                return func(request, *args, **kwargs)
+
+            url = request.build_absolute_uri()
+            key = f'catalog:{get_catalog_version()}:{view_name}:{hashlib.sha1(url.encode("utf-8")).hexdigest()}'
+            cache = get_cache()
+            entry = cache.get(key)
+            if entry is not None:
+                _count(HITS_KEY)
+                response = Response(entry['data'], status=entry['status'])
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _count(MISSES_KEY)
+            with fresh_reads():
+                response = func(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                cache.set(key, {'data': response.data, 'status': response.status_code}, settings.CATALOG_CACHE_TTL)
+            response['X-Cache'] = 'MISS'
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,244 @@
+"""
+Columnar snapshots of the catalog for analytics (Parquet or Arrow IPC).
+
+A snapshot is one zstd-compressed file per table, named after the catalog
+version, plus a manifest:
+
+    CATALOG_SNAPSHOT_DIR/parquet/manifest.json
+    CATALOG_SNAPSHOT_DIR/parquet/universities-<version>.parquet
+    CATALOG_SNAPSHOT_DIR/parquet/programs-<version>.parquet
+    CATALOG_SNAPSHOT_DIR/parquet/memberships-<version>.parquet
+
+The version is a digest of the same aggregates as the conditional GET
+validators (universities.conditional), read from the database, so it
+agrees across processes. Snapshots are written by the export_snapshot
+command (and by staff requests to the manifest endpoint), only when the
+version changes. Tables are streamed from the database in chunks, one
+record batch (a Parquet row group) per chunk.
+
+Writers of a format take an exclusive lock on CATALOG_SNAPSHOT_DIR/<format>.lock
+and check the version again once they hold it, so one writer never
+deletes the files of another. New files are complete before the manifest
+points to them and the previous ones are deleted afterwards: a reader
+that fetched the old manifest may find its files gone (a 404) and has to
+read the manifest again.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+
+from .conditional import collection_version
+from .export import chunks
+from .models import Program, University
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pyarrow = None
+
+
+FORMATS = ('parquet', 'arrow')
+CHUNK_SIZE = 10000
+COMPRESSION = 'zstd'
+MANIFEST = 'manifest.json'
+SNAPSHOT_FILE = re.compile(r'^[a-z]+-[0-9a-f]+\.(?:parquet|arrow)$')
+
+# Table name -> (model, exported columns)
+TABLES = {
+    'universities': (University, (
+        'id', 'external_id', 'name', 'city', 'description', 'logo', 'iframe_3d_tour_url',
+        'tuition', 'rating', 'programs_count', 'study_form', 'has_dormitory', 'address',
+        'phone', 'email', 'website', 'founded_year', 'students_count', 'created_at', 'updated_at',
+    )),
+    'programs': (Program, ('id', 'code', 'title', 'updated_at')),
+    'memberships': (University.programs.through, ('university_id', 'program_id')),
+}
+
+
+def available():
+    return pyarrow is not None
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImproperlyConfigured('Columnar snapshots need pyarrow (pip install pyarrow)')
+
+
+def snapshot_dir(fmt):
+    return os.path.join(settings.CATALOG_SNAPSHOT_DIR, fmt)
+
+
+def catalog_version():
+    """A short digest changing with any university, program or membership change."""
+    parts = [
+        collection_version(University),
+        collection_version(Program),
+        University.programs.through.objects.count(),
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+def _arrow_type(field):
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.BigIntegerField, models.ForeignKey)):
+        return pyarrow.int64()
+    if isinstance(field, models.IntegerField):
+        return pyarrow.int32()
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    return pyarrow.string()  # Char, text, URL, email and file fields
+
+
+def table_schema(name):
+    model, columns = TABLES[name]
+    return pyarrow.schema([
+        pyarrow.field(column, _arrow_type(model._meta.get_field(column)), nullable=model._meta.get_field(column).null)
+        for column in columns
+    ])
+
+
+def record_batches(name, chunk_size=None):
+    """Yield the rows of a table as record batches of at most `chunk_size` rows."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    model, columns = TABLES[name]
+    schema = table_schema(name)
+    # Led by the primary key, which keys the chunks when they are read by keyset
+    rows = model.objects.values_list('pk', *columns)
+    for chunk in chunks(rows, chunk_size, key=itemgetter(0)):
+        yield pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(list(zip(*chunk))[1:], schema)],
+            schema=schema,
+        )
+
+
+def write_table(path, name, fmt, chunk_size=None):
+    """
+    Write a table to `path`.
+
+    Returns:
+        int: The number of rows written
+    """
+    schema = table_schema(name)
+    rows = 0
+    if fmt == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(path, schema, compression=COMPRESSION)
+    else:
+        options = pyarrow.ipc.IpcWriteOptions(compression=COMPRESSION)
+        writer = pyarrow.ipc.new_file(path, schema, options=options)
+    with writer:
+        for batch in record_batches(name, chunk_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def read_manifest(fmt):
+    try:
+        with open(os.path.join(snapshot_dir(fmt), MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_current(manifest, directory, version):
+    return (
+        manifest is not None
+        and manifest['version'] == version
+        and all(os.path.exists(os.path.join(directory, table['file'])) for table in manifest['tables'].values())
+    )
+
+
+@contextmanager
+def _writer_lock(fmt):
+    # Held until the file is closed; next to the format's directory, not in it
+    with open(snapshot_dir(fmt) + '.lock', 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _replace(directory, filename, write):
+    # Written next to the target and renamed, so readers never see a partial file
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    os.close(fd)
+    try:
+        result = write(temporary)
+        os.replace(temporary, os.path.join(directory, filename))
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return result
+
+
+def write_snapshot(fmt='parquet', force=False, chunk_size=None):
+    """
+    Write a snapshot of the catalog unless the current one is up to date.
+
+    Returns:
+        tuple: (manifest, whether a new snapshot was written)
+
+    Raises:
+        ImproperlyConfigured: If pyarrow is not installed
+        ValueError: If `fmt` is not a known format
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown snapshot format {fmt!r}')
+    directory = snapshot_dir(fmt)
+    os.makedirs(directory, exist_ok=True)
+
+    if not force:
+        manifest = read_manifest(fmt)
+        if _is_current(manifest, directory, catalog_version()):
+            return manifest, False
+
+    with _writer_lock(fmt):
+        # Read before the tables: a change made while writing gives the files a
+        # version that is already outdated, so the next call writes them again
+        version = catalog_version()
+        manifest = read_manifest(fmt)
+        if not force and _is_current(manifest, directory, version):
+            return manifest, False  # Written while waiting for the lock
+        return _write(fmt, directory, version, chunk_size), True
+
+
+def _write(fmt, directory, version, chunk_size):
+    tables = {}
+    for name in TABLES:
+        filename = f'{name}-{version}.{fmt}'
+        rows = _replace(directory, filename, lambda path: write_table(path, name, fmt, chunk_size))
+        tables[name] = {'file': filename, 'rows': rows, 'bytes': os.path.getsize(os.path.join(directory, filename))}
+    manifest = {
+        'version': version,
+        'format': fmt,
+        'compression': COMPRESSION,
+        'generated_at': timezone.now().isoformat(),
+        'tables': tables,
+    }
+    _replace(directory, MANIFEST, lambda path: _write_json(path, manifest))
+
+    current = {table['file'] for table in tables.values()}
+    for filename in os.listdir(directory):
+        if SNAPSHOT_FILE.match(filename) and filename not in current:
+            os.remove(os.path.join(directory, filename))
+    return manifest
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
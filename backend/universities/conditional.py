@@ -0,0 +1,102 @@
+"""
+Conditional GET support (ETag / Last-Modified) for catalog endpoints.
+
+Validators are derived from cheap aggregates instead of the response body,
+so a matching If-None-Match is answered with 304 before any serializer
+runs:
+
+    collections  COUNT(*) + MAX(updated_at) of the underlying table
+    details      the row's own updated_at + MAX(updated_at) of programs
+
+University.updated_at is also bumped when its programs or gallery images
+change (see universities.signals), so it covers everything the detail
+serializer renders. The aggregates themselves are cached under the catalog
+version, so revalidating an unchanged catalog does not touch the database.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max, Subquery
+from django.views.decorators.http import condition
+
+from .caching import versioned
+from .models import University, Program
+from .snapshot import response_encoding
+
+
+def collection_version(model):
+    """Return (row count, last modification time) for a catalog table."""
+    version = model.objects.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+    return version['count'], version['last_modified']
+
+
+def _make_etag(request, *parts, coding='identity'):
+    # The same URL can be rendered as JSON or as the browsable API
+    key = '|'.join(str(part) for part in (request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), *parts))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    # Each content coding is a representation of its own, with its own strong ETag
+    return f'"{digest}"' if coding == 'identity' else f'"{digest}-{coding}"'
+
+
+def _memoized(request, key, compute):
+    # The ETag and Last-Modified callbacks share one aggregate query
+    cache = request.__dict__.setdefault('_catalog_versions', {})
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def _collection(*models):
+    def get_version(request):
+        def compute():
+            name = 'validators:' + ','.join(model._meta.label_lower for model in models)
+            return versioned(name, lambda: [collection_version(model) for model in models])
+        return _memoized(request, models, compute)
+
+    def etag(request, *args, **kwargs):
+        return _make_etag(request, *get_version(request), coding=response_encoding(request))
+
+    def last_modified(request, *args, **kwargs):
+        timestamps = [modified for _count, modified in get_version(request) if modified]
+        return max(timestamps) if timestamps else None
+
+    return etag, last_modified
+
+
+def _university_detail():
+    def get_version(request, pk):
+        def query():
+            latest_program = Program.objects.order_by('-updated_at').values('updated_at')[:1]
+            try:
+                return (
+                    University.objects
+                    .filter(pk=pk)
+                    .annotate(programs_modified=Subquery(latest_program))
+                    .values_list('updated_at', 'programs_modified')
+                    .first()
+                )
+            except (TypeError, ValueError):
+                return None  # Malformed pk; the view answers 404
+        return _memoized(request, ('university', pk), lambda: versioned(f'validators:university:{pk}', query))
+
+    def etag(request, pk=None, **kwargs):
+        version = get_version(request, pk)
+        return _make_etag(request, pk, *version) if version else None
+
+    def last_modified(request, pk=None, **kwargs):
+        version = get_version(request, pk)
+        return max(timestamp for timestamp in version if timestamp) if version else None
+
+    return etag, last_modified
+
+
+def conditional_collection(*models):
+    """View decorator adding collection validators for the given models."""
+    etag, last_modified = _collection(*models)
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def conditional_university_detail():
+    """View decorator adding per-object validators for a university."""
+    etag, last_modified = _university_detail()
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,35 @@
+"""
+Denormalized counters on University.
+
+`programs_count` is stored on the row so catalog listings never read the
+programs M2M table. The signal handlers in universities.signals keep it in
+sync; code that writes memberships in bulk must call
+update_programs_count() for the universities it touched.
+"""
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def programs_count_subquery(university_model):
+    """Correlated subquery counting the programs of the outer university."""
+    through = university_model._meta.get_field('programs').remote_field.through
+    return Coalesce(
+        Subquery(
+            through.objects
+            .filter(university_id=OuterRef('pk'))
+            .values('university_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def update_programs_count(queryset, **fields):
+    """
+    Recompute `programs_count` for the given universities in one UPDATE.
+
+    Extra keyword arguments are set in the same statement.
+    """
+    return queryset.update(programs_count=programs_count_subquery(queryset.model), **fields)
@@ -0,0 +1,186 @@
+"""
+Streaming NDJSON and CSV export of universities.
+
+Rows are read in primary key order, one chunk at a time (see chunks), and
+encoded as they are sent, so an export of the whole catalog runs in
+constant memory. The programs (and, for NDJSON, the images) of
+each chunk are fetched with one extra query per relation.
+
+NDJSON lines are the university detail representation. CSV has the
+columns import_catalog reads (program codes joined by semicolons), so an
+export can be edited and imported back.
+
+Under ASGI, Django 4.2 reads a synchronous iterator to the end before
+sending anything, so responses to ASGI requests stream an async iterator
+instead, producing batches of lines on the thread the ORM uses.
+"""
+
+import csv
+import json
+from decimal import Decimal
+from itertools import chain, islice
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .bulk import UNIVERSITY_FIELDS
+from .models import Program
+from .serializers import UniversityDetailSerializer
+
+
+EXPORT_FIELDS = ('external_id', *UNIVERSITY_FIELDS)
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object handing each written line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """
+    `?format=ndjson` for the export action.
+
+    Exports stream past the renderer; it only renders error responses.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder, ensure_ascii=False).encode() + b'\n'
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    `?format=csv` for the export action.
+
+    Exports stream past the renderer; it renders error responses as
+    (field, message) rows.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        writer = csv.writer(Echo())
+        return ''.join(
+            writer.writerow([field, '; '.join(map(str, messages)) if isinstance(messages, list) else messages])
+            for field, messages in data.items()
+        ).encode()
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, Decimal):
+        return format(value, 'f')
+    return value
+
+
+def chunks(queryset, chunk_size, key=attrgetter('pk')):
+    """
+    Yield the rows of `queryset`, ordered by primary key, in lists of at most `chunk_size`.
+
+    Rows come from QuerySet.iterator(), a server-side cursor on PostgreSQL.
+    Without server-side cursors (DB_PGBOUNCER) iterator() fetches every row
+    at once, so each chunk is then a query of its own, for the rows after
+    the last primary key (`key` of a row) of the previous chunk.
+    """
+    queryset = queryset.order_by('pk')
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+        return
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        chunk = list(queryset.filter(pk__gt=key(chunk[-1]))[:chunk_size])
+
+
+def iter_universities(queryset, chunk_size=None, images=False):
+    """
+    The universities of `queryset` by primary key, with programs prefetched.
+
+    Its own ordering is dropped. Prefetches run once per chunk.
+    """
+    queryset = queryset.order_by('pk').prefetch_related(
+        Prefetch('programs', queryset=Program.objects.defer('search_vector').order_by('code')),
+    )
+    if images:
+        queryset = queryset.prefetch_related('images')
+    return chain.from_iterable(chunks(queryset, chunk_size or CHUNK_SIZE))
+
+
+def export_rows(queryset, chunk_size=None):
+    """Yield the header and one list of cells per university in `queryset`."""
+    yield ['id', *EXPORT_FIELDS, 'programs']
+    for university in iter_universities(queryset, chunk_size):
+        yield [
+            university.pk,
+            *(_cell(getattr(university, field)) for field in EXPORT_FIELDS),
+            ';'.join(program.code for program in university.programs.all()),
+        ]
+
+
+def csv_lines(queryset):
+    writer = csv.writer(Echo())
+    yield '\ufeff'  # Byte order mark, so spreadsheets detect UTF-8
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+def ndjson_lines(queryset):
+    serializer = UniversityDetailSerializer()
+    for university in iter_universities(queryset, images=True):
+        yield json.dumps(serializer.to_representation(university), cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+async def aiterate(lines, batch_size=100):
+    """Yield from a synchronous iterator, `batch_size` items per hop to the ORM's thread."""
+    lines = iter(lines)
+    next_batch = sync_to_async(lambda: list(islice(lines, batch_size)), thread_sensitive=True)
+    try:
+        while batch := await next_batch():
+            for line in batch:
+                yield line
+    finally:
+        # Releases the database cursor when the client goes away early
+        if hasattr(lines, 'close'):
+            await sync_to_async(lines.close, thread_sensitive=True)()
+
+
+def export_response(lines, content_type, filename, request=None):
+    """A StreamingHttpResponse sending `lines` as an attachment."""
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        lines = aiterate(lines)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Passed on by nginx as produced rather than buffered
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def csv_response(queryset, filename, request=None):
+    """A StreamingHttpResponse sending `queryset` as a CSV attachment."""
+    return export_response(csv_lines(queryset), 'text/csv; charset=utf-8', filename, request)
+
+
+def ndjson_response(queryset, filename, request=None):
+    """A StreamingHttpResponse sending `queryset` as NDJSON, one university per line."""
+    return export_response(ndjson_lines(queryset), 'application/x-ndjson; charset=utf-8', filename, request)
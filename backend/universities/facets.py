@@ -0,0 +1,144 @@
+"""
+Faceted counts for the catalog filters panel.
+
+Counts are disjunctive: each facet is counted with every active filter
+except its own, so the panel can show how many universities selecting
+another option of the same filter would return. All facets come from a
+single UNION ALL statement of grouped queries producing (facet, key, count)
+rows; results are cached per filter combination under the catalog version.
+"""
+
+import hashlib
+import json
+
+from django.db.models import Case, CharField, Count, F, Q, Value, When
+from django.db.models.functions import Cast
+
+from .caching import versioned
+from .filters import FILTER_PARAMS, STUDY_FORM_MATCHES, filter_universities
+from .models import University
+from .search import search_universities
+
+
+# Non-overlapping tuition bands; the filter buckets share their boundaries
+TUITION_BANDS = [
+    ('zero', Q(tuition=0)),
+    ('below_1m', Q(tuition__gt=0, tuition__lt=1000000)),
+    ('1m', Q(tuition=1000000)),
+    ('below_2m', Q(tuition__gt=1000000, tuition__lt=2000000)),
+    ('2m', Q(tuition=2000000)),
+    ('above_2m', Q(tuition__gt=2000000)),
+]
+
+# Same buckets as TUITION_RANGES in universities.filters, as sums of bands
+TUITION_RANGE_BANDS = {
+    'free': ['zero'],
+    'low': ['below_1m', '1m'],
+    'medium': ['1m', 'below_2m', '2m'],
+    'high': ['2m', 'above_2m'],
+}
+
+
+def _base(params, exclude=()):
+    queryset = filter_universities(University.objects.all(), params, exclude=exclude)
+    text = (params.get('q') or '').strip()
+    if text:
+        queryset = search_universities(queryset, text)
+    return queryset.order_by()
+
+
+def _grouped(queryset, facet, key):
+    return (
+        queryset
+        .annotate(facet=Value(facet, output_field=CharField()), key=key)
+        .values('facet', 'key')
+        .annotate(count=Count('pk'))
+        .values_list('facet', 'key', 'count')
+        .order_by()
+    )
+
+
+def facet_rows(params):
+    """
+    Build the single query returning (facet, key, count) rows.
+
+    Args:
+        params: QueryDict or plain dict of catalog query parameters
+
+    Returns:
+        QuerySet: UNION ALL of one grouped query per facet
+
+    Raises:
+        ValidationError: If a filter parameter has an invalid value
+    """
+    memberships = University.programs.through.objects.filter(
+        university_id__in=_base(params, exclude=('programs',)).values('pk')
+    )
+    dormitory = Case(When(has_dormitory=True, then=Value('true')), default=Value('false'), output_field=CharField())
+    bands = Case(*[When(band, then=Value(name)) for name, band in TUITION_BANDS], output_field=CharField())
+
+    total = _grouped(_base(params), 'total', Value('', output_field=CharField()))
+    return total.union(
+        _grouped(_base(params, exclude=('city',)), 'city', F('city')),
+        _grouped(_base(params, exclude=('study_form',)), 'study_form', F('study_form')),
+        _grouped(_base(params, exclude=('has_dormitory',)), 'has_dormitory', dormitory),
+        _grouped(_base(params, exclude=('tuition_range',)), 'tuition_range', bands),
+        (
+            memberships
+            .annotate(facet=Value('programs', output_field=CharField()), key=Cast('program_id', CharField()))
+            .values('facet', 'key')
+            .annotate(count=Count('pk'))
+            .values_list('facet', 'key', 'count')
+            .order_by()
+        ),
+        all=True,
+    )
+
+
+def compute_facets(params):
+    """Run the facet query and shape its rows for the API."""
+    facets = {
+        'city': {},
+        'study_form': dict.fromkeys(STUDY_FORM_MATCHES, 0),
+        'programs': {},
+        'has_dormitory': {'true': 0, 'false': 0},
+        'tuition_range': dict.fromkeys(TUITION_RANGE_BANDS, 0),
+    }
+    total = 0
+    study_forms = {}
+    bands = {}
+    for facet, key, count in facet_rows(params):
+        if facet == 'total':
+            total = count
+        elif facet == 'study_form':
+            study_forms[key] = count
+        elif facet == 'tuition_range':
+            bands[key] = count
+        else:
+            facets[facet][key] = count
+
+    # A single-form filter also matches universities teaching in both forms
+    for option, forms in STUDY_FORM_MATCHES.items():
+        facets['study_form'][option] = sum(study_forms.get(form, 0) for form in forms)
+    for option, names in TUITION_RANGE_BANDS.items():
+        facets['tuition_range'][option] = sum(bands.get(name, 0) for name in names)
+
+    facets['city'] = dict(sorted(facets['city'].items(), key=lambda item: (-item[1], item[0])))
+    facets['programs'] = dict(sorted(facets['programs'].items(), key=lambda item: (-item[1], int(item[0]))))
+    return {'count': total, 'facets': facets}
+
+
+def get_facets(params):
+    """
+    Return facet counts for the active filters, cached per combination.
+
+    Only the catalog parameters take part in the cache key, in a canonical
+    order, so `?city=A&q=x` and `?q=x&city=A` share one entry.
+    """
+    active = {
+        name: params.get(name).strip()
+        for name in (*FILTER_PARAMS, 'q')
+        if params.get(name) and params.get(name).strip()
+    }
+    digest = hashlib.sha1(json.dumps(active, sort_keys=True).encode('utf-8')).hexdigest()
+    return versioned(f'facets:{digest}', lambda: compute_facets(active))
@@ -0,0 +1,166 @@
+"""
+Query-parameter filters for the university catalog.
+
+Mirrors the filters the frontend used to apply in the browser so that
+`/api/universities/` can be narrowed down on the server:
+
+    ?city=Алматы                 exact city (comma-separated for several)
+    ?tuition_min=0&tuition_max=1000000
+    ?tuition_range=free|low|medium|high
+    ?study_form=full-time|part-time|both
+    ?programs=1,4,7              universities offering any of these programs
+    ?has_dormitory=true
+
+Both catalog viewsets also accept `?q=` for ranked full-text search
+(see `universities.search`).
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import University, Program
+from .search import search_universities, search_programs
+
+
+# Same buckets as the tuition radio buttons in FiltersPanel.jsx
+TUITION_RANGES = {
+    'free': Q(tuition=0),
+    'low': Q(tuition__gt=0, tuition__lte=1000000),
+    'medium': Q(tuition__gte=1000000, tuition__lte=2000000),
+    'high': Q(tuition__gte=2000000),
+}
+
+# A university teaching in both forms matches either single-form filter
+STUDY_FORM_MATCHES = {
+    'full-time': ['full-time', 'both'],
+    'part-time': ['part-time', 'both'],
+    'both': ['both'],
+}
+
+FILTER_PARAMS = (
+    'city', 'tuition_min', 'tuition_max', 'tuition_range',
+    'study_form', 'programs', 'has_dormitory',
+)
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_decimal(name, value):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise serializers.ValidationError({name: 'A valid number is required.'})
+
+
+def _parse_ids(name, value):
+    try:
+        return [int(item) for item in _split(value)]
+    except ValueError:
+        raise serializers.ValidationError({name: 'A comma-separated list of IDs is required.'})
+
+
+def filter_universities(queryset, params, exclude=()):
+    """
+    Apply catalog filters from a query-parameter mapping.
+
+    Args:
+        queryset: University queryset to narrow down
+        params: QueryDict or plain dict of query parameters
+        exclude: Parameter names to ignore
+
+    Returns:
+        QuerySet: The filtered queryset
+
+    Raises:
+        ValidationError: If a parameter has an invalid value
+    """
+    def param(name):
+        if name in exclude:
+            return None
+        value = params.get(name)
+        return value.strip() if value and value.strip() else None
+
+    city = param('city')
+    if city:
+        cities = _split(city)
+        if len(cities) == 1:
+            queryset = queryset.filter(city=cities[0])
+        else:
+            queryset = queryset.filter(city__in=cities)
+
+    tuition_min = param('tuition_min')
+    if tuition_min:
+        queryset = queryset.filter(tuition__gte=_parse_decimal('tuition_min', tuition_min))
+
+    tuition_max = param('tuition_max')
+    if tuition_max:
+        queryset = queryset.filter(tuition__lte=_parse_decimal('tuition_max', tuition_max))
+
+    tuition_range = param('tuition_range')
+    if tuition_range:
+        if tuition_range not in TUITION_RANGES:
+            raise serializers.ValidationError({
+                'tuition_range': f"Must be one of: {', '.join(TUITION_RANGES)}."
+            })
+        queryset = queryset.filter(TUITION_RANGES[tuition_range])
+
+    study_form = param('study_form')
+    if study_form:
+        if study_form not in STUDY_FORM_MATCHES:
+            raise serializers.ValidationError({
+                'study_form': f"Must be one of: {', '.join(STUDY_FORM_MATCHES)}."
+            })
+        forms = STUDY_FORM_MATCHES[study_form]
+        if len(forms) == 1:
+            queryset = queryset.filter(study_form=forms[0])
+        else:
+            queryset = queryset.filter(study_form__in=forms)
+
+    programs = param('programs')
+    if programs:
+        program_ids = _parse_ids('programs', programs)
+        # Semi-join on the through table instead of a JOIN so rows are not duplicated
+        memberships = University.programs.through.objects.filter(program_id__in=program_ids)
+        queryset = queryset.filter(id__in=memberships.values('university_id'))
+
+    has_dormitory = param('has_dormitory')
+    if has_dormitory:
+        if has_dormitory.lower() in TRUE_VALUES:
+            queryset = queryset.filter(has_dormitory=True)
+        elif has_dormitory.lower() in FALSE_VALUES:
+            queryset = queryset.filter(has_dormitory=False)
+        else:
+            raise serializers.ValidationError({'has_dormitory': 'Must be true or false.'})
+
+    return queryset
+
+
+class UniversityFilterBackend(BaseFilterBackend):
+    """DRF filter backend applying the catalog filters to list requests."""
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_universities(queryset, request.query_params)
+
+
+class SearchQueryFilter(BaseFilterBackend):
+    """DRF filter backend for `?q=` full-text search, ranked by relevance."""
+
+    search_param = 'q'
+    search_functions = {
+        University: search_universities,
+        Program: search_programs,
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return self.search_functions[queryset.model](queryset, text)
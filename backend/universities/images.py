@@ -0,0 +1,258 @@
+"""
+Resized derivatives of uploaded logos and gallery images.
+
+Every upload is rendered at IMAGE_DERIVATIVE_WIDTHS (never upscaled) in
+each IMAGE_DERIVATIVE_FORMATS format and stored under `derivatives/`.
+The stored names land in a JSON column next to the image field:
+
+    {"source": "universities/gallery/campus.jpg",
+     "sizes": [{"width": 320, "height": 213, "webp": "derivatives/...-320w.webp",
+                "jpeg": "derivatives/...-320w.jpg"}, ...]}
+
+`source` ties the derivatives to one upload: after the image is replaced
+they are ignored until regenerated. Uploads are processed after commit by
+a small thread pool (Pillow releases the GIL while resizing and encoding);
+`manage.py rebuild_images` processes the backlog in a process pool.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .caching import bump_catalog_version
+from .models import University, UniversityImage
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = 'derivatives'
+
+# Pillow format name, file extension and encoder options
+FORMATS = {
+    'avif': ('AVIF', 'avif', {'quality': 60}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Model -> (image field, variants field)
+IMAGE_FIELDS = {
+    'University': ('logo', 'logo_variants'),
+    'UniversityImage': ('image', 'variants'),
+}
+
+_executor = None
+
+
+def available_formats():
+    """The configured formats this Pillow build can encode, best first."""
+    Image.init()
+    formats = [name for name in settings.IMAGE_DERIVATIVE_FORMATS if FORMATS[name][0] in Image.SAVE]
+    skipped = set(settings.IMAGE_DERIVATIVE_FORMATS) - set(formats)
+    if skipped:
+        logger.warning('Pillow cannot encode %s; skipping', ', '.join(sorted(skipped)))
+    return formats
+
+
+def derivative_name(name, width, extension):
+    stem, _ext = os.path.splitext(name)
+    return f'{DERIVATIVES_DIR}/{stem}-{width}w.{extension}'
+
+
+def _flatten(image):
+    """An RGB copy of `image`, transparency composited over white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(name, widths=None, formats=None, storage=None):
+    """
+    Render and store the derivatives of the stored image `name`.
+
+    Touches only the storage, never the database, so it can run in a
+    worker process.
+
+    Returns:
+        dict: The variants structure for the image's JSON column
+
+    Raises:
+        OSError: If the original cannot be read or a derivative written
+        UnidentifiedImageError: If the original is not an image
+    """
+    storage = storage or default_storage
+    widths = sorted(widths or settings.IMAGE_DERIVATIVE_WIDTHS)
+    formats = formats or available_formats()
+
+    with storage.open(name, 'rb') as f:
+        original = Image.open(f)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if original.mode in ('LA', 'P') else 'RGB')
+
+    # Never upscale: widths past the original collapse into one at its width
+    targets = [width for width in widths if width < original.width] or [original.width]
+    if original.width <= widths[-1] and original.width not in targets:
+        targets.append(original.width)
+
+    sizes = []
+    for width in targets:
+        height = max(1, round(original.height * width / original.width))
+        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+        size = {'width': width, 'height': height}
+        for fmt in formats:
+            pillow_format, extension, options = FORMATS[fmt]
+            buffer = BytesIO()
+            (_flatten(resized) if fmt == 'jpeg' else resized).save(buffer, pillow_format, **options)
+            target = derivative_name(name, width, extension)
+            if storage.exists(target):
+                storage.delete(target)  # Otherwise the storage picks another name
+            size[fmt] = storage.save(target, ContentFile(buffer.getvalue()))
+        sizes.append(size)
+    return {'source': name, 'sizes': sizes}
+
+
+def srcset(file, variants):
+    """
+    srcset strings per format for an image field, or None.
+
+    Returns None when the image has no derivatives or they were made from
+    a previous upload.
+    """
+    if not file or not variants or variants.get('source') != file.name:
+        return None
+    sets = {}
+    for size in variants['sizes']:
+        for fmt in FORMATS:
+            if fmt in size:
+                sets.setdefault(fmt, []).append(f"{default_storage.url(size[fmt])} {size['width']}w")
+    return {fmt: ', '.join(entries) for fmt, entries in sets.items()} or None
+
+
+def render(name, widths, formats):
+    """
+    generate_derivatives() for worker processes.
+
+    Returns:
+        tuple: (variants, None) on success, (None, error message) otherwise
+    """
+    try:
+        return generate_derivatives(name, widths, formats), None
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        return None, str(e)
+
+
+def needs_derivatives(instance):
+    image_field, variants_field = IMAGE_FIELDS[type(instance).__name__]
+    name = getattr(instance, image_field).name
+    return bool(name) and (getattr(instance, variants_field) or {}).get('source') != name
+
+
+def store_variants(model, pk, variants):
+    """
+    Save variants unless the image was replaced while they were rendered.
+
+    Derivatives of the previous upload that the new ones did not overwrite
+    are deleted from the storage. A deduplicating storage may share them
+    with other rows, so there only those no row refers to anymore go.
+
+    Returns:
+        bool: Whether the row was updated
+    """
+    image_field, variants_field = IMAGE_FIELDS[model.__name__]
+    rows = model.objects.filter(pk=pk, **{image_field: variants['source']})
+    previous = rows.values_list(variants_field, flat=True).first()
+    if not rows.update(**{variants_field: variants}):
+        return False
+    # The srcsets are part of the detail representation, versioned by updated_at
+    university_ids = [pk] if model is University else model.objects.filter(pk=pk).values('university_id')
+    University.objects.filter(pk__in=university_ids).update(updated_at=timezone.now())
+    stale = _derivative_names(previous) - _derivative_names(variants)
+    if stale and getattr(default_storage, 'deduplicates', False):
+        stale -= referenced_derivatives(stale)
+    for name in stale:
+        default_storage.delete(name)
+    return True
+
+
+def _derivative_names(variants):
+    return {name for size in (variants or {}).get('sizes', []) for fmt, name in size.items() if fmt in FORMATS}
+
+
+def referenced_derivatives(names):
+    """
+    The derivative file names among `names` that a row still refers to.
+
+    On PostgreSQL the rows are found by containment lookups on the
+    GIN-indexed variants columns (migration 0008); other databases read
+    the columns whole.
+    """
+    extensions = {extension: fmt for fmt, (_pillow_format, extension, _options) in FORMATS.items()}
+    referenced = set()
+    for model in (University, UniversityImage):
+        _image_field, variants_field = IMAGE_FIELDS[model.__name__]
+        rows = model.objects.order_by().values_list(variants_field, flat=True)
+        if connections[rows.db].vendor == 'postgresql':
+            condition = Q()
+            for name in names:
+                fmt = extensions[os.path.splitext(name)[1][1:]]
+                condition |= Q(**{f'{variants_field}__contains': {'sizes': [{fmt: name}]}})
+            rows = rows.filter(condition)
+        for variants in rows.iterator():
+            referenced |= names & _derivative_names(variants)
+    return referenced
+
+
+def process(model, pk, name):
+    """Generate and store the derivatives of one upload; errors are logged."""
+    try:
+        variants = generate_derivatives(name)
+        if store_variants(model, pk, variants):
+            bump_catalog_version()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning('Could not render derivatives of %s: %s', name, e)
+
+
+def _process_in_thread(*args):
+    try:
+        process(*args)
+    finally:
+        connections.close_all()  # This thread's connections only
+
+
+def schedule_derivatives(instance):
+    """
+    Render derivatives for a new or replaced upload once it is committed.
+
+    IMAGE_DERIVATIVES_MODE 'thread' (the default) renders in a background
+    thread pool, 'sync' inline (tests, single-process tools) and 'off'
+    leaves it to rebuild_images.
+    """
+    mode = settings.IMAGE_DERIVATIVES_MODE
+    if mode == 'off' or not needs_derivatives(instance):
+        return
+    image_field, _variants_field = IMAGE_FIELDS[type(instance).__name__]
+    args = (type(instance), instance.pk, getattr(instance, image_field).name)
+
+    def submit():
+        global _executor
+        if mode == 'sync':
+            process(*args)
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix='derivatives')
+        _executor.submit(_process_in_thread, *args)
+
+    transaction.on_commit(submit)
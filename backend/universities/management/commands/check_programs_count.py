@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from universities.counters import programs_count_subquery, update_programs_count
+from universities.models import University
+
+
+class Command(BaseCommand):
+    help = 'Checks the stored University.programs_count against the programs table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Recompute the counters of universities that are out of sync',
+        )
+
+    def handle(self, *args, **options):
+        mismatched = (
+            University.objects
+            .annotate(actual_count=programs_count_subquery(University))
+            .exclude(programs_count=F('actual_count'))
+            .values_list('pk', flat=True)
+        )
+        mismatched_ids = list(mismatched)
+
+        if not mismatched_ids:
+            self.stdout.write(self.style.SUCCESS('All programs counts are consistent'))
+            return
+
+        sample = ', '.join(str(pk) for pk in mismatched_ids[:20])
+        self.stdout.write(self.style.WARNING(
+            f'{len(mismatched_ids)} universities have a stale programs count (ids: {sample}'
+            f"{', ...' if len(mismatched_ids) > 20 else ''})"
+        ))
+
+        if not options['fix']:
+            raise CommandError('Programs counts are inconsistent; run with --fix to repair them')
+
+        updated = update_programs_count(University.objects.filter(pk__in=mismatched_ids))
+        self.stdout.write(self.style.SUCCESS(f'Fixed programs count for {updated} universities'))
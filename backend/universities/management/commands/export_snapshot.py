@@ -0,0 +1,35 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from universities.columnar import FORMATS, snapshot_dir, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes Parquet/Arrow snapshots of the catalog tables if the catalog changed since the last one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', dest='formats', action='append', choices=FORMATS,
+            help='Snapshot format; repeat for several (default: parquet)',
+        )
+        parser.add_argument('--force', action='store_true', help='Rewrite even if the snapshot is up to date')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows read and written at a time')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        for fmt in options['formats'] or ['parquet']:
+            started = time.monotonic()
+            try:
+                manifest, written = write_snapshot(fmt, force=options['force'], chunk_size=options['chunk_size'])
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            if not written:
+                self.stdout.write(f'{fmt}: up to date (version {manifest["version"]})')
+                continue
+            tables = ', '.join(f'{name} {table["rows"]} rows' for name, table in manifest['tables'].items())
+            self.stdout.write(self.style.SUCCESS(
+                f'{fmt}: wrote version {manifest["version"]} to {snapshot_dir(fmt)} '
+                f'({tables}) in {time.monotonic() - started:.1f}s'
+            ))
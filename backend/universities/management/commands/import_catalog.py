@@ -0,0 +1,194 @@
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from universities.bulk import BATCH_SIZE, UNIVERSITY_FIELDS, CatalogWriter
+from universities.models import University
+
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no', '')
+REQUIRED_FIELDS = ('external_id', 'name', 'city', 'tuition')
+
+
+def _decimal(value):
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValueError(f'not a number: {value!r}')
+    return number
+
+
+def _check_decimal(field, value):
+    """Raise ValueError unless `value` fits the model's DecimalField `field`."""
+    model_field = University._meta.get_field(field)
+    try:
+        stored = value.quantize(Decimal(1).scaleb(-model_field.decimal_places))  # Rounded as it is saved
+    except InvalidOperation:
+        stored = None
+    if stored is None or len(stored.as_tuple().digits) > model_field.max_digits:
+        integer_digits = model_field.max_digits - model_field.decimal_places
+        raise ValueError(f'{field} is out of range (at most {integer_digits} digits before the decimal point)')
+
+
+def _integer(value):
+    return None if value in (None, '') else int(value)
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in TRUE_VALUES:
+        return True
+    if str(value).strip().lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f'not a boolean: {value!r}')
+
+
+PARSERS = {
+    'tuition': _decimal,
+    'rating': _decimal,
+    'has_dormitory': _boolean,
+    'founded_year': _integer,
+    'students_count': _integer,
+}
+
+STUDY_FORMS = [choice for choice, _label in University.STUDY_FORM_CHOICES]
+
+
+def clean_university(record):
+    """Convert an input record into a CatalogWriter row; raises ValueError."""
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    row = {'external_id': str(record['external_id']).strip()}
+    for field in UNIVERSITY_FIELDS:
+        if field not in record:
+            continue
+        value = record[field]
+        if field in PARSERS:
+            value = PARSERS[field](value)
+            if isinstance(value, Decimal):
+                _check_decimal(field, value)
+        else:
+            value = '' if value is None else str(value).strip()
+            max_length = University._meta.get_field(field).max_length
+            if max_length and len(value) > max_length:
+                raise ValueError(f'{field} is longer than {max_length} characters')
+        row[field] = value
+
+    if 'study_form' in row and row['study_form'] not in STUDY_FORMS:
+        raise ValueError(f"study_form must be one of: {', '.join(STUDY_FORMS)}")
+
+    if 'programs' in record:
+        programs = record['programs']
+        if isinstance(programs, str):
+            # CSV cells hold codes separated by semicolons
+            programs = [code.strip() for code in programs.split(';') if code.strip()]
+        elif not isinstance(programs, (list, type(None))):
+            raise ValueError('programs must be a list or a ;-separated string')
+        row['programs'] = [str(code) for code in programs or []]
+    return row
+
+
+def clean_program(record):
+    """Convert an input record into a program row; raises ValueError."""
+    code = str(record.get('code') or '').strip()
+    title = str(record.get('title') or '').strip()
+    if not code or not title:
+        raise ValueError('code and title are required')
+    if len(code) > 50 or len(title) > 255:
+        raise ValueError('code or title is too long')
+    return {'code': code, 'title': title}
+
+
+class Command(BaseCommand):
+    help = 'Imports programs and universities from CSV or JSON Lines files, upserting in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--programs', metavar='FILE', help='Programs file (code, title); - for stdin')
+        parser.add_argument(
+            '--universities',
+            metavar='FILE',
+            help='Universities file keyed by external_id; `programs` holds program codes '
+                 '(a JSON list, or separated by ";" in CSV); - for stdin',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['auto', 'csv', 'jsonl'],
+            default='auto',
+            help='Input format (default: by file extension)',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per batch')
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Abort on the first invalid row instead of skipping it',
+        )
+
+    def handle(self, *args, **options):
+        if not options['programs'] and not options['universities']:
+            raise CommandError('Nothing to import: pass --programs and/or --universities')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        self.strict = options['strict']
+        self.skipped = 0
+        self.started = time.monotonic()
+        writer = CatalogWriter(batch_size=options['batch_size'], progress=self.report_progress)
+
+        # Programs first so that university rows can reference new codes
+        if options['programs']:
+            writer.write_programs(self.read(options['programs'], options['format'], clean_program))
+        if options['universities']:
+            writer.write_universities(self.read(options['universities'], options['format'], clean_university))
+        stats = writer.finish()
+
+        elapsed = time.monotonic() - self.started
+        rows = stats['programs'] + stats['universities']
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['programs']} programs, {stats['universities']} universities and "
+            f"{stats['memberships']} memberships in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):.0f} rows/s)"
+        ))
+        if stats['unknown_programs']:
+            self.stdout.write(self.style.WARNING(f"Ignored {stats['unknown_programs']} unknown program codes"))
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {self.skipped} invalid rows'))
+
+    def report_progress(self, kind, count):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'  {kind}: {count} rows ({count / max(elapsed, 1e-6):.0f} rows/s)')
+
+    def read(self, path, fmt, clean):
+        """Stream cleaned rows from a CSV or JSON Lines file."""
+        if fmt == 'auto':
+            fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        try:
+            stream = nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        with stream as stream:
+            if fmt == 'csv':
+                records = enumerate(csv.DictReader(stream), start=2)
+            else:
+                records = ((number, line) for number, line in enumerate(stream, start=1) if line.strip())
+            for number, record in records:
+                try:
+                    if fmt == 'jsonl':
+                        record = json.loads(record)
+                        if not isinstance(record, dict):
+                            raise ValueError('expected a JSON object')
+                    yield clean(record)
+                except ValueError as e:
+                    if self.strict:
+                        raise CommandError(f'{path}:{number}: {e}')
+                    self.skipped += 1
+                    self.stderr.write(f'{path}:{number}: skipped ({e})')
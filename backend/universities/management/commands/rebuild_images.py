@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from universities.caching import bump_catalog_version
+from universities.images import IMAGE_FIELDS, available_formats, render, store_variants
+from universities.models import University, UniversityImage
+
+
+MODELS = {'logos': University, 'gallery': UniversityImage}
+
+
+class Command(BaseCommand):
+    help = 'Renders missing or outdated derivatives of logos and gallery images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument('--only', choices=list(MODELS), help='Process only logos or only gallery images')
+        parser.add_argument('--force', action='store_true', help='Also re-render images whose derivatives are current')
+        parser.add_argument('--batch-size', type=int, default=500, help='Images handed to the pool at a time')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+        formats = available_formats()
+        if not formats:
+            raise CommandError('Pillow cannot encode any of IMAGE_DERIVATIVE_FORMATS')
+
+        job = partial(render, widths=settings.IMAGE_DERIVATIVE_WIDTHS, formats=formats)
+        models = [MODELS[options['only']]] if options['only'] else list(MODELS.values())
+        self.started = time.monotonic()
+        self.done = self.failed = 0
+
+        # Forked workers must not share the parent's database connections
+        for connection in connections.all():
+            if not connection.in_atomic_block:
+                connection.close()
+        with ProcessPoolExecutor(options['workers'], initializer=django.setup) as pool:
+            for model in models:
+                for batch in self.pending(model, options['force'], options['batch_size']):
+                    names = [name for _pk, name in batch]
+                    for (pk, name), (variants, error) in zip(batch, pool.map(job, names, chunksize=4)):
+                        if error:
+                            self.failed += 1
+                            self.stderr.write(f'{name}: {error}')
+                        elif store_variants(model, pk, variants):
+                            self.done += 1
+                    self.report_progress()
+
+        if self.done:
+            bump_catalog_version()
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered derivatives of {self.done} images with {options["workers"]} workers in {elapsed:.1f}s'
+        ))
+        if self.failed:
+            self.stdout.write(self.style.WARNING(f'{self.failed} images could not be read'))
+
+    def pending(self, model, force, batch_size):
+        """Yield batches of (pk, image name) needing derivatives, walking by primary key."""
+        image_field, variants_field = IMAGE_FIELDS[model.__name__]
+        rows = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True}).order_by('pk')
+        last_pk = 0
+        while True:
+            chunk = list(rows.filter(pk__gt=last_pk).values_list('pk', image_field, variants_field)[:batch_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            batch = [(pk, name) for pk, name, variants in chunk if force or (variants or {}).get('source') != name]
+            if batch:
+                yield batch
+
+    def report_progress(self):
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(f'  {self.done + self.failed} images ({(self.done + self.failed) / max(elapsed, 1e-6):.1f}/s)')
@@ -1,11 +1,30 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from universities.bulk import BATCH_SIZE, CatalogWriter
 from universities.models import University, Program
+from universities.synthetic import program_rows, university_rows
 
 
 class Command(BaseCommand):
-    help = 'Seeds the database with sample universities and programs'
+    help = 'Seeds the database with sample universities and programs, or a synthetic catalog with --scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            help='Generate this many synthetic universities instead of the sample data',
+        )
+        parser.add_argument('--programs', type=int, default=200, help='Synthetic programs to generate')
+        parser.add_argument('--images-per-uni', type=int, default=0, help='Gallery images per synthetic university')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same catalog')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per batch')
 
     def handle(self, *args, **options):
+        if options['scale'] is not None:
+            self.seed_synthetic(options)
+            return
+
         if Program.objects.exists():
             self.stdout.write(self.style.WARNING('Data already exists. Skipping seed.'))
             return
@@ -554,3 +573,33 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS(f'Successfully seeded {len(universities_data)} universities and {len(programs_data)} programs'))
 
+
+    def seed_synthetic(self, options):
+        """Generate a deterministic catalog and write it through the bulk writer."""
+        if options['scale'] < 0 or options['programs'] < 0 or options['images_per_uni'] < 0:
+            raise CommandError('--scale, --programs and --images-per-uni must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.monotonic()
+
+        def progress(kind, count):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f'  {kind}: {count} rows ({count / max(elapsed, 1e-6):.0f} rows/s)')
+
+        writer = CatalogWriter(batch_size=options['batch_size'], progress=progress)
+        programs = list(program_rows(options['programs'], seed=options['seed']))
+        writer.write_programs(programs)
+        writer.write_universities(university_rows(
+            options['scale'],
+            [program['code'] for program in programs],
+            images_per_university=options['images_per_uni'],
+            seed=options['seed'],
+        ))
+        stats = writer.finish()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {stats['universities']} universities, {stats['programs']} programs, "
+            f"{stats['memberships']} memberships and {stats['images']} images "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
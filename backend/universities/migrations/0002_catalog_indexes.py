@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['-rating', 'name'], name='university_rating_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['tuition', '-rating', 'name'], name='university_tuition_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['name'], name='university_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['founded_year'], name='university_founded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['city', '-rating', 'name'], name='university_city_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['study_form', '-rating', 'name'], name='university_form_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(condition=models.Q(('has_dormitory', True)), fields=['-rating', 'name'], name='university_dorm_rating_idx'),
+        ),
+    ]
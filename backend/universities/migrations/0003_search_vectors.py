@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:40
+
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+# GIN indexes cannot be declared portably in Meta.indexes (SQLite is used
+# for local development), so they are created here on PostgreSQL only.
+SEARCH_INDEXES = [
+    ('university_search_idx', 'universities_university', 'search_vector'),
+    ('university_name_trgm_idx', 'universities_university', 'name gin_trgm_ops'),
+    ('program_search_idx', 'universities_program', 'search_vector'),
+    ('program_title_trgm_idx', 'universities_program', 'title gin_trgm_ops'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column})')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+# The vectors of universities.search, copied so that this migration does
+# not change when the search does
+def weighted(expression, weight):
+    return (
+        SearchVector(expression, config='russian', weight=weight)
+        + SearchVector(expression, config='simple', weight=weight)
+    )
+
+
+def backfill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    db_alias = schema_editor.connection.alias
+    Program = apps.get_model('universities', 'Program')
+    University = apps.get_model('universities', 'University')
+    Program.objects.using(db_alias).update(search_vector=weighted('title', 'A') + weighted('code', 'B'))
+    program_titles = (
+        Program.objects.using(db_alias)
+        .filter(universities=OuterRef('pk'))
+        .values('universities')
+        .annotate(titles=StringAgg('title', delimiter=' '))
+        .values('titles')
+    )
+    University.objects.using(db_alias).update(search_vector=(
+        weighted('name', 'A')
+        + weighted('city', 'B')
+        + weighted(Subquery(program_titles), 'C')
+        + weighted('description', 'D')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0002_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='university',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_programs_count(apps, schema_editor):
+    # As universities.counters.update_programs_count did at this migration
+    db_alias = schema_editor.connection.alias
+    University = apps.get_model('universities', 'University')
+    Membership = University._meta.get_field('programs').remote_field.through
+    counts = (
+        Membership.objects.using(db_alias)
+        .filter(university_id=OuterRef('pk'))
+        .values('university_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    University.objects.using(db_alias).update(programs_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0003_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='university',
+            name='programs_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_programs_count, migrations.RunPython.noop),
+    ]
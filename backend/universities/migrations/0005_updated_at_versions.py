@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0004_programs_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='program',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['updated_at'], name='program_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='university',
+            index=models.Index(fields=['updated_at'], name='university_updated_idx'),
+        ),
+    ]
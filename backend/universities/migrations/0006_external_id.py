@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0005_updated_at_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='university',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+    ]
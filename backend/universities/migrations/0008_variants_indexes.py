@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+# Containment lookups on the variants columns find the rows still referring
+# to a derivative (universities.images.referenced_derivatives). GIN indexes
+# are PostgreSQL-only, so they are created here rather than in Meta.indexes.
+VARIANTS_INDEXES = [
+    ('university_logo_variants_idx', 'universities_university', 'logo_variants'),
+    ('universityimage_variants_idx', 'universities_universityimage', 'variants'),
+]
+
+
+def create_variants_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in VARIANTS_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} jsonb_path_ops)')
+
+
+def drop_variants_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _column in VARIANTS_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('universities', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_variants_indexes, drop_variants_indexes),
+    ]
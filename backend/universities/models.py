@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -5,9 +6,15 @@ class Program(models.Model):
     """Academic program model."""
     title = models.CharField(max_length=255)
     code = models.CharField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by universities.search; GIN-indexed on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['updated_at'], name='program_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.code} - {self.title}"
@@ -22,14 +29,20 @@ class University(models.Model):
         ('both', 'Full-time & Part-time'),
     ]
     
+    # Identifier in the source registry; the upsert key of import_catalog
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     name = models.CharField(max_length=255)
     city = models.CharField(max_length=100)
     description = models.TextField()
     logo = models.ImageField(upload_to='universities/logos/', blank=True, null=True)
+    # Resized copies of the logo, written by universities.images
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     iframe_3d_tour_url = models.URLField(max_length=500, blank=True)
     tuition = models.DecimalField(max_digits=12, decimal_places=2, help_text='Annual tuition fee')
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     programs = models.ManyToManyField(Program, related_name='universities', blank=True)
+    # Kept in sync with `programs` by universities.counters
+    programs_count = models.PositiveIntegerField(default=0, editable=False)
     study_form = models.CharField(max_length=20, choices=STUDY_FORM_CHOICES, default='full-time')
     has_dormitory = models.BooleanField(default=False)
     
@@ -44,12 +57,49 @@ class University(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained by universities.search; GIN-indexed on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         verbose_name_plural = 'Universities'
         ordering = ['-rating', 'name']
+        indexes = [
+            # Default catalog ordering and the sort orders offered by the API
+            models.Index(fields=['-rating', 'name'], name='university_rating_name_idx'),
+            models.Index(fields=['tuition', '-rating', 'name'], name='university_tuition_idx'),
+            models.Index(fields=['name'], name='university_name_idx'),
+            models.Index(fields=['founded_year'], name='university_founded_idx'),
+            # MAX(updated_at) for conditional GET validators
+            models.Index(fields=['updated_at'], name='university_updated_idx'),
+            # Equality filters followed by the default ordering
+            models.Index(fields=['city', '-rating', 'name'], name='university_city_rating_idx'),
+            models.Index(fields=['study_form', '-rating', 'name'], name='university_form_rating_idx'),
+            # Selective boolean filter only needs the matching rows
+            models.Index(
+                fields=['-rating', 'name'],
+                condition=models.Q(has_dormitory=True),
+                name='university_dorm_rating_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.name
+    
+    # Columns maintained with queryset updates (see universities.signals and
+    # universities.images); an in-memory copy may be stale, so save() never
+    # writes them back
+    DENORMALIZED_FIELDS = ('programs_count', 'search_vector', 'logo_variants')
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
 
 class UniversityImage(models.Model):
@@ -60,6 +110,8 @@ class UniversityImage(models.Model):
         on_delete=models.CASCADE
     )
     image = models.ImageField(upload_to='universities/gallery/')
+    # Resized copies of the image, written by universities.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
     
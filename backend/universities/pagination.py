@@ -0,0 +1,263 @@
+"""
+Pagination for the university catalog.
+
+Page-number pagination stays the default. Clients that walk deep into the
+catalog can switch to keyset pagination with `?pagination=cursor` and then
+follow the `next`/`previous` links. A keyset page is a single index range
+scan: there is no COUNT(*) and no OFFSET, so page 10 000 costs the same as
+page 1.
+
+The admin changelist uses EstimatedCountPaginator, which reads the size
+of an unfiltered table from the PostgreSQL statistics instead of counting.
+"""
+
+import base64
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _ordering_key(item):
+    """Return (field name, descending) for an order_by() entry."""
+    if isinstance(item, OrderBy) and isinstance(item.expression, F):
+        return item.expression.name, item.descending
+    if isinstance(item, str):
+        name, descending = (item[1:], True) if item.startswith('-') else (item, False)
+        return ('id' if name == 'pk' else name), descending
+    raise ValueError(f'Unsupported ordering for keyset pagination: {item!r}')
+
+
+def _encode_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over the queryset's own ordering.
+
+    The ordering is whatever the filter backends produced (or the model's
+    Meta.ordering), with `id` appended as a unique tiebreaker. The cursor
+    holds the ordering values of the boundary row, and the next page is the
+    rows strictly after it. NULLs always sort last.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+        values, reverse = cursor if cursor else (None, False)
+
+        if values is not None:
+            queryset = queryset.filter(self.seek_condition(values, reverse))
+        queryset = queryset.order_by(*self.order_expressions(reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_ordering(self, queryset):
+        ordering = [_ordering_key(item) for item in (queryset.query.order_by or queryset.model._meta.ordering)]
+        if 'id' not in [name for name, _descending in ordering]:
+            ordering.append(('id', False))
+        self.nullable = set()
+        for name, _descending in ordering:
+            try:
+                if queryset.model._meta.get_field(name).null:
+                    self.nullable.add(name)
+            except FieldDoesNotExist:
+                pass  # Annotations such as the search rank
+        return ordering
+
+    def order_expressions(self, reverse):
+        expressions = []
+        for name, descending in self.ordering:
+            nulls = {}
+            if name in self.nullable:
+                nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            if descending != reverse:
+                expressions.append(F(name).desc(**nulls))
+            else:
+                expressions.append(F(name).asc(**nulls))
+        return expressions
+
+    def seek_condition(self, values, reverse):
+        """
+        Build the WHERE clause selecting rows after (or before) the cursor row.
+
+        Expands the row comparison into
+            f1 > v1 OR (f1 = v1 AND f2 > v2) OR (f1 = v1 AND f2 = v2 AND f3 > v3) ...
+        with the comparison direction taken from each field's ordering.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, values):
+            condition |= equal & self.beyond(name, descending, value, reverse)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+        # Redundant bound on the leading column so the database can seek into
+        # the index instead of filtering every row before the cursor
+        name, descending = self.ordering[0]
+        if name not in self.nullable:
+            lookup = 'lte' if descending != reverse else 'gte'
+            condition = Q(**{f'{name}__{lookup}': values[0]}) & condition
+        return condition
+
+    def beyond(self, name, descending, value, reverse):
+        """Rows strictly past `value` in the scan direction for one field."""
+        if value is None:
+            # NULLs sort last: nothing follows them, every non-NULL precedes them
+            return Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition = Q(**{f'{name}__{lookup}': value})
+        if name in self.nullable and not reverse:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = data['v'], bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, instance, reverse):
+        values = [_encode_value(getattr(instance, name)) for name, _descending in self.ordering]
+        data = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CatalogPagination(BasePagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+
+    `?pagination=cursor` (or any request carrying a `cursor`) is served by
+    KeysetPagination; everything else keeps the `count`/`page` responses
+    existing clients rely on.
+    """
+
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keyset = KeysetPagination()
+        if (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or keyset.cursor_query_param in request.query_params
+        ):
+            self.paginator = keyset
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+
+def estimated_count(queryset):
+    """
+    The planner's row estimate for the table of an unfiltered queryset.
+
+    Returns:
+        int or None: None off PostgreSQL, for filtered querysets and for
+        tables that have not been analyzed yet
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where or queryset.query.distinct:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0 before PostgreSQL 14) until the first ANALYZE
+    return row[0] if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that does not COUNT(*) large unfiltered tables.
+
+    Unfiltered tables above `estimate_threshold` rows report the statistics
+    estimate (kept current by autovacuum), so the last page number is
+    approximate; filtered querysets and small tables are counted exactly.
+    """
+
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= self.estimate_threshold:
+            return estimate
+        return super().count
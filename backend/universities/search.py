@@ -0,0 +1,100 @@
+"""
+Full-text and fuzzy search for universities and programs.
+
+On PostgreSQL each University and Program keeps a weighted `search_vector`
+(GIN-indexed) and the names/titles carry a pg_trgm index, so a search is a
+bitmap OR of two index scans ranked by relevance:
+
+    University: name (A) > city (B) > program titles (C) > description (D)
+    Program:    title (A) > code (B)
+
+Every field is indexed with the `russian` configuration (stemming) and the
+`simple` one, which keeps Kazakh words and proper names intact. Other
+databases fall back to case-insensitive substring matching.
+"""
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, OuterRef, Q, Subquery
+
+
+SEARCH_CONFIGS = ('russian', 'simple')
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _weighted(expression, weight):
+    vector = None
+    for config in SEARCH_CONFIGS:
+        part = SearchVector(expression, config=config, weight=weight)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def _search_query(text):
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(text, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def update_university_search_vectors(queryset):
+    """Recompute `search_vector` for the given universities in one UPDATE."""
+    if not _is_postgres(queryset):
+        return
+    program_model = queryset.model._meta.get_field('programs').related_model
+    program_titles = (
+        program_model.objects
+        .filter(universities=OuterRef('pk'))
+        .values('universities')
+        .annotate(titles=StringAgg('title', delimiter=' '))
+        .values('titles')
+    )
+    queryset.update(search_vector=(
+        _weighted('name', 'A')
+        + _weighted('city', 'B')
+        + _weighted(Subquery(program_titles), 'C')
+        + _weighted('description', 'D')
+    ))
+
+
+def update_program_search_vectors(queryset):
+    """Recompute `search_vector` for the given programs in one UPDATE."""
+    if not _is_postgres(queryset):
+        return
+    queryset.update(search_vector=_weighted('title', 'A') + _weighted('code', 'B'))
+
+
+def _search(queryset, text, trigram_field, fallback_fields):
+    if not _is_postgres(queryset):
+        condition = Q()
+        for field in fallback_fields:
+            condition |= Q(**{f'{field}__icontains': text})
+        return queryset.filter(condition)
+
+    query = _search_query(text)
+    return (
+        queryset
+        .filter(Q(search_vector=query) | Q(**{f'{trigram_field}__trigram_word_similar': text}))
+        .annotate(rank=SearchRank(F('search_vector'), query) + TrigramWordSimilarity(text, trigram_field))
+        .order_by('-rank', 'pk')
+    )
+
+
+def search_universities(queryset, text):
+    """Filter universities matching `text`, best matches first."""
+    return _search(queryset, text, 'name', ['name', 'city', 'description'])
+
+
+def search_programs(queryset, text):
+    """Filter programs matching `text`, best matches first."""
+    return _search(queryset, text, 'title', ['title', 'code'])
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .images import srcset as image_srcset
 from .models import University, Program, UniversityImage
 
 
@@ -20,30 +21,45 @@ class RelativeImageField(serializers.ImageField):
         return value.url
 
 
+class SrcsetField(serializers.Field):
+    """
+    srcset strings per format for the derivatives of an image field.
+    
+    E.g. {"webp": "/media/derivatives/...-160w.webp 160w, ...", "jpeg": "..."},
+    or null until the derivatives exist (see universities.images).
+    """
+    
+    def __init__(self, image_field, variants_field, **kwargs):
+        self.image_field = image_field
+        self.variants_field = variants_field
+        super().__init__(source='*', read_only=True, **kwargs)
+    
+    def to_representation(self, instance):
+        return image_srcset(getattr(instance, self.image_field), getattr(instance, self.variants_field))
+
+
 class UniversityImageSerializer(serializers.ModelSerializer):
     """Serializer for UniversityImage model."""
     image = RelativeImageField()
+    srcset = SrcsetField('image', 'variants')
     
     class Meta:
         model = UniversityImage
-        fields = ['id', 'image', 'caption', 'order']
+        fields = ['id', 'image', 'srcset', 'caption', 'order']
 
 
 class UniversityListSerializer(serializers.ModelSerializer):
     """Serializer for university list view (compact)."""
-    programs_count = serializers.SerializerMethodField()
     logo = RelativeImageField()
+    logo_srcset = SrcsetField('logo', 'logo_variants')
     
     class Meta:
         model = University
         fields = [
-            'id', 'name', 'city', 'logo', 'description',
+            'id', 'name', 'city', 'logo', 'logo_srcset', 'description',
             'tuition', 'rating', 'study_form', 'has_dormitory',
             'programs_count'
         ]
-    
-    def get_programs_count(self, obj):
-        return obj.programs.count()
 
 
 class UniversityDetailSerializer(serializers.ModelSerializer):
@@ -52,11 +68,12 @@ class UniversityDetailSerializer(serializers.ModelSerializer):
     images = UniversityImageSerializer(many=True, read_only=True)
     study_form_display = serializers.CharField(source='get_study_form_display', read_only=True)
     logo = RelativeImageField()
+    logo_srcset = SrcsetField('logo', 'logo_variants')
     
     class Meta:
         model = University
         fields = [
-            'id', 'name', 'city', 'description', 'logo',
+            'id', 'name', 'city', 'description', 'logo', 'logo_srcset',
             'iframe_3d_tour_url', 'tuition', 'rating',
             'programs', 'study_form', 'study_form_display',
             'has_dormitory', 'address', 'phone', 'email',
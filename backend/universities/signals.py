@@ -0,0 +1,104 @@
+"""
+Signal handlers keeping denormalized catalog data in sync with edits.
+
+Connected in UniversitiesConfig.ready(). Bulk writes (bulk_create,
+queryset.update, raw SQL) bypass these handlers and must refresh the
+affected rows themselves through the helpers in universities.search and
+universities.counters, and call universities.caching.bump_catalog_version().
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .counters import update_programs_count
+from .images import schedule_derivatives
+from .models import University, Program, UniversityImage
+from .search import update_university_search_vectors, update_program_search_vectors
+
+
+def _universities_of(program):
+    return list(program.universities.values_list('pk', flat=True))
+
+
+def _memberships_changed(university_ids):
+    universities = University.objects.filter(pk__in=university_ids)
+    # updated_at is the version of everything the detail endpoint renders
+    update_programs_count(universities, updated_at=timezone.now())
+    update_university_search_vectors(universities)
+
+
+@receiver(post_save, sender=University)
+def university_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_university_search_vectors(University.objects.filter(pk=instance.pk))
+    schedule_derivatives(instance)
+
+
+@receiver(post_save, sender=UniversityImage)
+def university_image_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_derivatives(instance)
+
+
+@receiver(post_save, sender=Program)
+def program_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_program_search_vectors(Program.objects.filter(pk=instance.pk))
+    # The title is part of the vectors of every university teaching it
+    update_university_search_vectors(University.objects.filter(pk__in=_universities_of(instance)))
+
+
+@receiver(pre_delete, sender=Program)
+def program_deleting(sender, instance, **kwargs):
+    # Memberships are cascade-deleted without m2m_changed, so remember them
+    instance._affected_university_ids = _universities_of(instance)
+
+
+@receiver(post_delete, sender=Program)
+def program_deleted(sender, instance, **kwargs):
+    _memberships_changed(getattr(instance, '_affected_university_ids', []))
+
+
+@receiver(m2m_changed, sender=University.programs.through)
+def university_programs_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # program.universities.clear(): post_clear has no pk_set
+        instance._affected_university_ids = _universities_of(instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        university_ids = [instance.pk]
+    elif action == 'post_clear':
+        university_ids = getattr(instance, '_affected_university_ids', [])
+    else:
+        university_ids = list(pk_set or [])
+    _memberships_changed(university_ids)
+
+
+@receiver(post_save, sender=UniversityImage)
+@receiver(post_delete, sender=UniversityImage)
+def university_image_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    University.objects.filter(pk=instance.university_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=University)
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=UniversityImage)
+@receiver(post_delete, sender=UniversityImage)
+@receiver(m2m_changed, sender=University.programs.through)
+def catalog_changed(sender, action=None, **kwargs):
+    if action is not None and not action.startswith('post_'):
+        return
+    # Fixture loads (raw) change the catalog too, so they are not skipped here
+    bump_catalog_version()
@@ -0,0 +1,213 @@
+"""
+Precompressed snapshot of the bare university list.
+
+`GET /api/universities/` without query parameters is the hottest request of
+the site. Its JSON body is rendered once per catalog version, compressed
+with gzip and brotli, and stored in the catalog cache, so serving it is a
+cache read and a byte copy:
+
+    catalog:<version>:snapshot:<origin>
+        -> {'content_type': ..., 'encodings': {'identity': b'...', 'gzip': ..., 'br': ...}}
+
+The key includes the origin (scheme and host) because the payload holds an
+absolute `next` link. Snapshots are built lazily by the first request after
+a change, and rebuilt eagerly when an admin save or delete commits.
+
+Only page 1 of the default list is snapshotted. Any query parameter,
+`?page=` included, falls through to the view and its response cache.
+
+Each encoding is a different representation, so the list's ETag names
+the content coding (see response_encoding and universities.conditional).
+"""
+
+import gzip
+import logging
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.urls import resolve, reverse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from .caching import fresh_reads, get_cache, get_catalog_version
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ORIGINS_KEY = 'catalog:snapshot:origins'
+MAX_ORIGINS = 10
+# Marks the internal request that renders a snapshot; not settable over HTTP
+BUILD_ENVIRON_KEY = 'unihub.snapshot_build'
+
+
+def _snapshot_key(origin):
+    return f'catalog:{get_catalog_version()}:snapshot:{origin}'
+
+
+ENCODINGS = ('identity', 'gzip') + (('br',) if brotli is not None else ())
+
+
+def compress(content):
+    """Return the identity, gzip and (if available) brotli encodings of `content`."""
+    encodings = {
+        'identity': content,
+        'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        encodings['br'] = brotli.compress(content, mode=brotli.MODE_TEXT)
+    return encodings
+
+
+class SnapshotRequest(HttpRequest):
+    """The internal request rendering a snapshot: a bare JSON GET of the list from `origin`."""
+
+    def __init__(self, origin):
+        super().__init__()
+        self._scheme, host = origin.split('://', 1)
+        self.method = 'GET'
+        self.path = self.path_info = reverse('university-list')
+        self.META = {
+            'HTTP_HOST': host,
+            'HTTP_ACCEPT': 'application/json',
+            'SERVER_NAME': host.split(':')[0],
+            'SERVER_PORT': '443' if self._scheme == 'https' else '80',
+            BUILD_ENVIRON_KEY: True,
+        }
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+def _render_list(origin):
+    request = SnapshotRequest(origin)
+    match = resolve(request.path_info)
+    response = match.func(request, *match.args, **match.kwargs)
+    response.render()
+    return response
+
+
+def build_snapshot(origin):
+    """
+    Render the bare list for `origin` and store it for the current version.
+
+    Args:
+        origin: Scheme and host, e.g. "https://unihub.kz"
+
+    Returns:
+        dict: The stored encodings, or None if the list did not render
+    """
+    version_key = _snapshot_key(origin)
+    with fresh_reads():
+        response = _render_list(origin)
+    if response.status_code != 200:
+        return None
+    snapshot = {
+        'content_type': response['Content-Type'],
+        'encodings': compress(response.content),
+    }
+    get_cache().set(version_key, snapshot, settings.CATALOG_CACHE_TTL)
+    return snapshot
+
+
+def _remember_origin(origin):
+    cache = get_cache()
+    origins = cache.get(ORIGINS_KEY) or []
+    if origin not in origins:
+        cache.set(ORIGINS_KEY, ([origin] + origins)[:MAX_ORIGINS], None)
+
+
+def rebuild_snapshots():
+    """Build snapshots of the current version for every origin seen recently."""
+    cache = get_cache()
+    for origin in cache.get(ORIGINS_KEY) or []:
+        if cache.get(_snapshot_key(origin)) is None:
+            try:
+                build_snapshot(origin)
+            except Exception:
+                # A failed prewarm only means the next reader builds it
+                logger.exception('Failed to rebuild catalog snapshot for %s', origin)
+
+
+def schedule_snapshot_rebuild():
+    """Rebuild snapshots once the current transaction commits."""
+    transaction.on_commit(rebuild_snapshots)
+
+
+def _accepted_encodings(header):
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    return accepted
+
+
+def choose_encoding(header, available):
+    """Pick the best of `available` encodings for an Accept-Encoding header."""
+    accepted = _accepted_encodings(header or '')
+    for coding in ('br', 'gzip'):
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if coding in available and quality > 0:
+            return coding
+    return 'identity'
+
+
+def response_encoding(request):
+    """The content coding of the response to a DRF request: the snapshot's, or identity."""
+    if not is_snapshot_request(request):
+        return 'identity'
+    return choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), ENCODINGS)
+
+
+def is_snapshot_request(request):
+    """Whether a DRF request asks for the bare list as JSON (and caching is on)."""
+    return (
+        bool(settings.CATALOG_CACHE_TTL)
+        and not request.query_params
+        and isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer)
+        and not request.META.get(BUILD_ENVIRON_KEY)
+    )
+
+
+def serve_catalog_snapshot(func):
+    """
+    View decorator answering the bare list from the snapshot.
+
+    Any other request (query parameters, browsable API, the snapshot build
+    itself) falls through to the wrapped view.
+    """
+    @wraps(func)
+    def inner(request, *args, **kwargs):
+        if not is_snapshot_request(request):
+            return func(request, *args, **kwargs)
+
+        origin = f'{request.scheme}://{request.get_host()}'
+        snapshot = get_cache().get(_snapshot_key(origin))
+        hit = snapshot is not None
+        if not hit:
+            _remember_origin(origin)
+            snapshot = build_snapshot(origin)
+            if snapshot is None:
+                return func(request, *args, **kwargs)
+
+        encodings = snapshot['encodings']
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), encodings)
+        response = HttpResponse(encodings[encoding], content_type=snapshot['content_type'])
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        response['X-Snapshot'] = 'HIT' if hit else 'MISS'
+        return response
+    return inner
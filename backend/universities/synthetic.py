@@ -0,0 +1,125 @@
+"""
+Deterministic synthetic catalog for load and performance testing.
+
+Generates programs and universities with production-like distributions:
+cities weighted towards the largest ones, a share of free (grant) places
+and log-normal tuition, ratings clustered around 4, mostly full-time
+study, and program popularity following a Zipf-like curve, so a few
+programs are taught almost everywhere and most in a handful of places.
+
+The same seed always yields the same rows, and rows carry stable
+`external_id`s and program codes, so re-running upserts rather than
+duplicates. Rows are in the format of universities.bulk.CatalogWriter.
+"""
+
+import math
+import random
+from itertools import accumulate
+
+
+# City weights roughly follow the number of universities per city
+CITIES = [
+    ('Алматы', 30), ('Астана', 18), ('Шымкент', 8), ('Караганда', 6),
+    ('Актобе', 4), ('Тараз', 3), ('Павлодар', 3), ('Өскемен', 3),
+    ('Семей', 3), ('Атырау', 2), ('Костанай', 2), ('Кызылорда', 2),
+    ('Орал', 2), ('Петропавловск', 2), ('Актау', 2), ('Туркестан', 2),
+    ('Кокшетау', 1), ('Талдыкорган', 1), ('Жезказган', 1), ('Экибастуз', 1),
+]
+
+STUDY_FORMS = [('full-time', 60), ('both', 30), ('part-time', 10)]
+
+NAME_PREFIXES = [
+    'Национальный', 'Государственный', 'Международный', 'Казахский',
+    'Евразийский', 'Региональный', 'Инновационный', 'Частный',
+]
+NAME_KINDS = [
+    'университет', 'технический университет', 'педагогический университет',
+    'медицинский университет', 'университет экономики и права', 'аграрный университет',
+    'университет искусств', 'инженерно-технологический университет',
+]
+DESCRIPTIONS = [
+    'Многопрофильный вуз с сильной исследовательской базой.',
+    'Университет с акцентом на практико-ориентированное обучение и стажировки.',
+    'Вуз с программами двойного диплома и международными партнерами.',
+    'Региональный центр подготовки инженеров и педагогов.',
+    'Современный кампус, лаборатории и активная студенческая жизнь.',
+]
+
+PROGRAM_FIELDS = [
+    ('CS', 'Computer Science'), ('BA', 'Business Administration'), ('ME', 'Mechanical Engineering'),
+    ('MD', 'Medicine'), ('LW', 'Law'), ('EC', 'Economics'), ('PS', 'Psychology'),
+    ('AR', 'Architecture'), ('DS', 'Data Science'), ('IR', 'International Relations'),
+    ('EE', 'Electrical Engineering'), ('MK', 'Marketing'), ('CE', 'Civil Engineering'),
+    ('CH', 'Chemistry'), ('PH', 'Physics'), ('MA', 'Mathematics'), ('BI', 'Biology'),
+    ('PE', 'Petroleum Engineering'), ('AG', 'Agronomy'), ('JR', 'Journalism'),
+    ('TR', 'Translation Studies'), ('ED', 'Pedagogy'), ('FN', 'Finance'), ('TM', 'Tourism'),
+]
+PROGRAM_QUALIFIERS = ['', 'Applied', 'Industrial', 'International', 'Digital', 'Environmental', 'Quantitative']
+
+
+def _weighted_picker(rng, weighted):
+    values = [value for value, _weight in weighted]
+    cumulative = list(accumulate(weight for _value, weight in weighted))
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+def program_rows(count, seed=0):
+    """Yield `count` programs with stable codes."""
+    rng = random.Random(f'programs:{seed}')
+    for index in range(count):
+        prefix, field = PROGRAM_FIELDS[index % len(PROGRAM_FIELDS)]
+        qualifier = PROGRAM_QUALIFIERS[(index // len(PROGRAM_FIELDS)) % len(PROGRAM_QUALIFIERS)]
+        title = f'{qualifier} {field}'.strip()
+        if index >= len(PROGRAM_FIELDS) * len(PROGRAM_QUALIFIERS):
+            title = f'{title} ({rng.choice(["Bachelor", "Master", "PhD"])} track {index})'
+        yield {'code': f'{prefix}{index:05d}', 'title': title}
+
+
+def university_rows(count, program_codes, images_per_university=0, seed=0):
+    """
+    Yield `count` universities drawing memberships from `program_codes`.
+
+    Programs earlier in the list are more popular (weight 1 / rank^0.9).
+    """
+    rng = random.Random(f'universities:{seed}')
+    city = _weighted_picker(rng, CITIES)
+    study_form = _weighted_picker(rng, STUDY_FORMS)
+    program_weights = list(accumulate(1 / (rank + 1) ** 0.9 for rank in range(len(program_codes))))
+
+    for index in range(count):
+        if rng.random() < 0.08:
+            tuition = 0  # State grant places only
+        else:
+            # Median around 1.3M tenge, rounded to 50 000 like real price lists
+            tuition = min(max(rng.lognormvariate(math.log(1300000), 0.45), 300000), 6000000)
+            tuition = round(tuition / 50000) * 50000
+
+        programs = []
+        if program_codes:
+            size = min(len(program_codes), max(1, int(rng.expovariate(1 / 8))))
+            programs = list(dict.fromkeys(rng.choices(program_codes, cum_weights=program_weights, k=size)))
+
+        row = {
+            'external_id': f'synthetic-{index}',
+            'name': f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_KINDS)} №{index + 1}',
+            'city': city(),
+            'description': rng.choice(DESCRIPTIONS),
+            'tuition': tuition,
+            'rating': round(2.5 + 2.5 * rng.betavariate(5, 2), 2),
+            'study_form': study_form(),
+            'has_dormitory': rng.random() < 0.65,
+            'founded_year': None if rng.random() < 0.05 else int(min(2023, max(1920, rng.gauss(1992, 18)))),
+            'students_count': int(min(max(rng.lognormvariate(math.log(4000), 0.9), 200), 60000)),
+            'programs': programs,
+        }
+        if images_per_university:
+            row['images'] = [
+                {
+                    # Placeholder paths; the files themselves are not generated
+                    'image': f'universities/gallery/synthetic/{(index + order) % 50}.jpg',
+                    'caption': f'Кампус, фото {order + 1}',
+                    'order': order,
+                }
+                for order in range(images_per_university)
+            ]
+        yield row
@@ -0,0 +1,1775 @@
+"""
+Universities App Tests
+
+Tests for the catalog API: filtering, ordering and the indexes backing them.
+"""
+
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from operator import itemgetter
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, router, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APITestCase
+from rest_framework import status
+from PIL import Image
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from ai.views import AsyncCompareSummaryView, ChatView, CompareSummaryView
+from config import dbrouter
+from config.dbrouter import PIN_COOKIE, view_replica_reads
+from config.media import is_hashed
+from config.pgpool import ConnectionPool, PoolTimeout, close_pools, pool_stats
+from config.pgpool.base import DatabaseWrapper as PooledDatabaseWrapper
+from config.querybudget import capture_queries
+
+from . import columnar
+from .caching import CHANGED_KEY, bump_catalog_version, get_cache
+from .export import chunks
+from .filters import filter_universities
+from .images import generate_derivatives
+from .models import University, Program, UniversityImage
+from .pagination import EstimatedCountPaginator, KeysetPagination, estimated_count
+from .snapshot import brotli, choose_encoding
+from .views import UniversityViewSet
+
+
+def create_university(**kwargs):
+    """Create a university with sensible defaults for the required fields."""
+    defaults = {
+        'city': 'Алматы',
+        'description': 'Test university',
+        'tuition': 1000000,
+        'rating': 4.0,
+        'study_form': 'full-time',
+        'has_dormitory': False,
+    }
+    defaults.update(kwargs)
+    return University.objects.create(**defaults)
+
+
+class UniversityFilterTests(APITestCase):
+    """Tests for the query-parameter filters on /api/universities/."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.url = reverse('university-list')
+
+        self.cs = Program.objects.create(title="Computer Science", code="CS101")
+        self.law = Program.objects.create(title="Law", code="LW501")
+
+        self.free = create_university(
+            name="Free University", city="Астана", tuition=0, rating=4.9,
+            study_form='full-time', has_dormitory=True, founded_year=2010
+        )
+        self.cheap = create_university(
+            name="Cheap University", city="Алматы", tuition=800000, rating=4.1,
+            study_form='part-time', founded_year=1990
+        )
+        self.medium = create_university(
+            name="Medium University", city="Алматы", tuition=1500000, rating=4.5,
+            study_form='both', has_dormitory=True, founded_year=1934
+        )
+        self.expensive = create_university(
+            name="Expensive University", city="Шымкент", tuition=2800000, rating=3.8,
+            study_form='full-time'
+        )
+        self.free.programs.add(self.cs)
+        self.medium.programs.add(self.cs, self.law)
+        self.expensive.programs.add(self.law)
+
+    def get_names(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [u['name'] for u in response.json()['results']]
+
+    def test_no_filters_uses_default_ordering(self):
+        """Test that the unfiltered list is sorted by rating, then name."""
+        self.assertEqual(self.get_names({}), [
+            "Free University", "Medium University", "Cheap University", "Expensive University"
+        ])
+
+    def test_filter_by_city(self):
+        """Test filtering by a single city and by several cities."""
+        self.assertEqual(self.get_names({'city': 'Алматы'}), ["Medium University", "Cheap University"])
+        self.assertEqual(
+            self.get_names({'city': 'Астана,Шымкент'}),
+            ["Free University", "Expensive University"]
+        )
+
+    def test_filter_by_tuition_range(self):
+        """Test the named tuition buckets used by the frontend."""
+        self.assertEqual(self.get_names({'tuition_range': 'free'}), ["Free University"])
+        self.assertEqual(self.get_names({'tuition_range': 'low'}), ["Cheap University"])
+        self.assertEqual(self.get_names({'tuition_range': 'medium'}), ["Medium University"])
+        self.assertEqual(self.get_names({'tuition_range': 'high'}), ["Expensive University"])
+
+    def test_filter_by_tuition_bounds(self):
+        """Test explicit tuition bounds."""
+        self.assertEqual(
+            self.get_names({'tuition_min': '500000', 'tuition_max': '2000000'}),
+            ["Medium University", "Cheap University"]
+        )
+
+    def test_filter_by_study_form(self):
+        """Test that 'both' matches the full-time and part-time filters."""
+        self.assertEqual(
+            self.get_names({'study_form': 'full-time'}),
+            ["Free University", "Medium University", "Expensive University"]
+        )
+        self.assertEqual(
+            self.get_names({'study_form': 'part-time'}),
+            ["Medium University", "Cheap University"]
+        )
+        self.assertEqual(self.get_names({'study_form': 'both'}), ["Medium University"])
+
+    def test_filter_by_programs(self):
+        """Test that a program filter matches any of the given programs without duplicates."""
+        self.assertEqual(self.get_names({'programs': str(self.cs.id)}), ["Free University", "Medium University"])
+        self.assertEqual(
+            self.get_names({'programs': f"{self.cs.id},{self.law.id}"}),
+            ["Free University", "Medium University", "Expensive University"]
+        )
+
+    def test_filter_by_dormitory(self):
+        """Test filtering by dormitory availability."""
+        self.assertEqual(self.get_names({'has_dormitory': 'true'}), ["Free University", "Medium University"])
+        self.assertEqual(self.get_names({'has_dormitory': 'false'}), ["Cheap University", "Expensive University"])
+
+    def test_combined_filters(self):
+        """Test that filters are combined with AND."""
+        self.assertEqual(
+            self.get_names({'city': 'Алматы', 'has_dormitory': 'true', 'study_form': 'part-time'}),
+            ["Medium University"]
+        )
+
+    def test_ordering(self):
+        """Test the supported sort orders."""
+        self.assertEqual(self.get_names({'ordering': 'tuition'})[0], "Free University")
+        self.assertEqual(self.get_names({'ordering': '-tuition'})[0], "Expensive University")
+        self.assertEqual(self.get_names({'ordering': 'name'})[0], "Cheap University")
+        founded = [n for n in self.get_names({'ordering': 'founded_year'}) if n != "Expensive University"]
+        self.assertEqual(founded, ["Medium University", "Cheap University", "Free University"])
+
+    def test_invalid_values(self):
+        """Test that invalid filter values return 400."""
+        for params in (
+            {'tuition_range': 'cheap'},
+            {'study_form': 'evening'},
+            {'tuition_min': 'abc'},
+            {'programs': '1,x'},
+            {'has_dormitory': 'maybe'},
+        ):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class SearchTests(APITestCase):
+    """Tests for ?q= search on /api/universities/ and /api/programs/."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.cs = Program.objects.create(title="Информатика", code="CS101")
+        self.law = Program.objects.create(title="Юриспруденция", code="LW501")
+
+        self.nu = create_university(
+            name="Назарбаев Университет", city="Астана", rating=4.9,
+            description="Исследовательский университет"
+        )
+        self.kaznu = create_university(
+            name="Казахский национальный университет", city="Алматы", rating=4.6,
+            description="Крупнейший классический университет"
+        )
+        self.narxoz = create_university(
+            name="Нархоз Университет", city="Алматы", rating=4.5,
+            description="Экономический университет с программами по информатике"
+        )
+        self.nu.programs.add(self.cs)
+        self.kaznu.programs.add(self.law)
+
+    def search(self, url_name, text):
+        response = self.client.get(reverse(url_name), {'q': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item.get('name', item.get('title')) for item in response.data['results']]
+
+    def test_university_search_by_name(self):
+        """Test searching universities by name."""
+        self.assertEqual(self.search('university-list', 'Назарбаев'), ["Назарбаев Университет"])
+
+    def test_university_search_by_city(self):
+        """Test searching universities by city."""
+        self.assertCountEqual(
+            self.search('university-list', 'Алматы'),
+            ["Казахский национальный университет", "Нархоз Университет"]
+        )
+
+    def test_university_search_combines_with_filters(self):
+        """Test that search is applied together with the catalog filters."""
+        response = self.client.get(reverse('university-list'), {'q': 'Университет', 'city': 'Астана'})
+        self.assertEqual([u['name'] for u in response.data['results']], ["Назарбаев Университет"])
+
+    def test_blank_query_returns_everything(self):
+        """Test that an empty q parameter does not filter."""
+        self.assertEqual(len(self.search('university-list', '  ')), 3)
+
+    def test_program_search(self):
+        """Test searching programs by title and code."""
+        self.assertEqual(self.search('program-list', 'Юриспруденция'), ["Юриспруденция"])
+        self.assertEqual(self.search('program-list', 'CS101'), ["Информатика"])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_program_titles_are_searchable(self):
+        """Test that universities are found by the titles of their programs."""
+        self.assertEqual(self.search('university-list', 'юриспруденция'), ["Казахский национальный университет"])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_name_matches_rank_above_description_matches(self):
+        """Test field weighting: program titles rank above descriptions."""
+        self.assertEqual(
+            self.search('university-list', 'информатика')[:2],
+            ["Назарбаев Университет", "Нархоз Университет"]
+        )
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Trigram search requires PostgreSQL')
+    def test_typo_tolerance(self):
+        """Test that misspelled Cyrillic names still match through pg_trgm."""
+        self.assertEqual(self.search('university-list', 'Назарбаеф')[0], "Назарбаев Университет")
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL')
+    def test_vectors_follow_program_changes(self):
+        """Test that vectors are refreshed when memberships and titles change."""
+        self.narxoz.programs.add(self.law)
+        self.assertIn("Нархоз Университет", self.search('university-list', 'юриспруденция'))
+        self.law.title = "Право"
+        self.law.save()
+        self.assertEqual(self.search('university-list', 'юриспруденция'), [])
+
+
+class BulkRetrieveTests(APITestCase):
+    """Tests for /api/universities/bulk/."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.url = reverse('university-bulk')
+        self.program = Program.objects.create(title="Computer Science", code="CS101")
+        self.universities = [create_university(name=f"University {i}") for i in range(4)]
+        for university in self.universities:
+            university.programs.add(self.program)
+
+    def test_keeps_requested_order(self):
+        """Test that results follow the order of the ids parameter."""
+        ids = [self.universities[i].id for i in (2, 0, 3)]
+        response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([u['id'] for u in response.data], ids)
+        self.assertIn('programs_count', response.data[0])
+
+    def test_detail_view(self):
+        """Test the detailed representation with a fixed number of queries."""
+        ids = ','.join(str(u.id) for u in self.universities)
+        # two validator aggregates, universities, programs prefetch, images prefetch
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, {'ids': ids, 'view': 'detail'})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(response.data[0]['programs'][0]['code'], "CS101")
+
+    def test_missing_and_duplicate_ids(self):
+        """Test that unknown ids are skipped and duplicates collapsed."""
+        first = self.universities[0].id
+        response = self.client.get(self.url, {'ids': f"{first},999999,{first}"})
+        self.assertEqual([u['id'] for u in response.data], [first])
+
+    def test_invalid_ids(self):
+        """Test validation of the ids parameter."""
+        for ids in ('', '1,a', ','.join(str(i) for i in range(1, 102))):
+            response = self.client.get(self.url, {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ids)
+
+
+class ExportTests(APITestCase):
+    """Tests for /api/universities/export/."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.url = reverse('university-export')
+        self.programs = [Program.objects.create(title=f"Program {i}", code=f"P{i}") for i in range(2)]
+        self.unis = [create_university(name=f"University {i}", external_id=f"ext-{i}") for i in range(3)]
+        self.unis[0].programs.add(*self.programs)
+        UniversityImage.objects.create(university=self.unis[1], image='universities/gallery/a.jpg')
+
+    def export(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig'), response
+
+    def test_ndjson(self):
+        """Test that each line is the detail representation of one university."""
+        content, response = self.export({'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('universities.ndjson', response['Content-Disposition'])
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record['id'] for record in records], [uni.pk for uni in self.unis])
+        self.assertEqual(records[0], self.client.get(reverse('university-detail', args=[self.unis[0].pk])).json())
+        self.assertEqual([program['code'] for program in records[0]['programs']], ['P0', 'P1'])
+        self.assertEqual(len(records[1]['images']), 1)
+
+    def test_csv(self):
+        """Test the import columns and the list filters."""
+        self.unis[2].city = 'Астана'
+        self.unis[2].save()
+        content, response = self.export({'format': 'csv', 'city': 'Алматы'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['external_id'] for row in rows], ['ext-0', 'ext-1'])
+        self.assertEqual(rows[0]['programs'], 'P0;P1')
+
+    def test_batched_queries(self):
+        """Test that the number of queries depends on chunks, not rows."""
+        with capture_queries() as log:
+            self.export({'format': 'ndjson'})
+        for i in range(3, 9):
+            create_university(name=f"University {i}").programs.add(self.programs[0])
+        with capture_queries() as more:
+            self.export({'format': 'ndjson'})
+        self.assertEqual(more.count, log.count)
+
+        with patch('universities.export.CHUNK_SIZE', 3), capture_queries() as chunked:
+            content, _response = self.export({'format': 'ndjson'})
+        self.assertEqual(len(content.splitlines()), 9)
+        self.assertGreater(chunked.count, log.count)
+
+    def test_keyset_chunks_without_server_side_cursors(self):
+        """Test that chunks are read by keyset when server-side cursors are disabled (pgbouncer)."""
+        for i in range(3, 5):
+            create_university(name=f"University {i}")
+        with patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            with patch('universities.export.CHUNK_SIZE', 2), capture_queries() as log:
+                content, _response = self.export({'format': 'ndjson'})
+            batches = list(chunks(University.objects.values_list('pk', 'name'), 2, key=itemgetter(0)))
+        self.assertEqual([json.loads(line)['name'] for line in content.splitlines()], [f"University {i}" for i in range(5)])
+        self.assertEqual(sum(count for shape, count in log.shapes.items() if 'LIMIT 2' in shape), 3)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(batches[2][0][1], "University 4")
+
+    async def test_asgi(self):
+        """Test that under ASGI the export streams an async iterator instead of being buffered."""
+        response = await self.async_client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([part async for part in response.streaming_content])
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 3)
+
+    def test_errors(self):
+        """Test invalid filters and unknown formats."""
+        response = self.client.get(self.url, {'format': 'ndjson', 'tuition_min': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tuition_min', json.loads(response.content))
+        response = self.client.get(self.url, {'format': 'csv', 'tuition_min': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.content.startswith(b'tuition_min,'))
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 404)
+
+
+@unittest.skipUnless(columnar.available(), 'pyarrow is not installed')
+class ColumnarSnapshotTests(APITestCase):
+    """Tests for the Parquet/Arrow catalog snapshots."""
+
+    def setUp(self):
+        """Set up test data and a temporary snapshot directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = self.settings(CATALOG_SNAPSHOT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.programs = [Program.objects.create(title=f"Program {i}", code=f"P{i}") for i in range(2)]
+        self.unis = [create_university(name=f"University {i}", tuition=Decimal('1000.50')) for i in range(3)]
+        self.unis[0].programs.add(*self.programs)
+
+    def path(self, manifest, table):
+        return os.path.join(columnar.snapshot_dir(manifest['format']), manifest['tables'][table]['file'])
+
+    def test_parquet(self):
+        """Test the tables, their types and chunked row groups."""
+        import pyarrow.parquet
+
+        manifest, written = columnar.write_snapshot('parquet', chunk_size=2)
+        self.assertTrue(written)
+        self.assertEqual({name: table['rows'] for name, table in manifest['tables'].items()}, {
+            'universities': 3, 'programs': 2, 'memberships': 2,
+        })
+        universities = pyarrow.parquet.ParquetFile(self.path(manifest, 'universities'))
+        self.assertEqual(universities.num_row_groups, 2)
+        self.assertEqual(universities.metadata.row_group(0).column(0).compression, 'ZSTD')
+        table = universities.read()
+        self.assertEqual(table.column('name').to_pylist(), ["University 0", "University 1", "University 2"])
+        self.assertEqual(table.column('tuition').to_pylist()[0], Decimal('1000.50'))
+        self.assertEqual(str(table.schema.field('updated_at').type), 'timestamp[us, tz=UTC]')
+        memberships = pyarrow.parquet.read_table(self.path(manifest, 'memberships'))
+        self.assertEqual(sorted(memberships.column('program_id').to_pylist()), sorted(p.pk for p in self.programs))
+
+    def test_arrow(self):
+        """Test the Arrow IPC format."""
+        import pyarrow.ipc
+
+        manifest, _written = columnar.write_snapshot('arrow')
+        with pyarrow.ipc.open_file(self.path(manifest, 'programs')) as reader:
+            self.assertEqual(reader.read_all().column('code').to_pylist(), ['P0', 'P1'])
+
+    def test_incremental(self):
+        """Test that snapshots are rewritten only when the catalog changes."""
+        manifest, _written = columnar.write_snapshot('parquet')
+        self.assertFalse(columnar.write_snapshot('parquet')[1])
+        self.assertTrue(columnar.write_snapshot('parquet', force=True)[1])
+
+        self.unis[1].programs.add(self.programs[1])
+        changed, written = columnar.write_snapshot('parquet')
+        self.assertTrue(written)
+        self.assertNotEqual(changed['version'], manifest['version'])
+        self.assertEqual(changed['tables']['memberships']['rows'], 3)
+        self.assertFalse(os.path.exists(self.path(manifest, 'universities')))
+        self.assertEqual(len(os.listdir(columnar.snapshot_dir('parquet'))), 4)
+
+    def test_writer_rechecks_under_lock(self):
+        """Test that a writer finding the snapshot written while it waited for the lock keeps it."""
+        written = {}
+        lock = columnar._writer_lock
+
+        @contextmanager
+        def contended_lock(fmt):
+            with lock(fmt):
+                written['manifest'] = columnar._write(fmt, columnar.snapshot_dir(fmt), columnar.catalog_version(), None)
+            with lock(fmt):
+                yield
+
+        with patch.object(columnar, '_writer_lock', contended_lock):
+            manifest, was_written = columnar.write_snapshot('parquet')
+        self.assertFalse(was_written)
+        self.assertEqual(manifest, written['manifest'])
+
+    def test_endpoint(self):
+        """Test the manifest and the immutable table files."""
+        url = reverse('catalog-snapshot', args=['parquet'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        columnar.write_snapshot('parquet')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        url = response.json()['tables']['universities']['url']
+        self.assertTrue(url.startswith('http://testserver/api/catalog-snapshot/parquet/universities-'))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PAR1'))
+        response = self.client.get(reverse('catalog-snapshot-file', args=['parquet', 'universities-0.parquet']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_endpoint_rewrites_for_staff_only(self):
+        """Test that only staff requests rewrite an outdated snapshot."""
+        url = reverse('catalog-snapshot', args=['parquet'])
+        manifest, _written = columnar.write_snapshot('parquet')
+        self.unis[1].programs.add(self.programs[1])
+        self.assertEqual(self.client.get(url).json()['version'], manifest['version'])
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.assertNotEqual(self.client.get(url).json()['version'], manifest['version'])
+
+    def test_command(self):
+        """Test the export_snapshot command."""
+        out = StringIO()
+        call_command('export_snapshot', '--format', 'parquet', '--format', 'arrow', stdout=out)
+        self.assertIn('parquet: wrote version', out.getvalue())
+        self.assertIn('arrow: wrote version', out.getvalue())
+        out = StringIO()
+        call_command('export_snapshot', stdout=out)
+        self.assertIn('parquet: up to date', out.getvalue())
+
+
+class ConditionalGetTests(APITestCase):
+    """Tests for ETag/Last-Modified revalidation of catalog endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.program = Program.objects.create(title="Computer Science", code="CS101")
+        self.uni = create_university(name="Cached University")
+        self.uni.programs.add(self.program)
+
+    def assertRevalidates(self, url, params=None):
+        """Fetch, then revalidate with If-None-Match and expect 304; return the ETag."""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'), 'ETag must be strong')
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_catalog_endpoints_revalidate(self):
+        """Test that every catalog GET endpoint answers 304 for a current ETag."""
+        self.assertRevalidates(reverse('university-list'))
+        self.assertRevalidates(reverse('university-detail', args=[self.uni.pk]))
+        self.assertRevalidates(reverse('university-bulk'), {'ids': str(self.uni.pk)})
+        self.assertRevalidates(reverse('program-list'))
+        self.assertRevalidates(reverse('filter-options'))
+
+    def test_not_modified_skips_serialization(self):
+        """Test that a 304 is answered from the cached validators."""
+        url = reverse('university-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_etag_depends_on_query(self):
+        """Test that filtered lists get their own ETags."""
+        url = reverse('university-list')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'city': 'Астана'})['ETag'])
+
+    def test_list_etag_changes_on_edit_and_delete(self):
+        """Test that list validators follow edits and deletions."""
+        url = reverse('university-list')
+        etag = self.assertRevalidates(url)
+        other = create_university(name="Another University")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get(url)['ETag']
+        other.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_follows_related_changes(self):
+        """Test that detail validators follow programs and memberships."""
+        url = reverse('university-detail', args=[self.uni.pk])
+        for change in (
+            lambda: self.uni.programs.add(Program.objects.create(title="Law", code="LW501")),
+            lambda: Program.objects.filter(pk=self.program.pk).update(title="Informatics", updated_at=timezone.now()),
+            lambda: self.uni.programs.clear(),
+        ):
+            # Timestamps can collide within the clock resolution of the test database
+            University.objects.filter(pk=self.uni.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+            bump_catalog_version()
+            etag = self.client.get(url)['ETag']
+            change()
+            bump_catalog_version()  # queryset.update() bypasses the signals
+            self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_missing_university(self):
+        """Test that unknown ids still return 404."""
+        self.assertEqual(self.client.get(reverse('university-detail', args=[999999])).status_code, 404)
+
+
+class CatalogCacheTests(APITestCase):
+    """Tests for the versioned catalog response cache."""
+
+    def setUp(self):
+        """Set up test data with an empty cache."""
+        get_cache().clear()
+        self.program = Program.objects.create(title="Computer Science", code="CS101")
+        self.uni = create_university(name="Cached University")
+        self.uni.programs.add(self.program)
+
+    def assertCached(self, url, params=None):
+        """Fetch twice and expect the second response from the cache; return its data."""
+        first = self.client.get(url, params)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(url, params)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+        return second.json()
+
+    def test_catalog_endpoints_are_cached(self):
+        """Test that repeated reads of every catalog endpoint skip the database."""
+        self.assertCached(reverse('university-list'), {'page': 1})
+        self.assertCached(reverse('university-list'), {'city': 'Алматы', 'ordering': '-rating'})
+        self.assertCached(reverse('university-detail', args=[self.uni.pk]))
+        self.assertCached(reverse('university-bulk'), {'ids': str(self.uni.pk)})
+        self.assertCached(reverse('program-list'))
+        self.assertCached(reverse('filter-options'))
+
+    def test_save_and_delete_invalidate(self):
+        """Test that model saves and deletes bump the catalog version."""
+        url = reverse('university-list')
+        self.assertCached(url, {'page': 1})
+
+        self.uni.name = "Renamed University"
+        self.uni.save()
+        response = self.client.get(url, {'page': 1})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], "Renamed University")
+
+        self.uni.delete()
+        self.assertEqual(self.client.get(url, {'page': 1}).data['count'], 0)
+
+    def test_related_changes_invalidate(self):
+        """Test that memberships, programs and images invalidate the detail view."""
+        url = reverse('university-detail', args=[self.uni.pk])
+        self.assertCached(url)
+        for change in (
+            lambda: self.uni.programs.add(Program.objects.create(title="Law", code="LW501")),
+            lambda: Program.objects.get(pk=self.program.pk).delete(),
+            lambda: UniversityImage.objects.create(university=self.uni, image='universities/gallery/a.jpg'),
+        ):
+            change()
+            self.assertCached(url)
+
+    def test_errors_are_not_cached(self):
+        """Test that 404s are computed on every request."""
+        url = reverse('university-detail', args=[999999])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotEqual(response.get('X-Cache'), 'HIT')
+
+    @override_settings(CATALOG_CACHE_TTL=0)
+    def test_zero_ttl_disables_cache(self):
+        """Test that CATALOG_CACHE_TTL=0 turns the cache off."""
+        url = reverse('university-list')
+        self.client.get(url)
+        self.assertNotIn('X-Cache', self.client.get(url))
+
+    def test_stats(self):
+        """Test the hit/miss counters and that they are staff only."""
+        url = reverse('university-list')
+        for _ in range(3):
+            self.client.get(url, {'page': 1})
+
+        stats_url = reverse('cache-stats')
+        self.assertEqual(self.client.get(stats_url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        stats = self.client.get(stats_url).data
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['hit_ratio'], 0.6667)
+
+
+class CatalogSnapshotTests(APITestCase):
+    """Tests for the precompressed snapshot of the bare university list."""
+
+    def setUp(self):
+        """Set up test data with an empty cache."""
+        get_cache().clear()
+        self.program = Program.objects.create(title="Computer Science", code="CS101")
+        self.uni = create_university(name="Snapshot University")
+        self.url = reverse('university-list')
+
+    def test_snapshot_matches_list_and_skips_database(self):
+        """Test that the bare list is served from the snapshot without queries."""
+        first = self.client.get(self.url)
+        self.assertEqual(first['X-Snapshot'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Snapshot'], 'HIT')
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(second.json(), self.client.get(self.url, {'page': 1}).json())
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'unihub.kz'])
+    @patch.object(PageNumberPagination, 'page_size', 1)
+    def test_snapshot_links_keep_origin(self):
+        """Test that the snapshot of each origin links to its own scheme and host."""
+        create_university(name="Second University")
+        response = self.client.get(self.url, secure=True, HTTP_HOST='unihub.kz')
+        self.assertEqual(response.json()['next'], 'https://unihub.kz/api/universities/?page=2')
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['next'], 'http://testserver/api/universities/?page=2')
+
+    def test_content_encodings(self):
+        """Test that the encoding follows Accept-Encoding."""
+        plain = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+
+    @unittest.skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        """Test that brotli is preferred when accepted."""
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    def test_choose_encoding(self):
+        """Test Accept-Encoding negotiation, including q-values and wildcards."""
+        available = {'identity': b'', 'gzip': b'', 'br': b''}
+        self.assertEqual(choose_encoding('br;q=0, gzip', available), 'gzip')
+        self.assertEqual(choose_encoding('*', available), 'br')
+        self.assertEqual(choose_encoding('br', {'identity': b'', 'gzip': b''}), 'identity')
+        self.assertEqual(choose_encoding(None, available), 'identity')
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_other_requests_bypass_snapshot(self):
+        """Test that query parameters and the browsable API are rendered normally."""
+        self.client.get(self.url)
+        self.assertNotIn('X-Snapshot', self.client.get(self.url, {'city': 'Алматы'}))
+        self.assertNotIn('X-Snapshot', self.client.get(self.url, HTTP_ACCEPT='text/html'))
+
+    def test_revalidation(self):
+        """Test that snapshot responses still answer If-None-Match with 304."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_names_content_coding(self):
+        """Test that each content coding has its own ETag."""
+        plain = self.client.get(self.url)['ETag']
+        gzipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertNotEqual(plain, gzipped)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=gzipped)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_rebuild_snapshot(self):
+        """Test that a save invalidates and an admin delete prewarms the snapshot."""
+        self.client.get(self.url)
+        self.uni.name = "Renamed University"
+        self.uni.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Snapshot'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], "Renamed University")
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:universities_university_delete', args=[self.uni.pk]), {'post': 'yes'})
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(response.json()['count'], 0)
+
+
+class FacetTests(APITestCase):
+    """Tests for the /api/facets/ counts."""
+
+    def setUp(self):
+        """Set up a small catalog spanning every facet."""
+        get_cache().clear()
+        self.cs = Program.objects.create(title="Computer Science", code="CS101")
+        self.law = Program.objects.create(title="Law", code="LW501")
+        create_university(name="A", city="Алматы", tuition=0, study_form='full-time', has_dormitory=True).programs.add(self.cs)
+        create_university(name="B", city="Алматы", tuition=1000000, study_form='both').programs.add(self.cs, self.law)
+        create_university(name="C", city="Астана", tuition=1500000, study_form='part-time', has_dormitory=True)
+        create_university(name="D", city="Астана", tuition=2500000, study_form='full-time').programs.add(self.law)
+        self.url = reverse('facets')
+
+    def test_counts_without_filters(self):
+        """Test facet counts over the whole catalog."""
+        data = self.client.get(self.url).data
+        self.assertEqual(data['count'], 4)
+        facets = data['facets']
+        self.assertEqual(facets['city'], {'Алматы': 2, 'Астана': 2})
+        self.assertEqual(facets['study_form'], {'full-time': 3, 'part-time': 2, 'both': 1})
+        self.assertEqual(facets['programs'], {str(self.cs.pk): 2, str(self.law.pk): 2})
+        self.assertEqual(facets['has_dormitory'], {'true': 2, 'false': 2})
+        # 1 000 000 sits on the boundary of "low" and "medium", as in the filters
+        self.assertEqual(facets['tuition_range'], {'free': 1, 'low': 1, 'medium': 2, 'high': 1})
+
+    def test_counts_match_list_filters(self):
+        """Test that every facet count equals the list count for that option."""
+        params = {'has_dormitory': 'true'}
+        facets = self.client.get(self.url, params).data['facets']
+        list_url = reverse('university-list')
+        for name, options in facets.items():
+            for option, count in options.items():
+                response = self.client.get(list_url, {**params, name: option})
+                self.assertEqual(response.data['count'], count, f'{name}={option}')
+
+    def test_facets_are_disjunctive(self):
+        """Test that a facet ignores its own filter but honours the others."""
+        data = self.client.get(self.url, {'city': 'Алматы', 'has_dormitory': 'true'}).data
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['facets']['city'], {'Алматы': 1, 'Астана': 1})
+        self.assertEqual(data['facets']['has_dormitory'], {'true': 1, 'false': 1})
+        self.assertEqual(data['facets']['programs'], {str(self.cs.pk): 1})
+
+    def test_single_query_and_cache(self):
+        """Test that facets take one query and are cached per filter combination."""
+        with self.assertNumQueries(3):  # validators for two tables + the facet query
+            self.client.get(self.url, {'city': 'Алматы', 'study_form': 'both'})
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'study_form': 'both', 'city': 'Алматы', 'page': 2})
+
+    def test_invalid_filter(self):
+        """Test that invalid filter values return 400."""
+        response = self.client.get(self.url, {'tuition_range': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportCatalogTests(TestCase):
+    """Tests for the import_catalog management command."""
+
+    def write_file(self, suffix, content):
+        """Write `content` to a temporary file and return its path."""
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('import_catalog', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def setUp(self):
+        """Set up program and university files."""
+        self.programs = self.write_file('.csv', 'code,title\nCS101,Computer Science\nLW501,Law\n')
+        self.universities = self.write_file('.csv', (
+            'external_id,name,city,tuition,rating,study_form,has_dormitory,founded_year,programs\n'
+            'kz-1,Первый университет,Алматы,1500000,4.50,both,true,1990,CS101;LW501\n'
+            'kz-2,Второй университет,Астана,0,4.90,full-time,false,,CS101;XX000\n'
+            'kz-3,Без города,,100,4.00,full-time,false,,\n'
+        ))
+
+    def test_csv_import(self):
+        """Test that a CSV import creates rows, memberships and counters."""
+        output = self.run_import('--programs', self.programs, '--universities', self.universities, '--batch-size', '1')
+        self.assertIn('Imported 2 programs, 2 universities and 3 memberships', output)
+        self.assertIn('Ignored 1 unknown program codes', output)
+        self.assertIn('Skipped 1 invalid rows', output)
+
+        first = University.objects.get(external_id='kz-1')
+        self.assertEqual(first.city, 'Алматы')
+        self.assertTrue(first.has_dormitory)
+        self.assertEqual(first.founded_year, 1990)
+        self.assertEqual(first.programs_count, 2)
+        self.assertEqual(University.objects.get(external_id='kz-2').programs_count, 1)
+
+    def test_reimport_upserts(self):
+        """Test that importing again updates rows and replaces memberships."""
+        self.run_import('--programs', self.programs, '--universities', self.universities)
+        rows = [
+            {'external_id': 'kz-1', 'name': 'Переименованный', 'city': 'Алматы', 'tuition': 900000, 'programs': ['LW501']},
+            {'external_id': 'kz-4', 'name': 'Новый', 'city': 'Шымкент', 'tuition': 500000},
+        ]
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows) + '\n')
+        self.run_import('--universities', path)
+
+        self.assertEqual(University.objects.count(), 3)
+        first = University.objects.get(external_id='kz-1')
+        self.assertEqual(first.name, 'Переименованный')
+        self.assertEqual(first.rating, Decimal('4.50'))  # Not in the file, left untouched
+        self.assertEqual(list(first.programs.values_list('code', flat=True)), ['LW501'])
+        self.assertEqual(first.programs_count, 1)
+
+    def test_sparse_rows_keep_fields(self):
+        """Test that a field another row of the batch sets is not reset on a row lacking it."""
+        self.run_import('--programs', self.programs, '--universities', self.universities)
+        rows = [
+            {'external_id': 'kz-1', 'name': 'Первый университет', 'city': 'Алматы', 'tuition': 1500000},
+            {'external_id': 'kz-2', 'name': 'Второй университет', 'city': 'Астана', 'tuition': 0, 'rating': 3.1},
+        ]
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(row, ensure_ascii=False) for row in rows) + '\n')
+        self.run_import('--universities', path)
+
+        self.assertEqual(University.objects.get(external_id='kz-1').rating, Decimal('4.50'))
+        self.assertEqual(University.objects.get(external_id='kz-2').rating, Decimal('3.10'))
+
+    def test_bad_values_skip_only_their_rows(self):
+        """Test that wrongly typed programs and out-of-range numbers reject their row, not the import."""
+        base = {'name': 'Университет', 'city': 'Алматы', 'tuition': 1000}
+        records = [
+            {**base, 'external_id': 'kz-1', 'programs': ['CS101']},
+            {**base, 'external_id': 'kz-2', 'programs': 5},
+            {**base, 'external_id': 'kz-3', 'tuition': '1e12'},
+            {**base, 'external_id': 'kz-4', 'rating': 10},
+            {**base, 'external_id': 'kz-5', 'rating': 'NaN'},
+        ]
+        path = self.write_file('.jsonl', ''.join(json.dumps(record) + '\n' for record in records))
+        output = self.run_import('--programs', self.programs, '--universities', path)
+        self.assertIn('Skipped 4 invalid rows', output)
+        self.assertEqual(list(University.objects.values_list('external_id', flat=True)), ['kz-1'])
+
+    def test_strict_mode(self):
+        """Test that --strict aborts on an invalid row."""
+        with self.assertRaisesMessage(CommandError, 'missing city'):
+            self.run_import('--universities', self.universities, '--strict')
+
+    def test_requires_input(self):
+        """Test that the command needs at least one file."""
+        with self.assertRaises(CommandError):
+            self.run_import()
+
+
+class SyntheticSeedTests(TestCase):
+    """Tests for seed_data --scale."""
+
+    def seed(self, *args):
+        """Run seed_data with a small synthetic catalog."""
+        call_command('seed_data', '--scale', '40', '--programs', '15', '--images-per-uni', '2', *args, stdout=StringIO())
+
+    def snapshot(self):
+        """Return the generated catalog as comparable rows."""
+        return list(
+            University.objects.order_by('external_id')
+            .values_list('external_id', 'name', 'city', 'tuition', 'rating', 'study_form', 'programs_count')
+        )
+
+    def test_generates_consistent_catalog(self):
+        """Test that rows, memberships, counters and images are written."""
+        self.seed()
+        self.assertEqual(University.objects.count(), 40)
+        self.assertEqual(Program.objects.count(), 15)
+        self.assertEqual(UniversityImage.objects.count(), 80)
+        call_command('check_programs_count', stdout=StringIO())
+        self.assertTrue(all(row[6] >= 1 for row in self.snapshot()))
+
+    def test_deterministic_and_idempotent(self):
+        """Test that the same seed gives the same catalog and re-running upserts."""
+        self.seed('--seed', '7')
+        first = self.snapshot()
+        self.seed('--seed', '7', '--batch-size', '7')
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(UniversityImage.objects.count(), 80)
+
+        self.seed('--seed', '8')
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_default_keeps_sample_data(self):
+        """Test that seed_data without --scale still loads the sample catalog once."""
+        call_command('seed_data', stdout=StringIO())
+        count = University.objects.count()
+        self.assertGreater(count, 0)
+        self.assertFalse(University.objects.exclude(external_id=None).exists())
+        call_command('seed_data', stdout=StringIO())
+        self.assertEqual(University.objects.count(), count)
+
+
+def image_file(name, size=(1000, 500), mode='RGB', fmt='JPEG'):
+    """An uploaded image file of the given size."""
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[160, 320, 640], IMAGE_DERIVATIVE_FORMATS=['webp', 'jpeg'])
+class ImageDerivativeTests(TestCase):
+    """Tests for resized logo and gallery derivatives."""
+
+    def setUp(self):
+        """Store media in a temporary directory."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        # Upload names stay readable; MediaTests cover content-hashed names
+        settings_override = self.settings(
+            MEDIA_ROOT=media.name, IMAGE_DERIVATIVES_MODE='sync',
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.uni = create_university(name="Pictured University")
+
+    def upload_logo(self, university, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            university.logo = file
+            university.save()
+        university.refresh_from_db()
+
+    def test_widths_and_formats(self):
+        """Test that configured widths below the original and the original width are rendered."""
+        name = default_storage.save('universities/gallery/wide.jpg', image_file('wide.jpg'))
+        variants = generate_derivatives(name)
+        self.assertEqual(variants['source'], name)
+        self.assertEqual([(size['width'], size['height']) for size in variants['sizes']], [
+            (160, 80), (320, 160), (640, 320),
+        ])
+        with default_storage.open(variants['sizes'][0]['webp']) as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+        self.assertTrue(variants['sizes'][2]['jpeg'].endswith('wide-640w.jpg'))
+
+        small = default_storage.save('universities/gallery/small.png', image_file('small.png', (200, 100), 'RGBA', 'PNG'))
+        variants = generate_derivatives(small)
+        self.assertEqual([size['width'] for size in variants['sizes']], [160, 200])
+        with default_storage.open(variants['sizes'][1]['jpeg']) as f:
+            self.assertEqual(Image.open(f).mode, 'RGB')
+
+    def test_upload_renders_srcset(self):
+        """Test that an upload gets derivatives and the API exposes srcsets."""
+        self.upload_logo(self.uni, image_file('logo.jpg', (400, 400)))
+        self.assertEqual(self.uni.logo_variants['source'], self.uni.logo.name)
+
+        response = self.client.get(reverse('university-list'), {'page': 1})
+        logo_srcset = response.json()['results'][0]['logo_srcset']
+        self.assertEqual(set(logo_srcset), {'webp', 'jpeg'})
+        self.assertRegex(logo_srcset['webp'], r'^/media/derivatives/universities/logos/logo\S*-160w\.webp 160w, ')
+        self.assertTrue(logo_srcset['jpeg'].endswith(' 400w'))
+
+    def test_replaced_upload(self):
+        """Test that derivatives of a replaced upload are ignored, then replaced."""
+        self.upload_logo(self.uni, image_file('first.jpg', (400, 400)))
+        old_names = [size['webp'] for size in self.uni.logo_variants['sizes']]
+
+        with self.settings(IMAGE_DERIVATIVES_MODE='off'):
+            self.upload_logo(self.uni, image_file('second.jpg', (400, 400)))
+        response = self.client.get(reverse('university-detail', args=[self.uni.pk]))
+        self.assertIsNone(response.json()['logo_srcset'])
+
+        call_command('rebuild_images', '--workers', '1', '--only', 'logos', stdout=StringIO())
+        self.uni.refresh_from_db()
+        self.assertEqual(self.uni.logo_variants['source'], self.uni.logo.name)
+        self.assertFalse(any(default_storage.exists(name) for name in old_names))
+
+    def test_gallery_images(self):
+        """Test gallery derivatives and the parent's detail version."""
+        updated_at = University.objects.get(pk=self.uni.pk).updated_at
+        with self.captureOnCommitCallbacks(execute=True):
+            image = UniversityImage.objects.create(university=self.uni, image=image_file('campus.jpg'))
+        image.refresh_from_db()
+        self.assertEqual(len(image.variants['sizes']), 3)
+        self.assertGreater(University.objects.get(pk=self.uni.pk).updated_at, updated_at)
+
+        response = self.client.get(reverse('university-detail', args=[self.uni.pk]))
+        self.assertIn('640w', response.json()['images'][0]['srcset']['jpeg'])
+
+    def test_unreadable_image(self):
+        """Test that a broken upload is logged, not raised."""
+        with self.assertLogs('universities.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            image = UniversityImage.objects.create(university=self.uni, image='universities/gallery/missing.jpg')
+        image.refresh_from_db()
+        self.assertEqual(image.variants, {})
+
+    def test_rebuild_images(self):
+        """Test that the command renders the backlog in worker processes."""
+        with self.settings(IMAGE_DERIVATIVES_MODE='off'):
+            self.upload_logo(self.uni, image_file('logo.jpg', (300, 300)))
+            for i in range(3):
+                UniversityImage.objects.create(university=self.uni, image=image_file(f'{i}.jpg'), order=i)
+        UniversityImage.objects.create(university=self.uni, image='universities/gallery/missing.jpg', order=9)
+
+        out, err = StringIO(), StringIO()
+        call_command('rebuild_images', '--workers', '2', stdout=out, stderr=err)
+        self.assertIn('Rendered derivatives of 4 images', out.getvalue())
+        self.assertIn('missing.jpg', err.getvalue())
+        self.assertEqual(UniversityImage.objects.filter(variants={}).count(), 1)
+
+        out = StringIO()
+        call_command('rebuild_images', '--workers', '2', stdout=out, stderr=StringIO())
+        self.assertIn('Rendered derivatives of 0 images', out.getvalue())
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[160, 320], IMAGE_DERIVATIVE_FORMATS=['webp', 'jpeg'])
+class MediaTests(TestCase):
+    """Tests for content-hashed uploads and the media view."""
+
+    def setUp(self):
+        """Store media in a temporary directory."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = self.settings(
+            MEDIA_ROOT=media.name, IMAGE_DERIVATIVES_MODE='sync', MEDIA_ACCEL_REDIRECT='',
+            DEFAULT_FILE_STORAGE='config.media.HashedFileSystemStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.name = default_storage.save('universities/logos/Logo.PNG', SimpleUploadedFile('Logo.PNG', b'0123456789'))
+        self.url = f'/media/{self.name}'
+
+    def test_hashed_names(self):
+        """Test that uploads are named by content and deduplicated."""
+        self.assertTrue(is_hashed(self.name))
+        self.assertRegex(self.name, r'^universities/logos/[0-9a-f]{32}\.png$')
+        again = default_storage.save('universities/logos/copy.png', SimpleUploadedFile('copy.png', b'0123456789'))
+        self.assertEqual(again, self.name)
+        other = default_storage.save('universities/logos/copy.png', SimpleUploadedFile('copy.png', b'other'))
+        self.assertNotEqual(other, self.name)
+
+    def test_shared_derivatives_are_kept(self):
+        """Test that replacing an upload keeps derivatives another row shares, and deletes them once unused."""
+        uni = create_university(name="Hashed University")
+        other = create_university(name="Twin University")
+        with self.captureOnCommitCallbacks(execute=True):
+            for university in (uni, other):
+                university.logo = image_file('logo.jpg', (300, 300))
+                university.save()
+        uni.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(uni.logo.name, other.logo.name)
+        shared = [size['webp'] for size in other.logo_variants['sizes']]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            uni.logo = image_file('logo.jpg', (320, 300))
+            uni.save()
+        uni.refresh_from_db()
+        self.assertNotEqual(uni.logo.name, other.logo.name)
+        self.assertTrue(all(default_storage.exists(name) for name in shared))
+
+        # Once no row refers to them anymore they are deleted
+        with self.captureOnCommitCallbacks(execute=True):
+            other.logo = image_file('logo.jpg', (340, 300))
+            other.save()
+        self.assertFalse(any(default_storage.exists(name) for name in shared))
+        current = [size['webp'] for size in University.objects.get(pk=uni.pk).logo_variants['sizes']]
+        self.assertTrue(all(default_storage.exists(name) for name in current))
+
+    def test_full_response(self):
+        """Test the caching headers of a full response."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], '"%s"' % os.path.basename(self.name)[:32])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Last-Modified', response)
+
+    def test_unhashed_name(self):
+        """Test that files saved under their own names are revalidated."""
+        path = os.path.join(settings.MEDIA_ROOT, 'legacy.txt')
+        with open(path, 'wb') as f:
+            f.write(b'legacy')
+        with self.settings(MEDIA_CACHE_MAX_AGE=60):
+            response = self.client.get('/media/legacy.txt')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        self.assertEqual(self.client.get('/media/legacy.txt', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get('/media/legacy.txt', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+
+    def test_not_modified(self):
+        """Test conditional requests."""
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_ranges(self):
+        """Test single byte ranges, suffix ranges and unsatisfiable ones."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=8-')
+        self.assertEqual(response['Content-Range'], 'bytes 8-9/10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        # Malformed and multi-range headers get the whole file
+        for header in ('bytes=5-2', 'lines=1-2', 'bytes=0-1,4-5'):
+            self.assertEqual(self.client.get(self.url, HTTP_RANGE=header).status_code, 200)
+
+    def test_if_range(self):
+        """Test that a stale If-Range validator gets the whole file."""
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_accel_redirect(self):
+        """Test that nginx is handed the transfer when configured."""
+        with self.settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(self.url, HTTP_RANGE='bytes=0-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.content, b'')
+
+    def test_accel_redirect_quotes_legacy_names(self):
+        """Test that a legacy name nginx would misread is handed over quoted."""
+        name = 'universities/logos/Логотип 100%?.png'
+        with open(os.path.join(settings.MEDIA_ROOT, name), 'wb') as f:
+            f.write(b'legacy')
+        with self.settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get('/media/' + urllib.parse.quote(name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/universities/logos/%D0%9B%D0%BE%D0%B3%D0%BE%D1%82%D0%B8%D0%BF%20100%25%3F.png',
+        )
+
+    def test_bad_paths(self):
+        """Test that missing files, directories and paths outside MEDIA_ROOT are 404s."""
+        for path in ('missing.png', 'universities/logos', '../settings.py', '/etc/passwd'):
+            self.assertEqual(self.client.get(f'/media/{path}').status_code, 404, path)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+class ProgramsCountTests(TestCase):
+    """Tests for the stored University.programs_count."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.programs = [
+            Program.objects.create(title=f"Program {i}", code=f"P{i}") for i in range(3)
+        ]
+        self.uni = create_university(name="Counted University")
+        self.other = create_university(name="Other University")
+
+    def count(self, university):
+        return University.objects.values_list('programs_count', flat=True).get(pk=university.pk)
+
+    def test_forward_changes(self):
+        """Test add, remove, set and clear from the university side."""
+        self.uni.programs.add(*self.programs)
+        self.assertEqual(self.count(self.uni), 3)
+        self.uni.programs.remove(self.programs[0])
+        self.assertEqual(self.count(self.uni), 2)
+        self.uni.programs.set([self.programs[0]])
+        self.assertEqual(self.count(self.uni), 1)
+        self.uni.programs.clear()
+        self.assertEqual(self.count(self.uni), 0)
+
+    def test_reverse_changes(self):
+        """Test add and clear from the program side."""
+        self.programs[0].universities.add(self.uni, self.other)
+        self.programs[1].universities.add(self.uni)
+        self.assertEqual(self.count(self.uni), 2)
+        self.assertEqual(self.count(self.other), 1)
+        self.programs[0].universities.clear()
+        self.assertEqual(self.count(self.uni), 1)
+        self.assertEqual(self.count(self.other), 0)
+
+    def test_program_deletion(self):
+        """Test that cascade-deleted memberships are uncounted."""
+        self.uni.programs.add(*self.programs)
+        Program.objects.filter(pk__in=[p.pk for p in self.programs[:2]]).delete()
+        self.assertEqual(self.count(self.uni), 1)
+
+    def test_save_does_not_overwrite_count(self):
+        """Test that saving a stale instance keeps the stored count."""
+        stale = University.objects.get(pk=self.uni.pk)
+        self.uni.programs.add(*self.programs)
+        stale.name = "Renamed University"
+        stale.save()
+        self.assertEqual(self.count(self.uni), 3)
+
+    def test_list_does_not_query_memberships(self):
+        """Test that the list endpoint never touches the M2M table."""
+        self.uni.programs.add(*self.programs)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('university-list'))
+        counts = {u['name']: u['programs_count'] for u in response.json()['results']}
+        self.assertEqual(counts, {"Counted University": 3, "Other University": 0})
+        through_table = University.programs.through._meta.db_table
+        self.assertFalse(any(through_table in q['sql'] for q in queries.captured_queries))
+
+    def test_check_command(self):
+        """Test that the consistency check detects and repairs drift."""
+        self.uni.programs.add(*self.programs)
+        call_command('check_programs_count', stdout=StringIO())
+
+        University.objects.filter(pk=self.uni.pk).update(programs_count=7)
+        with self.assertRaises(CommandError):
+            call_command('check_programs_count', stdout=StringIO())
+
+        call_command('check_programs_count', '--fix', stdout=StringIO())
+        self.assertEqual(self.count(self.uni), 3)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Tests for config.pgpool, over SQLite connections."""
+
+    def pool(self, **options):
+        connect = lambda: sqlite3.connect(':memory:', check_same_thread=False)
+        return ConnectionPool(connect, **options)
+
+    def test_reuse(self):
+        """Test that given back connections are handed out again."""
+        pool = self.pool(min_size=1)
+        pool.fill()
+        first = pool.getconn()
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), first)
+        stats = pool.stats()
+        self.assertEqual((stats['opened'], stats['checkouts'], stats['in_use'], stats['idle']), (1, 2, 1, 0))
+
+    def test_timeout_and_waiting(self):
+        """Test that a full pool makes threads wait, then time out."""
+        pool = self.pool(max_size=1, timeout=0.05)
+        raw = pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+        pool.timeout = 5
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(pool.getconn()))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            time.sleep(0.001)
+        pool.putconn(raw)
+        waiter.join()
+        self.assertIs(result[0], raw)
+        stats = pool.stats()
+        self.assertEqual((stats['opened'], stats['waits'], stats['timeouts']), (1, 2, 1))
+
+    def test_discarded_connections(self):
+        """Test broken, failed-reset, expired and failed-check connections."""
+        def reset(connection):
+            if getattr(connection, 'dirty', False):
+                raise ValueError('dirty')
+
+        pool = self.pool(reset=reset, check=lambda connection: connection.execute('SELECT 1'))
+        pool.putconn(pool.getconn(), broken=True)
+        self.assertEqual((pool.stats()['lost'], pool.stats()['size']), (1, 0))
+
+        class Connection:
+            dirty = True
+
+            def close(self):
+                pass
+
+        pool.connect = Connection
+        pool.putconn(pool.getconn())
+        self.assertEqual(pool.stats()['lost'], 2)
+
+        pool.max_lifetime = 0
+        pool.connect = lambda: sqlite3.connect(':memory:', check_same_thread=False)
+        raw = pool.getconn()
+        time.sleep(0.01)
+        pool.putconn(raw)
+        self.assertEqual((pool.stats()['closed'], pool.stats()['idle']), (1, 0))
+
+        pool.max_lifetime = 3600
+        raw = pool.getconn()
+        pool.putconn(raw)
+        raw.close()  # Dropped by the server while idle
+        with patch('config.pgpool.CHECK_IDLE_AFTER', -1):
+            self.assertIsNot(pool.getconn(), raw)
+        self.assertEqual(pool.stats()['lost'], 3)
+
+    def test_idle_expiry(self):
+        """Test that surplus idle connections close after max_idle, min_size ones stay."""
+        pool = self.pool(min_size=1, max_idle=0)
+        borrowed = [pool.getconn(), pool.getconn()]
+        for raw in borrowed:
+            pool.putconn(raw)
+        self.assertEqual(pool.stats()['idle'], 2)
+        time.sleep(0.01)
+        pool.putconn(pool.getconn())
+        self.assertEqual((pool.stats()['closed'], pool.stats()['size'], pool.stats()['idle']), (1, 1, 1))
+
+    def test_database_stats(self):
+        """Test the staff-only /api/db-stats/ endpoint."""
+        url = reverse('db-stats')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        with patch('rest_framework.permissions.IsAdminUser.has_permission', return_value=True):
+            stats = self.client.get(url).json()
+        self.assertEqual(stats['default']['conn_max_age'], settings.DATABASES['default']['CONN_MAX_AGE'])
+        self.assertIsNone(stats['default']['pool'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+class PooledBackendTests(TransactionTestCase):
+    """Tests for the config.pgpool database backend."""
+
+    def setUp(self):
+        """Open a pooled wrapper on the test database."""
+        settings_dict = {**connection.settings_dict, 'ENGINE': 'config.pgpool', 'CONN_MAX_AGE': 0}
+        settings_dict['OPTIONS'] = {**settings_dict['OPTIONS'], 'pool': {'min_size': 1, 'max_size': 2}}
+        self.wrapper = PooledDatabaseWrapper(settings_dict, alias='pooled')
+        self.addCleanup(close_pools)
+
+    def test_connections_are_reused(self):
+        """Test that closing gives the connection back, and transactions are rolled back."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        raw = self.wrapper.connection
+        self.wrapper.set_autocommit(False)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.wrapper.close()
+        self.assertEqual(raw.get_transaction_status(), TRANSACTION_STATUS_IDLE)
+
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(self.wrapper.connection, raw)
+        self.assertEqual(pool_stats('pooled')['opened'], 1)
+        self.wrapper.close()
+
+
+@unittest.skipIf('replica' in settings.DATABASES, 'DATABASE_REPLICA_URL mirrors the test database')
+class ReplicaRoutingTests(TransactionTestCase):
+    """Tests for config.dbrouter against a primary and a separate replica database."""
+
+    # Resolved in setUpClass, after the replica is added; the test runner only sets up `default`
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        """Add a `replica` SQLite database holding different rows than the primary."""
+        cls.directory = tempfile.TemporaryDirectory()
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directory.name, 'replica.db')}
+        connections.configure_settings({'default': connections.settings['default'], 'replica': replica})
+        connections.settings['replica'] = replica
+        super().setUpClass()
+        with override_settings(DATABASE_ROUTERS=[]):
+            call_command('migrate', database='replica', verbosity=0)
+        University.objects.using('replica').bulk_create([University(
+            pk=1000, name="Replica University", city='Алматы', description='', tuition=Decimal('1000'),
+        )])
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the replica database."""
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        """Set up the primary's copy of the university."""
+        create_university(pk=1000, name="Primary University")
+        get_cache().clear()
+        self.url = reverse('university-detail', args=[1000])
+
+    def test_safe_requests_read_replica(self):
+        """Test that GET requests read from the replica, other code from the primary."""
+        self.assertEqual(self.client.get(self.url).json()['name'], "Replica University")
+        self.assertEqual(University.objects.get(pk=1000).name, "Primary University")
+
+    def test_writes_pin_client(self):
+        """Test read-your-writes after an admin change, until the pin expires."""
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.post(reverse('admin:universities_program_add'), {'title': 'Law', 'code': 'LW501'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertTrue(Program.objects.using('default').filter(code='LW501').exists())
+        self.assertFalse(Program.objects.using('replica').filter(code='LW501').exists())
+
+        # The detail budget counts no session queries; logging out drops every cookie
+        pin = self.client.cookies[PIN_COOKIE].value
+        self.client.logout()
+        self.client.cookies[PIN_COOKIE] = pin
+        get_cache().clear()
+        self.assertEqual(self.client.get(self.url).json()['name'], "Primary University")
+        expiry = time.time() + settings.DATABASE_REPLICA_STICKY_SECONDS + 1
+        with patch('config.dbrouter.time.time', return_value=expiry):
+            get_cache().clear()
+            self.assertEqual(self.client.get(self.url).json()['name'], "Replica University")
+
+    def test_cache_fills_after_change_read_primary(self):
+        """Test that entries cached right after a catalog change hold the primary's rows."""
+        self.assertEqual(self.client.get(self.url).json()['name'], "Replica University")
+
+        # An admin change the replica has not received yet; signals bump the version
+        university = University.objects.get(pk=1000)
+        university.name = "Renamed University"
+        university.save()
+        self.assertEqual(University.objects.using('replica').get(pk=1000).name, "Replica University")
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['name'], "Renamed University")
+        # Once the replica may have caught up, reads go back to it, and the entry stays fresh
+        get_cache().delete(CHANGED_KEY)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['name'], "Renamed University")
+        get_cache().clear()
+        self.assertEqual(self.client.get(self.url).json()['name'], "Replica University")
+
+    def test_routing_rules(self):
+        """Test transactions, view overrides, migrations and forged cookies."""
+        token = dbrouter._state.set(dbrouter.RequestState(pinned=False))
+        self.addCleanup(dbrouter._state.reset, token)
+        dbrouter._state.get().alias = 'replica'
+        self.assertEqual(University.objects.all().db, 'replica')
+        with transaction.atomic():
+            self.assertEqual(University.objects.all().db, 'default')
+
+        self.assertTrue(view_replica_reads(UniversityViewSet.as_view({'get': 'list'}), 'GET'))
+        self.assertTrue(view_replica_reads(CompareSummaryView.as_view(), 'POST'))
+        self.assertFalse(view_replica_reads(ChatView.as_view(), 'POST'))
+        self.assertTrue(view_replica_reads(AsyncCompareSummaryView.as_view(), 'POST'))
+        self.assertFalse(router.allow_migrate('replica', 'universities'))
+        self.client.cookies[PIN_COOKIE] = str(time.time() + 86400)
+        self.assertEqual(self.client.get(self.url).json()['name'], "Replica University")
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CatalogAdminTests(TestCase):
+    """Tests for the admin changelists on large catalogs."""
+
+    def setUp(self):
+        """Set up test data and log in as staff."""
+        self.programs = [Program.objects.create(title=f"Program {i}", code=f"P{i}") for i in range(3)]
+        self.unis = [
+            create_university(name=f"University {i}", external_id=f"ext-{i}", tuition=Decimal('1000.50'))
+            for i in range(3)
+        ]
+        self.unis[0].programs.add(*self.programs[:2])
+        self.unis[1].programs.add(self.programs[0])
+        for uni in self.unis:
+            UniversityImage.objects.create(university=uni, image='universities/gallery/a.jpg')
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+    def changelist(self, model, params=None):
+        response = self.client.get(reverse(f'admin:universities_{model}_changelist'), params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_program_filter(self):
+        """Test that universities are filtered by a typed program code."""
+        response = self.changelist('university', {'program': 'P1', 'city': 'Алматы'})
+        self.assertEqual([uni.name for uni in response.context['cl'].result_list], ["University 0"])
+        self.assertContains(response, 'name="program" value="P1"')
+        self.assertContains(response, 'type="hidden" name="city"')
+
+    def test_university_id_filter(self):
+        """Test that images are filtered by university ID."""
+        response = self.changelist('universityimage', {'university': self.unis[1].pk})
+        self.assertEqual([image.university_id for image in response.context['cl'].result_list], [self.unis[1].pk])
+        response = self.changelist('universityimage', {'university': 'abc'})
+        self.assertEqual(list(response.context['cl'].result_list), [])
+
+    def test_program_universities_count(self):
+        """Test the annotated membership counts of the program changelist."""
+        response = self.changelist('program')
+        counts = {program.code: program.universities_count for program in response.context['cl'].result_list}
+        self.assertEqual(counts, {'P0': 2, 'P1': 1, 'P2': 0})
+
+    def test_change_form_uses_autocomplete(self):
+        """Test that the programs field does not render every program."""
+        response = self.client.get(reverse('admin:universities_university_change', args=[self.unis[0].pk]))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'P2 - Program 2')
+
+    def test_estimated_count_paginator(self):
+        """Test that large unfiltered tables report the statistics estimate."""
+        queryset = University.objects.all()
+        self.assertIsNone(estimated_count(queryset))
+        with patch('universities.pagination.estimated_count', return_value=1_000_000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 1_000_000)
+        with patch('universities.pagination.estimated_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 3)
+
+    def test_export_csv(self):
+        """Test the streamed CSV export and importing it back."""
+        with patch('universities.export.CHUNK_SIZE', 2):
+            response = self.client.post(reverse('admin:universities_university_changelist'), {
+                'action': 'export_csv',
+                '_selected_action': [uni.pk for uni in self.unis],
+            })
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['external_id'] for row in rows], ['ext-0', 'ext-1', 'ext-2'])
+        self.assertEqual([row['programs'] for row in rows], ['P0;P1', 'P0', ''])
+        self.assertEqual(rows[0]['tuition'], '1000.50')
+        self.assertEqual(rows[0]['has_dormitory'], 'false')
+
+        content = content.replace('University 2', 'Renamed University')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_catalog', '--universities', f.name, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(University.objects.get(pk=self.unis[2].pk).name, 'Renamed University')
+        self.assertEqual(University.objects.get(pk=self.unis[0].pk).programs.count(), 2)
+
+
+@patch.object(KeysetPagination, 'page_size', 3)
+class KeysetPaginationTests(APITestCase):
+    """Tests for ?pagination=cursor on /api/universities/."""
+
+    def setUp(self):
+        """Set up test data with plenty of ties and NULLs."""
+        self.url = reverse('university-list')
+        for i in range(11):
+            create_university(
+                name=f"University {i % 4}",
+                rating=[4.5, 4.0, 3.5][i % 3],
+                tuition=(i % 2) * 1000000,
+                founded_year=None if i % 3 == 0 else 1950 + i % 5,
+            )
+
+    def walk(self, params):
+        """Follow next links to the end, then previous links back to the start."""
+        response = self.client.get(self.url, {'pagination': 'cursor', **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        pages = [[u['id'] for u in response.data['results']]]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append([u['id'] for u in response.data['results']])
+
+        backwards = [pages[-1]]
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            backwards.insert(0, [u['id'] for u in response.data['results']])
+        return pages, backwards
+
+    def assertWalksInOrder(self, params, expected_ids):
+        pages, backwards = self.walk(params)
+        self.assertEqual([i for page in pages for i in page], expected_ids)
+        self.assertEqual(pages, backwards)
+        self.assertTrue(all(len(page) == 3 for page in pages[:-1]))
+
+    def test_default_ordering(self):
+        """Test paging through the default -rating, name ordering."""
+        expected = list(University.objects.order_by('-rating', 'name', 'id').values_list('id', flat=True))
+        self.assertWalksInOrder({}, expected)
+
+    def test_tuition_ordering(self):
+        """Test paging through a sort order with large ties."""
+        expected = list(University.objects.order_by('-tuition', 'id').values_list('id', flat=True))
+        self.assertWalksInOrder({'ordering': '-tuition'}, expected)
+
+    def test_nullable_ordering(self):
+        """Test that universities without a founding year come last in both directions."""
+        for ordering in ('founded_year', '-founded_year'):
+            descending = ordering.startswith('-')
+            universities = sorted(
+                University.objects.all(),
+                key=lambda u: (
+                    u.founded_year is None,
+                    -(u.founded_year or 0) if descending else (u.founded_year or 0),
+                    u.id,
+                )
+            )
+            self.assertWalksInOrder({'ordering': ordering}, [u.id for u in universities])
+
+    def test_filters_are_preserved(self):
+        """Test that next links keep the active filters."""
+        expected = list(
+            University.objects.filter(tuition=0).order_by('-rating', 'name', 'id').values_list('id', flat=True)
+        )
+        self.assertWalksInOrder({'tuition_range': 'free'}, expected)
+
+    def test_no_count_query(self):
+        """Test that keyset pages never count the table."""
+        first = self.client.get(self.url, {'pagination': 'cursor'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(first.data['next'])
+        self.assertNotIn('count', response.data)
+        # Paginator.count issues SELECT COUNT(*) AS "__count"
+        self.assertFalse(any('__count' in q['sql'] for q in queries.captured_queries))
+
+    def test_page_number_mode_is_default(self):
+        """Test that existing clients still get page-number responses."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['count'], 11)
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor returns 404."""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@unittest.skipUnless(
+    os.environ.get('RUN_QUERY_PLAN_TESTS'),
+    'Set RUN_QUERY_PLAN_TESTS=1 to check query plans against a large catalog'
+)
+class UniversityQueryPlanTests(TransactionTestCase):
+    """
+    Checks that catalog queries are answered from the indexes in 0002_catalog_indexes.
+
+    Generates QUERY_PLAN_ROWS universities (1M by default) directly in SQL,
+    so it is opt-in and works on both PostgreSQL and SQLite.
+    """
+
+    rows = int(os.environ.get('QUERY_PLAN_ROWS', 1000000))
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        table = University._meta.db_table
+        columns = (
+            "name, city, description, logo, iframe_3d_tour_url, tuition, rating, "
+            "study_form, has_dormitory, address, phone, email, website, "
+            "founded_year, students_count, created_at, updated_at"
+        )
+        # 20 cities, 3 study forms, ~5% free, ~30% with dormitory
+        values = (
+            "'University ' || n, 'City ' || (n % 20), '', '', '', "
+            "CASE WHEN n % 20 = 0 THEN 0 ELSE (n % 400) * 10000 END, (n % 500) / 100.0, "
+            "CASE n % 3 WHEN 0 THEN 'full-time' WHEN 1 THEN 'part-time' ELSE 'both' END, "
+            "n % 10 < 3, '', '', '', '', 1900 + n % 120, NULL, {now}, {now}"
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"SELECT {values.format(now='now()')} FROM generate_series(1, %s) AS n",
+                    [cls.rows]
+                )
+                cursor.execute(f"ANALYZE {table}")
+            else:
+                cursor.execute(
+                    f"WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) "
+                    f"INSERT INTO {table} ({columns}) "
+                    f"SELECT {values.format(now='CURRENT_TIMESTAMP')} FROM seq",
+                    [cls.rows]
+                )
+                cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset[:50].explain()
+        self.assertIn(index_name, plan)
+
+    def test_default_ordering(self):
+        """Test the unfiltered first page."""
+        self.assertUsesIndex(University.objects.all(), 'university_rating_name_idx')
+
+    def test_city_filter(self):
+        """Test the city filter with the default ordering."""
+        queryset = filter_universities(University.objects.all(), {'city': 'City 7'})
+        self.assertUsesIndex(queryset, 'university_city_rating_idx')
+
+    def test_study_form_filter(self):
+        """Test the study form filter with the default ordering."""
+        queryset = filter_universities(University.objects.all(), {'study_form': 'both'})
+        self.assertUsesIndex(queryset, 'university_form_rating_idx')
+
+    def test_dormitory_filter(self):
+        """Test the partial dormitory index."""
+        queryset = filter_universities(University.objects.all(), {'has_dormitory': 'true'})
+        self.assertUsesIndex(queryset, 'university_dorm_rating_idx')
+
+    def test_free_tuition_filter(self):
+        """Test the free tuition bucket with the default ordering."""
+        queryset = filter_universities(University.objects.all(), {'tuition_range': 'free'})
+        self.assertUsesIndex(queryset, 'university_tuition_idx')
+
+    def test_tuition_ordering(self):
+        """Test sorting by tuition."""
+        self.assertUsesIndex(University.objects.order_by('tuition'), 'university_tuition_idx')
+
+    def test_founded_year_ordering(self):
+        """Test sorting by founding year."""
+        self.assertUsesIndex(University.objects.order_by('founded_year'), 'university_founded_idx')
+
+    def test_keyset_page(self):
+        """Test that a deep keyset page seeks into the default ordering index."""
+        paginator = KeysetPagination()
+        paginator.ordering = paginator.get_ordering(University.objects.all())
+        queryset = (
+            University.objects
+            .filter(paginator.seek_condition(['2.50', 'University 500000', 500000], reverse=False))
+            .order_by(*paginator.order_expressions(reverse=False))
+        )
+        self.assertUsesIndex(queryset, 'university_rating_name_idx')
@@ -1,6 +1,9 @@
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from .views import UniversityViewSet, ProgramViewSet, get_filter_options
+from .views import (
+    UniversityViewSet, ProgramViewSet, get_filter_options, get_facet_counts, get_cache_stats,
+    get_catalog_snapshot, get_catalog_snapshot_file,
+)
 
 router = DefaultRouter()
 router.register(r'universities', UniversityViewSet, basename='university')
@@ -9,5 +12,12 @@ router.register(r'programs', ProgramViewSet, basename='program')
 urlpatterns = [
     path('', include(router.urls)),
     path('filter-options/', get_filter_options, name='filter-options'),
+    path('facets/', get_facet_counts, name='facets'),
+    path('cache-stats/', get_cache_stats, name='cache-stats'),
+    re_path(r'^catalog-snapshot/(?P<fmt>parquet|arrow)/$', get_catalog_snapshot, name='catalog-snapshot'),
+    re_path(
+        r'^catalog-snapshot/(?P<fmt>parquet|arrow)/(?P<filename>[a-z]+-[0-9a-f]+\.(?:parquet|arrow))$',
+        get_catalog_snapshot_file, name='catalog-snapshot-file',
+    ),
 ]
 
@@ -1,8 +1,26 @@
+import os
+
 from django.db import models
-from rest_framework import viewsets
+from django.db.models import Prefetch
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_safe
+from rest_framework import serializers, viewsets
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import IsAdminUser
+from config.media import IMMUTABLE
+from . import columnar
+from .caching import cache_stats, cached_catalog_response
+from .conditional import conditional_collection, conditional_university_detail
+from .export import CSVRenderer, NDJSONRenderer, csv_response, ndjson_response
+from .facets import get_facets
+from .filters import UniversityFilterBackend, SearchQueryFilter
 from .models import University, Program
+from .pagination import CatalogPagination
+from .snapshot import serve_catalog_snapshot
 from .serializers import (
     UniversityListSerializer,
     UniversityDetailSerializer,
@@ -14,24 +32,106 @@ class UniversityViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing universities.
     
-    list: Returns all universities (compact view)
+    list: Returns all universities (compact view), filtered by the query
+        parameters documented in `universities.filters` and sorted with
+        `?ordering=` (rating, tuition, name, founded_year; prefix `-` for desc).
+        `?q=` searches names, cities, programs and descriptions, best match first.
+        Paginated by page number; `?pagination=cursor` switches to keyset pages.
     retrieve: Returns a single university (detailed view)
+    bulk: Returns the universities in `?ids=1,4,7` in the requested order,
+        compact by default or detailed with `?view=detail`
+    export: Streams every university matching the list filters, as NDJSON
+        (`?format=ndjson`, detailed) or CSV (`?format=csv`, import columns)
+    
+    The other actions send ETag/Last-Modified and answer revalidations with 304,
+    and cache their data under the catalog version (`universities.caching`).
+    The bare list is served as precompressed bytes (`universities.snapshot`).
     """
-    queryset = University.objects.prefetch_related('programs', 'images').all()
+    queryset = University.objects.defer('search_vector')
+    filter_backends = [UniversityFilterBackend, SearchQueryFilter, OrderingFilter]
+    ordering_fields = ['rating', 'tuition', 'name', 'founded_year']
+    pagination_class = CatalogPagination
+    bulk_max_ids = 100
+    # Cold-cache worst cases: validators, count + page / object + prefetches (config.querybudget).
+    # Exports query while streaming, after the budget is checked.
+    query_budget = {'list': 3, 'retrieve': 4, 'bulk': 5, 'export': 0}
+    
+    def is_detail_view(self):
+        if self.action == 'bulk':
+            return self.request.query_params.get('view') == 'detail'
+        return self.action == 'retrieve'
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_detail_view():
+            # Lists read the stored programs_count instead of the M2M table
+            queryset = queryset.prefetch_related(
+                Prefetch('programs', queryset=Program.objects.defer('search_vector')),
+                'images',
+            )
+        return queryset
     
     def get_serializer_class(self):
-        if self.action == 'retrieve':
+        if self.is_detail_view():
             return UniversityDetailSerializer
         return UniversityListSerializer
+    
+    @method_decorator(conditional_collection(University))
+    @method_decorator(serve_catalog_snapshot)
+    @method_decorator(cached_catalog_response('university-list'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @method_decorator(conditional_university_detail())
+    @method_decorator(cached_catalog_response('university-detail'))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    @method_decorator(conditional_collection(University, Program))
+    @method_decorator(cached_catalog_response('university-bulk'))
+    @action(detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Fetch several universities in one query, e.g. for Compare and Favorites."""
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError({'ids': 'A comma-separated list of IDs is required.'})
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise serializers.ValidationError({'ids': 'At least one ID is required.'})
+        if len(ids) > self.bulk_max_ids:
+            raise serializers.ValidationError({'ids': f'At most {self.bulk_max_ids} IDs are allowed.'})
+        
+        universities = {university.pk: university for university in self.get_queryset().filter(pk__in=ids)}
+        ordered = [universities[pk] for pk in ids if pk in universities]
+        serializer = self.get_serializer(ordered, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, url_path='export', renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream the catalog dump; not cached, since it is read once per download."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.accepted_renderer.format == 'csv':
+            return csv_response(queryset, 'universities.csv', request)
+        return ndjson_response(queryset, 'universities.ndjson', request)
 
 
 class ProgramViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for viewing programs."""
-    queryset = Program.objects.all()
+    """ViewSet for viewing programs. Supports `?q=` search by title and code."""
+    queryset = Program.objects.defer('search_vector')
     serializer_class = ProgramSerializer
+    filter_backends = [SearchQueryFilter]
+    query_budget = {'list': 3, 'retrieve': 1}
+    
+    @method_decorator(conditional_collection(Program))
+    @method_decorator(cached_catalog_response('program-list'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
 
 @api_view(['GET'])
+@conditional_collection(University)
+@cached_catalog_response('filter-options')
 def get_filter_options(request):
     """
     Returns available filter options for the frontend.
@@ -53,3 +153,62 @@ def get_filter_options(request):
         }
     })
 
+
+
+@api_view(['GET'])
+@conditional_collection(University, Program)
+def get_facet_counts(request):
+    """
+    Returns how many universities match each filter option.
+    
+    Accepts the same query parameters as the university list. Each facet is
+    counted with every other active filter applied (see `universities.facets`).
+    """
+    return Response(get_facets(request.query_params))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_cache_stats(request):
+    """
+    Returns hit/miss counters of the catalog response cache (staff only).
+    """
+    return Response(cache_stats())
+
+
+@api_view(['GET'])
+def get_catalog_snapshot(request, fmt):
+    """
+    Returns the manifest of the Parquet or Arrow snapshot of the catalog
+    tables, as last written by `export_snapshot`. Staff requests rewrite
+    the snapshot first if the catalog changed.
+    
+    Each table links to its file. File names include the catalog version,
+    so the files are cacheable forever (see `universities.columnar`).
+    """
+    if not columnar.available():
+        return Response({'detail': 'Columnar snapshots are not available.'}, status=503)
+    if request.user.is_staff:
+        manifest, _written = columnar.write_snapshot(fmt)
+    else:
+        manifest = columnar.read_manifest(fmt)
+        if manifest is None:
+            raise Http404('No snapshot has been exported yet.')
+    tables = {
+        name: {**table, 'url': request.build_absolute_uri(reverse('catalog-snapshot-file', args=[fmt, table['file']]))}
+        for name, table in manifest['tables'].items()
+    }
+    return Response({**manifest, 'tables': tables})
+
+
+@require_safe
+def get_catalog_snapshot_file(request, fmt, filename):
+    """Sends one table file of a snapshot listed by get_catalog_snapshot."""
+    try:
+        f = open(os.path.join(columnar.snapshot_dir(fmt), filename), 'rb')
+    except FileNotFoundError:
+        raise Http404('Not found')  # Replaced by a newer version
+    content_type = 'application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.file'
+    response = FileResponse(f, as_attachment=True, filename=filename, content_type=content_type)
+    response['Cache-Control'] = IMMUTABLE
+    return response
@@ -1,6 +1,7 @@
 import { Link } from 'react-router-dom'
 import { X, Building2, Star, Check, Minus } from 'lucide-react'
 import { useLanguage } from '../contexts/LanguageContext'
+import ResponsiveImage from './ResponsiveImage'
 
 function ComparisonTable({ universities, onRemove }) {
   const { t } = useLanguage()
@@ -150,7 +151,7 @@ function ComparisonTable({ universities, onRemove }) {
                   <div className="flex items-center gap-3 pr-6">
                     <div className="w-12 h-12 bg-slate-800 rounded-xl flex items-center justify-center overflow-hidden flex-shrink-0">
                       {uni.logo ? (
-                        <img src={uni.logo} alt={uni.name} className="w-full h-full object-cover" />
+                        <ResponsiveImage src={uni.logo} srcset={uni.logo_srcset} sizes="48px" alt={uni.name} className="w-full h-full object-cover" />
                       ) : (
                         <Building2 className="w-6 h-6 text-slate-500" />
                       )}
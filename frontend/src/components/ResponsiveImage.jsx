@@ -0,0 +1,24 @@
+// Image with the resized derivatives served by the API: `srcset` is the
+// `logo_srcset` / `srcset` field ({ webp, jpeg }), null until they exist
+function ResponsiveImage({ src, srcset, sizes, alt, className, loading = 'lazy' }) {
+  if (!srcset) {
+    return <img src={src} alt={alt} className={className} loading={loading} />
+  }
+
+  return (
+    <picture>
+      {srcset.avif && <source type="image/avif" srcSet={srcset.avif} sizes={sizes} />}
+      {srcset.webp && <source type="image/webp" srcSet={srcset.webp} sizes={sizes} />}
+      <img
+        src={src}
+        srcSet={srcset.jpeg}
+        sizes={sizes}
+        alt={alt}
+        className={className}
+        loading={loading}
+      />
+    </picture>
+  )
+}
+
+export default ResponsiveImage
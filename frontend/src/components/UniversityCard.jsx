@@ -1,6 +1,7 @@
 import { Link } from 'react-router-dom'
 import { Heart, GitCompare, MapPin, Star, GraduationCap, Building2, DollarSign } from 'lucide-react'
 import { useLanguage } from '../contexts/LanguageContext'
+import ResponsiveImage from './ResponsiveImage'
 
 function UniversityCard({ 
   university, 
@@ -86,8 +87,10 @@ function UniversityCard({
       <div className="relative mb-4">
         <div className="w-20 h-20 bg-gradient-to-br from-slate-700 to-slate-800 rounded-2xl flex items-center justify-center overflow-hidden">
           {university.logo ? (
-            <img 
-              src={university.logo} 
+            <ResponsiveImage
+              src={university.logo}
+              srcset={university.logo_srcset}
+              sizes="80px"
               alt={university.name}
               className="w-full h-full object-cover"
             />
@@ -6,13 +6,13 @@
  * - Floating button in the bottom-right corner
  * - Expandable chat window with message history
  * - Auto-scroll to newest messages
- * - Loading animation during AI response
+ * - Loading animation until the AI response starts, which then appears as it is generated
  * - Smooth animations and modern UI
  */
 
 import { useState, useRef, useEffect } from 'react'
 import { MessageCircle, X, Send, Bot, Loader2, Minimize2 } from 'lucide-react'
-import { sendChatMessage } from '../../services/ai'
+import { streamChatMessage } from '../../services/ai'
 import { useLanguage } from '../../contexts/LanguageContext'
 import AIChatMessage from './AIChatMessage'
 
@@ -21,12 +21,17 @@ function AIChatWidget() {
   const [messages, setMessages] = useState([])
   const [inputValue, setInputValue] = useState('')
   const [isLoading, setIsLoading] = useState(false)
+  const [isThinking, setIsThinking] = useState(false)
   const [error, setError] = useState(null)
   
   const messagesEndRef = useRef(null)
   const inputRef = useRef(null)
+  const abortRef = useRef(null)
   const { t } = useLanguage()
 
+  // Stop a response still streaming when the widget goes away
+  useEffect(() => () => abortRef.current?.abort(), [])
+
   // Auto-scroll to bottom when new messages arrive
   useEffect(() => {
     if (messagesEndRef.current) {
@@ -70,6 +75,10 @@ function AIChatWidget() {
     setMessages(prev => [...prev, userMessage])
     setInputValue('')
     setIsLoading(true)
+    setIsThinking(true)
+    const controller = new AbortController()
+    abortRef.current = controller
+    const assistantId = (Date.now() + 1).toString()
 
     try {
       // Prepare conversation history for context (exclude welcome message)
@@ -80,32 +89,30 @@ function AIChatWidget() {
           content: msg.content,
         }))
 
-      // Send message to API
-      const response = await sendChatMessage(trimmedInput, conversationHistory)
-
-      if (response.success) {
-        // Add assistant response
-        const assistantMessage = {
-          id: (Date.now() + 1).toString(),
-          role: 'assistant',
-          content: response.response,
-        }
-        setMessages(prev => [...prev, assistantMessage])
-      } else {
-        throw new Error(response.error || 'Failed to get response')
-      }
+      // Stream the assistant response into its message as it is generated
+      await streamChatMessage(trimmedInput, conversationHistory, {
+        signal: controller.signal,
+        onToken: (content) => {
+          setIsThinking(false)
+          setMessages(prev => prev.some(msg => msg.id === assistantId)
+            ? prev.map(msg => msg.id === assistantId ? { ...msg, content: msg.content + content } : msg)
+            : [...prev, { id: assistantId, role: 'assistant', content }])
+        },
+      })
     } catch (err) {
+      if (err.name === 'AbortError') return
       console.error('Chat error:', err)
       setError(err.error || t('ai.errorMessage'))
-      // Add error message to chat
+      // Replace a partial response with the error message
       const errorMessage = {
-        id: (Date.now() + 1).toString(),
+        id: assistantId,
         role: 'assistant',
         content: t('ai.errorMessage'),
       }
-      setMessages(prev => [...prev, errorMessage])
+      setMessages(prev => [...prev.filter(msg => msg.id !== assistantId), errorMessage])
     } finally {
       setIsLoading(false)
+      setIsThinking(false)
     }
   }
 
@@ -161,8 +168,8 @@ function AIChatWidget() {
               />
             ))}
             
-            {/* Loading indicator */}
-            {isLoading && (
+            {/* Loading indicator, until the response starts */}
+            {isThinking && (
               <div className="flex gap-3">
                 <div className="flex-shrink-0 w-8 h-8 rounded-full bg-slate-700 
                                 flex items-center justify-center">
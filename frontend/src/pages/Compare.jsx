@@ -1,8 +1,8 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Link } from 'react-router-dom'
 import { GitCompare, Plus, Trash2, Sparkles, Loader2 } from 'lucide-react'
-import { getUniversity } from '../services/api'
-import { getCompareSummary } from '../services/ai'
+import { getUniversitiesBulk } from '../services/api'
+import { streamCompareSummary } from '../services/ai'
 import ComparisonTable from '../components/ComparisonTable'
 import { CompareSummary } from '../components/ai'
 import { useLanguage } from '../contexts/LanguageContext'
@@ -17,8 +17,12 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
   const [loading, setLoading] = useState(true)
   const [summaryLoading, setSummaryLoading] = useState(false)
   const [summaryError, setSummaryError] = useState(null)
+  const summaryAbortRef = useRef(null)
   const { t } = useLanguage()
 
+  // Stop a summary still streaming when leaving the page
+  useEffect(() => () => summaryAbortRef.current?.abort(), [])
+
   // Initialize summary from localStorage if it matches current compareList
   const [summary, setSummary] = useState(() => {
     if (typeof window === 'undefined') return null
@@ -39,9 +43,9 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
     return null
   })
 
-  // Save summary to localStorage whenever it changes
+  // Save summary to localStorage once it is complete
   useEffect(() => {
-    if (summary && compareList.length >= 2) {
+    if (summary && !summaryLoading && compareList.length >= 2) {
       try {
         localStorage.setItem('compareSummary', JSON.stringify({
           ids: compareList,
@@ -51,7 +55,7 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
         console.error('Error saving summary to localStorage:', e)
       }
     }
-  }, [summary, compareList])
+  }, [summary, summaryLoading, compareList])
 
   useEffect(() => {
     const fetchUniversities = async () => {
@@ -64,8 +68,7 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
       }
 
       try {
-        const promises = compareList.map(id => getUniversity(id))
-        const results = await Promise.all(promises)
+        const results = await getUniversitiesBulk(compareList, 'detail')
         setUniversities(results)
         
         // Check if saved summary matches new compareList
@@ -100,16 +103,20 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
 
     setSummaryLoading(true)
     setSummaryError(null)
+    setSummary(null)
+    const controller = new AbortController()
+    summaryAbortRef.current = controller
     
     try {
-      const response = await getCompareSummary(compareList)
-      if (response.success) {
-        setSummary(response.summary)
-      } else {
-        throw new Error(response.error || 'Failed to generate summary')
-      }
+      // Show the summary as it is generated
+      await streamCompareSummary(compareList, {
+        signal: controller.signal,
+        onToken: (content) => setSummary(prev => (prev || '') + content),
+      })
     } catch (error) {
+      if (error.name === 'AbortError') return
       console.error('Summary generation error:', error)
+      setSummary(null)
       setSummaryError(error.error || t('ai.summaryError'))
     } finally {
       setSummaryLoading(false)
@@ -117,6 +124,7 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
   }
 
   const handleCloseSummary = () => {
+    summaryAbortRef.current?.abort()
     setSummary(null)
     localStorage.removeItem('compareSummary')
   }
@@ -221,8 +229,8 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
               </div>
             )}
 
-            {/* AI Summary Loading State */}
-            {summaryLoading && (
+            {/* AI Summary Loading State, until the summary starts */}
+            {summaryLoading && !summary && (
               <div className="mt-8 p-8 bg-slate-800/50 rounded-2xl border border-slate-700/50 animate-pulse">
                 <div className="flex items-center gap-4 mb-6">
                   <div className="w-10 h-10 bg-slate-700 rounded-xl" />
@@ -242,7 +250,7 @@ function Compare({ compareList, clearCompare, toggleCompare }) {
             )}
 
             {/* AI Comparison Summary */}
-            {summary && !summaryLoading && (
+            {summary && (
               <CompareSummary 
                 summary={summary} 
                 onClose={handleCloseSummary}
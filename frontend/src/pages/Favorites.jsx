@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react'
 import { Heart, Trash2 } from 'lucide-react'
-import { getUniversities } from '../services/api'
+import { getUniversitiesBulk } from '../services/api'
 import FavoritesList from '../components/FavoritesList'
 import { useLanguage } from '../contexts/LanguageContext'
 
@@ -12,8 +12,8 @@ function Favorites({ favorites, toggleFavorite, toggleCompare, compareList }) {
   useEffect(() => {
     const fetchUniversities = async () => {
       try {
-        const data = await getUniversities()
-        setUniversities(data.results || data)
+        const data = await getUniversitiesBulk(favorites)
+        setUniversities(data)
       } catch (error) {
         console.error('Error fetching universities:', error)
       } finally {
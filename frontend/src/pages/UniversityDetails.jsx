@@ -7,6 +7,7 @@ import {
 } from 'lucide-react'
 import { getUniversity } from '../services/api'
 import { useLanguage } from '../contexts/LanguageContext'
+import ResponsiveImage from '../components/ResponsiveImage'
 
 function UniversityDetails({ toggleFavorite, favorites, toggleCompare, compareList }) {
   const { id } = useParams()
@@ -127,10 +128,13 @@ function UniversityDetails({ toggleFavorite, favorites, toggleCompare, compareLi
               <div className="flex flex-col sm:flex-row gap-6">
                 <div className="w-24 h-24 bg-gradient-to-br from-slate-700 to-slate-800 rounded-2xl flex items-center justify-center overflow-hidden flex-shrink-0">
                   {university.logo ? (
-                    <img 
-                      src={university.logo} 
+                    <ResponsiveImage
+                      src={university.logo}
+                      srcset={university.logo_srcset}
+                      sizes="96px"
                       alt={university.name}
                       className="w-full h-full object-cover"
+                      loading="eager"
                     />
                   ) : (
                     <Building2 className="w-12 h-12 text-slate-500" />
@@ -224,10 +228,13 @@ function UniversityDetails({ toggleFavorite, favorites, toggleCompare, compareLi
                 <h2 className="text-xl font-bold text-white mb-4">{t('details.gallery')}</h2>
                 <div className="relative">
                   <div className="aspect-video rounded-xl overflow-hidden bg-slate-800">
-                    <img
+                    <ResponsiveImage
                       src={university.images[activeImageIndex].image}
+                      srcset={university.images[activeImageIndex].srcset}
+                      sizes="(min-width: 1024px) 66vw, 100vw"
                       alt={university.images[activeImageIndex].caption || `${university.name}`}
                       className="w-full h-full object-cover"
+                      loading="eager"
                     />
                   </div>
                   
@@ -265,8 +272,10 @@ function UniversityDetails({ toggleFavorite, favorites, toggleCompare, compareLi
                             : 'border-transparent hover:border-slate-600'
                         }`}
                       >
-                        <img
+                        <ResponsiveImage
                           src={img.image}
+                          srcset={img.srcset}
+                          sizes="80px"
                           alt={img.caption || `${index + 1}`}
                           className="w-full h-full object-cover"
                         />
@@ -4,6 +4,8 @@
  * Provides functions for interacting with the AI backend endpoints:
  * - sendChatMessage: Send a message to the AI chatbot
  * - getCompareSummary: Get an AI-generated comparison summary
+ * - streamChatMessage, streamCompareSummary: The same, with the answer
+ *   delivered token by token as the model generates it (Server-Sent Events)
  */
 
 import axios from 'axios'
@@ -55,7 +57,79 @@ export const getCompareSummary = async (universityIds) => {
   }
 }
 
-export default aiApi
+/**
+ * POST to a streaming AI endpoint and read its Server-Sent Events
+ * 
+ * Aborting `signal` closes the connection, which also stops the
+ * generation on the server.
+ * 
+ * @param {string} path - Endpoint path below the API base URL
+ * @param {Object} body - JSON request body
+ * @param {{onStart?: Function, onToken?: Function, signal?: AbortSignal}} options - Event callbacks
+ * @returns {Promise<Object>} - Data of the final `done` event
+ */
+const streamEvents = async (path, body, { onStart, onToken, signal } = {}) => {
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+    },
+    body: JSON.stringify(body),
+    signal,
+  })
+  if (!response.ok) {
+    // Requests rejected before streaming get regular JSON errors
+    throw await response.json().catch(() => ({ success: false, error: `HTTP ${response.status}` }))
+  }
 
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += value
 
+    // Events are separated by a blank line
+    let end
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const fields = {}
+      for (const line of buffer.slice(0, end).split('\n')) {
+        const separator = line.indexOf(': ')
+        fields[line.slice(0, separator)] = line.slice(separator + 2)
+      }
+      buffer = buffer.slice(end + 2)
+
+      const data = JSON.parse(fields.data)
+      if (fields.event === 'start') onStart?.(data)
+      else if (fields.event === 'token') onToken?.(data.content)
+      else if (fields.event === 'done') return data
+      else if (fields.event === 'error') throw data
+    }
+  }
+  throw { success: false, error: 'The response ended unexpectedly' }
+}
+
+/**
+ * Stream the AI chatbot's answer to a message
+ * 
+ * @param {string} message - The user's message/question
+ * @param {Array} conversationHistory - Previous messages for context
+ * @param {{onToken?: Function, signal?: AbortSignal}} options - Called with each piece of the answer
+ * @returns {Promise<{success: boolean}>} - Resolves when the answer is complete
+ */
+export const streamChatMessage = (message, conversationHistory = [], options = {}) =>
+  streamEvents('/ai/chat/stream/', { message, conversation_history: conversationHistory }, options)
+
+/**
+ * Stream an AI-generated comparison summary for universities
+ * 
+ * @param {Array<number>} universityIds - Array of university IDs to compare
+ * @param {{onToken?: Function, signal?: AbortSignal}} options - Called with each piece of the summary
+ * @returns {Promise<{success: boolean, universities_compared: number}>} - Resolves when the summary is complete
+ */
+export const streamCompareSummary = (universityIds, options = {}) =>
+  streamEvents('/ai/compare-summary/stream/', { university_ids: universityIds }, options)
+
+export default aiApi
 
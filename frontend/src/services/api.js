@@ -9,8 +9,8 @@ const api = axios.create({
   },
 })
 
-export const getUniversities = async () => {
-  const response = await api.get('/universities/')
+export const getUniversities = async (params = {}) => {
+  const response = await api.get('/universities/', { params })
   return response.data
 }
 
@@ -19,6 +19,20 @@ export const getUniversity = async (id) => {
   return response.data
 }
 
+// The most IDs the bulk endpoint accepts per request (UniversityViewSet.bulk_max_ids)
+const BULK_MAX_IDS = 100
+
+export const getUniversitiesBulk = async (ids, view = 'list') => {
+  const chunks = []
+  for (let i = 0; i < ids.length; i += BULK_MAX_IDS) {
+    chunks.push(ids.slice(i, i + BULK_MAX_IDS))
+  }
+  const responses = await Promise.all(chunks.map((chunk) => api.get('/universities/bulk/', {
+    params: { ids: chunk.join(','), view },
+  })))
+  return responses.flatMap((response) => response.data)
+}
+
 export const getPrograms = async () => {
   const response = await api.get('/programs/')
   return response.data
@@ -29,5 +43,10 @@ export const getFilterOptions = async () => {
   return response.data
 }
 
+export const getFacets = async (params = {}) => {
+  const response = await api.get('/facets/', { params })
+  return response.data
+}
+
 export default api
 